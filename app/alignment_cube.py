@@ -0,0 +1,265 @@
+"""
+Offline rollup of the company x paper table behind the dashboard's trend and heatmap views:
+paper count, similarity and z sums and outlier count per (year, company, study group) cell,
+with each company's sector and industry alongside. Every measure is additive, so any slice
+(sector / industry / companies / groups / years, rolled up along any of them) is a group-by
+sum over the cells and never touches the paper rows.
+
+The year comes from cover_date: taken from the table when it has that column, otherwise
+looked up by title in the ingested papers (data.csv or a parquet directory from
+data/main.py); papers without one get year 0. The study group is
+data.subject_areas.paper_group, and undecided papers are counted as "Unassigned".
+
+Updates are incremental per company in the aggregation only: when the company x paper CSV
+changed, the whole table is still read and every company's rows are fingerprinted (the CSV
+has no per-row change marker), and only companies whose rows changed (new papers, rescored
+pairs) are aggregated again; the other cells are kept as they are. When only the companies
+table changed, the paper rows are not read at all and the cells just get the new sector /
+industry.
+
+    python -m app.alignment_cube                          # app/alignment_cube.pkl from the dashboard CSVs
+    python -m app.alignment_cube --papers ./data_parquet  # years from a parquet ingest
+"""
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.dashboard_data import APP_DIR, COMPANIES_CSV, PAPERS_CSV
+from data.company_registry import REGISTRY_PATH, load_registry
+from data.main import iter_ingested
+from data.subject_areas import GROUP_NAMES, encode_areas, paper_group
+
+CUBE_PATH = os.path.join(APP_DIR, "alignment_cube.pkl")
+PAPERS_SOURCE = os.path.join(os.path.dirname(APP_DIR), "data.csv")
+
+# bump whenever the cell layout changes
+CUBE_VERSION = 1
+
+UNKNOWN_YEAR = 0
+AREA_GROUPS = GROUP_NAMES + ["Unassigned"]
+MEASURES = ["papers", "value_sum", "z_sum", "outliers"]
+FINGERPRINT_COLS = ["title", "areas", "value", "z_by_company", "cover_date"]
+
+
+def normalize_title(title):
+    return " ".join(str(title).lower().split())
+
+
+def to_year(dates):
+    """Year of each cover date string (YYYY-MM-DD), UNKNOWN_YEAR where missing or malformed."""
+    years = pd.to_numeric(pd.Series(dates, dtype=object).astype(str).str[:4], errors="coerce")
+    return years.fillna(UNKNOWN_YEAR).astype(np.int16).to_numpy()
+
+
+def cover_years(titles, source, chunk_size=50_000):
+    """Years for the given titles, looked up by normalized title in the ingested papers (first match wins)."""
+    codes, unique_titles = pd.factorize(pd.Series(titles, dtype=object))
+    wanted = {normalize_title(t) for t in unique_titles}
+    found = {}
+    if source and os.path.exists(source):
+        for chunk in iter_ingested(source, columns=["title", "cover_date"], chunk_size=chunk_size):
+            keys = chunk["title"].map(normalize_title)
+            hit = keys.isin(wanted)
+            for key, date in zip(keys[hit], chunk["cover_date"][hit]):
+                found.setdefault(key, date)
+            if len(found) == len(wanted):
+                break
+    years = to_year([found.get(normalize_title(t)) for t in unique_titles])
+    return years[codes] if len(codes) else years
+
+
+def fingerprints(papers):
+    """Order-independent hash of each company's rows, as a Series indexed by company_id."""
+    cols = [c for c in FINGERPRINT_COLS if c in papers.columns]
+    # rounded, so a CSV rewrite that changes the last float digit does not count as a change
+    row_hash = pd.util.hash_pandas_object(papers[cols].round(9), index=False).to_numpy()
+    ids = papers["company_id"].to_numpy()
+    order = np.argsort(ids, kind="stable")
+    ids, row_hash = ids[order], row_hash[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else np.empty(0, np.int64)
+    # uint64 sums wrap around, which keeps them order-independent
+    sums = np.add.reduceat(row_hash, starts) if len(ids) else row_hash
+    return pd.Series(sums, index=ids[starts], dtype=np.uint64)
+
+
+def aggregate(papers, years, z_cut=3):
+    """Cells (year, company_id, area_group) with the summed measures for the given paper rows."""
+    # a paper repeats once per matched company: parse each distinct areas string once
+    codes, unique_areas = pd.factorize(papers["areas"])
+    vocab, matrix = encode_areas(pd.Series(unique_areas, dtype=object))
+    # a missing areas value gets code -1 and stays unassigned
+    groups = np.where(codes >= 0, paper_group(matrix, vocab)[codes], -1) if len(codes) else np.empty(0, np.int64)
+    z = papers["z_by_company"].to_numpy(dtype=float)
+    rows = pd.DataFrame({
+        "year": years,
+        "company_id": papers["company_id"].to_numpy(),
+        "area_group": np.where(groups >= 0, groups, len(GROUP_NAMES)),
+        "papers": 1,
+        "value_sum": papers["value"].to_numpy(dtype=float),
+        "z_sum": z,
+        "outliers": (z > z_cut).astype(np.int64),
+    })
+    cells = rows.groupby(["year", "company_id", "area_group"], sort=False)[MEASURES].sum().reset_index()
+    cells["area_group"] = pd.Categorical.from_codes(cells["area_group"], AREA_GROUPS)
+    return cells
+
+
+def attach_companies(cells, companies):
+    """(Re)set each cell's company name, sector and industry from the companies table."""
+    info = companies.drop_duplicates("company_id").set_index("company_id")
+    cells = cells.drop(columns=[c for c in ("company_name", "sector", "industry") if c in cells.columns])
+    for col in ("company_name", "sector", "industry"):
+        cells[col] = pd.Categorical(cells["company_id"].map(info[col]))
+    return cells
+
+
+def build_cube(companies_csv=COMPANIES_CSV, papers_csv=PAPERS_CSV, registry_path=REGISTRY_PATH,
+               papers_source=PAPERS_SOURCE, cube=None, z_cut=3):
+    """
+    Build the cube, or update ``cube`` (an earlier result) in place of a rebuild: only the
+    companies whose rows changed, and those with undated papers when the papers source
+    changed, are aggregated again. A changed papers_csv is still read and fingerprinted in
+    full; an unchanged one (same mtime, same papers source) is not read at all.
+    """
+    t0 = time.perf_counter()
+    companies = pd.read_csv(companies_csv, usecols=["company_name", "sector", "industry"])
+    source_mtime = os.path.getmtime(papers_source) if papers_source and os.path.exists(papers_source) else None
+    reusable = (cube is not None and cube.get("version") == CUBE_VERSION and cube["z_cut"] == z_cut
+                and cube["papers_source"] == papers_source)
+    papers_unchanged = (reusable and os.path.exists(papers_csv) and cube["papers_source_mtime"] == source_mtime
+                        and cube["sources"].get(papers_csv) == os.path.getmtime(papers_csv))
+    papers = (None if papers_unchanged
+              else pd.read_csv(papers_csv, usecols=lambda c: c in {"company", *FINGERPRINT_COLS}))
+
+    registry = load_registry(registry_path)
+    n_registered = len(registry)
+    companies["company_id"] = registry.add_many(companies["company_name"].tolist())
+    if papers is not None:
+        papers["company_id"] = registry.add_many(papers["company"].tolist()) if len(papers) else np.empty(0, np.int64)
+        # rows without a company name (MISSING_ID) belong to no cell
+        papers = papers[papers["company_id"] >= 0]
+    if len(registry) != n_registered:
+        try:
+            registry.save(registry_path)
+        except OSError:
+            pass
+
+    if papers_unchanged:
+        cells = attach_companies(cube["cells"], companies)
+        return {**cube, "sources": {p: os.path.getmtime(p) for p in (companies_csv, papers_csv) if os.path.exists(p)},
+                "cells": cells,
+                "last_update": {"companies_updated": 0, "rows_aggregated": 0, "rows_read": 0,
+                                "cells": len(cells), "seconds": time.perf_counter() - t0}}
+
+    digests = fingerprints(papers)
+    if reusable:
+        old = cube["fingerprints"]
+        common = digests.index.intersection(old.index)
+        changed = set(digests.index.difference(old.index)) | set(common[digests[common] != old[common]])
+        if cube["papers_source_mtime"] != source_mtime and "cover_date" not in papers.columns:
+            cells = cube["cells"]
+            changed |= set(cells.loc[cells["year"] == UNKNOWN_YEAR, "company_id"])
+        keep = cube["cells"][~cube["cells"]["company_id"].isin(changed) & cube["cells"]["company_id"].isin(digests.index)]
+    else:
+        changed = set(digests.index)
+        keep = None
+
+    rows = papers[papers["company_id"].isin(changed)]
+    years = (to_year(rows["cover_date"]) if "cover_date" in rows.columns
+             else cover_years(rows["title"].tolist(), papers_source))
+    cells = aggregate(rows, years, z_cut)
+    if keep is not None:
+        cells = pd.concat([keep[cells.columns], cells], ignore_index=True)
+        cells["area_group"] = pd.Categorical(cells["area_group"], AREA_GROUPS)
+    cells = attach_companies(cells, companies)
+    cells = cells.sort_values(["company_id", "year", "area_group"], kind="stable").reset_index(drop=True)
+
+    return {
+        "version": CUBE_VERSION,
+        "sources": {p: os.path.getmtime(p) for p in (companies_csv, papers_csv) if os.path.exists(p)},
+        "papers_source": papers_source,
+        "papers_source_mtime": source_mtime,
+        "z_cut": z_cut,
+        "cells": cells,
+        "fingerprints": digests,
+        "last_update": {"companies_updated": len(changed), "rows_aggregated": len(rows), "rows_read": len(papers),
+                        "cells": len(cells), "seconds": time.perf_counter() - t0},
+    }
+
+
+def save_cube(cube, path=CUBE_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(cube, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def is_stale(cube):
+    if cube.get("version") != CUBE_VERSION:
+        return True
+    source = cube["papers_source"]
+    if (os.path.getmtime(source) if source and os.path.exists(source) else None) != cube["papers_source_mtime"]:
+        return True
+    return any(not os.path.exists(p) or os.path.getmtime(p) != m for p, m in cube["sources"].items())
+
+
+def load_cube(path=CUBE_PATH):
+    """Load the prebuilt cube; bring it up to date (incrementally) when its CSVs or the papers source changed."""
+    cube = None
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            cube = pickle.load(f)
+        if not is_stale(cube):
+            return cube
+    cube = build_cube(cube=cube)
+    try:
+        save_cube(cube, path)
+    except OSError:
+        pass
+    return cube
+
+
+def rollup(cells, by, company_ids=None, area_groups=None, years=None):
+    """
+    Measures summed over the cells matching the filters, one row per combination of ``by``
+    (e.g. ["year", "area_group"]), with mean similarity / mean z per paper.
+    """
+    mask = np.ones(len(cells), dtype=bool)
+    if company_ids is not None:
+        mask &= np.isin(cells["company_id"].to_numpy(), np.asarray(company_ids))
+    if area_groups is not None:
+        mask &= cells["area_group"].isin(area_groups).to_numpy()
+    if years is not None:
+        mask &= np.isin(cells["year"].to_numpy(), np.asarray(years))
+    out = cells.loc[mask].groupby(list(by), observed=True, sort=True)[MEASURES].sum().reset_index()
+    out["mean_similarity"] = out["value_sum"] / out["papers"]
+    out["mean_z"] = out["z_sum"] / out["papers"]
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--companies", default=COMPANIES_CSV)
+    parser.add_argument("--company-papers", default=PAPERS_CSV, help="company x paper table (grouped_nonnormalized_complete.csv)")
+    parser.add_argument("--papers", default=PAPERS_SOURCE, help="ingested papers for the cover dates: data.csv or a parquet directory")
+    parser.add_argument("--registry", default=REGISTRY_PATH)
+    parser.add_argument("--out", default=CUBE_PATH)
+    parser.add_argument("--z-cut", type=float, default=3)
+    parser.add_argument("--rebuild", action="store_true", help="ignore the existing cube")
+    args = parser.parse_args()
+
+    previous = None
+    if os.path.exists(args.out) and not args.rebuild:
+        with open(args.out, "rb") as f:
+            previous = pickle.load(f)
+    cube = build_cube(args.companies, args.company_papers, args.registry, args.papers, previous, args.z_cut)
+    save_cube(cube, args.out)
+    cells = cube["cells"]
+    undated = int(cells.loc[cells["year"] == UNKNOWN_YEAR, "papers"].sum())
+    print(f"Wrote {args.out}: {len(cells)} cells, {int(cells['papers'].sum())} papers ({undated} without a year); "
+          f"{cube['last_update']['rows_read']} rows read, {cube['last_update']['companies_updated']} companies "
+          f"aggregated in {cube['last_update']['seconds']:.2f}s")
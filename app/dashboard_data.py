@@ -0,0 +1,204 @@
+import os
+import pickle
+import sys
+import textwrap
+
+import numpy as np
+import pandas as pd
+
+from app.paper_query import PAPERS_PARQUET, write_papers_parquet
+from data.company_registry import REGISTRY_PATH, normalize_name, load_registry, key_papers
+from data.subject_areas import parse_areas, encode_areas, vocab_labels, study_group_array
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACT_PATH = os.path.join(APP_DIR, "dashboard_artifact.pkl")
+COMPANIES_CSV = os.path.join(APP_DIR, "withZ.csv")
+PAPERS_CSV = os.path.join(APP_DIR, "grouped_nonnormalized_complete.csv")
+
+# bump whenever the artifact layout or the hover HTML changes
+ARTIFACT_VERSION = 4
+
+
+def format_row(c1, c2, c3, color, is_bold=False):
+    w1, w2, w3 = 16, 8, 8
+    c1 = str(c1)[:w1]
+    c2 = str(c2)[:w2]
+    c3 = str(c3)[:w3]
+    row_str = f"{c1:<{w1}} {c2:^{w2}} {c3:>{w3}}".replace(" ", "&nbsp;")
+    weight = "bold" if is_bold else "normal"
+    return f"<span style='color:{color}; font-weight:{weight};'>{row_str}</span><br>"
+
+
+def items_html(items):
+    """The top-3 paper rows shared by the company and industry hovers."""
+    html = format_row("Paper Title", "Val", "Z-Scr", "#999999")
+    if items:
+        for item in items:
+            title = str(item.get('title', '-'))
+            val = f"{item.get('value', 0):.2f}"
+            z_val = f"{item.get('z_by_company', 0):.2f}"
+            html += format_row(title, val, z_val, "black")
+        for _ in range(3 - len(items)): html += format_row("", "", "", "white")
+    else:
+        html += format_row("No Data Found", "-", "-", "#999")
+        html += format_row("", "", "", "white")
+        html += format_row("", "", "", "white")
+    return html
+
+
+# Company hover --> the UI popup when u hover ur mouse
+def build_hover_content(row, top_items_map):
+
+    header_text = row['sector'].upper()[:25]
+    html = format_row(header_text, "", "", "#1A237E", is_bold=True)
+    html += "<span style='font-size:4px'>&nbsp;</span><br>"
+
+    price = f"฿{row['market_cap']/1e9:.0f}B"
+    pct = f"{row['total_alignment_score']:.2f}"
+    main_color = "#2E7D32" if row['total_alignment_score'] > 0 else "#D32F2F"
+
+    html += format_row("Company Name", "Market Cap", "Align. Val", "#000000")
+    html += format_row(row['company_name'], price, f"{pct}", main_color, is_bold=True)
+    html += "<span style='font-size:4px'>&nbsp;</span><br>"
+
+    items = top_items_map.get(row['company_name'])
+    if not items:
+        clean_name = normalize_name(row['company_name'])
+        items = top_items_map.get(clean_name, [])
+
+    return html + items_html(items)
+
+
+# hover func for the industry part
+def build_industry_hover_content(row, top_industry_items_map):
+
+    header_text = str(row['sector']).upper()[:25]
+    html = format_row(header_text, "", "", "#1A237E", is_bold=True)
+    html += "<span style='font-size:4px'>&nbsp;</span><br>"
+
+    price = f"฿{row['market_cap']/1e9:.0f}B"
+    pct = f"{row['total_alignment_score']:.2f}"
+    main_color = "#2E7D32" if row['total_alignment_score'] > 0 else "#D32F2F"
+
+    html += format_row("Industry", "Total Cap", "Avg Align", "#000000")
+    html += format_row(row['industry'], price, f"{pct}", main_color, is_bold=True)
+    html += "<span style='font-size:4px'>&nbsp;</span><br>"
+
+    return html + items_html(top_industry_items_map.get(row['industry'], []))
+
+
+def wrap_labels(text, width=15):
+    return "<br>".join(textwrap.wrap(str(text), width=width))
+
+
+def build_artifact(companies_csv=COMPANIES_CSV, papers_csv=PAPERS_CSV, registry_path=REGISTRY_PATH,
+                   papers_path=PAPERS_PARQUET):
+    """
+    Resolve every lookup the dashboard needs once, offline, instead of on each rerun.
+    The paper rows themselves go to papers_path (parquet, queried by PaperQuery); the
+    artifact only keeps what every rerun needs.
+    """
+    df_raw = pd.read_csv(companies_csv)
+    try:
+        dff = pd.read_csv(papers_csv)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        dff = pd.DataFrame(columns=["company", "title", "areas", "value", "z_by_company"])
+
+    # get unique list of companies (actually have papers)
+    search_options = sorted(dff['company'].dropna().unique().tolist()) if not dff.empty else []
+
+    # stable company ids; papers sorted by (company_id, value desc) so a company's papers are a slice
+    registry = load_registry(registry_path)
+    n_registered = len(registry)
+    df_raw['company_id'] = registry.add_many(df_raw['company_name'].tolist())
+    dff, paper_offsets = key_papers(dff, registry)
+    if len(registry) != n_registered:
+        try:
+            registry.save(registry_path)
+        except OSError:
+            pass
+
+    # join keys + industry assignment for every paper
+    df_raw['clean_name'] = df_raw['company_name'].map(normalize_name)
+    comp_to_ind_map = dict(zip(df_raw['clean_name'], df_raw['industry']))
+    comp_to_ind_map.update(zip(df_raw['company_name'], df_raw['industry']))
+    dff['clean_name'] = dff['company'].map(normalize_name)
+    dff['industry'] = dff['clean_name'].map(comp_to_ind_map)
+    dff['sector'] = dff['clean_name'].map(dict(zip(df_raw['clean_name'], df_raw['sector'])))
+
+    # company / industry ---> top 3 papers
+    top_items_map = {}
+    top_industry_items_map = {}
+    if not dff.empty:
+        for cid in np.flatnonzero(np.diff(paper_offsets)):
+            company_name = registry.names[cid]
+            start = paper_offsets[cid]
+            top_rows = dff.iloc[start:start + 3][['title', 'value', 'z_by_company']].to_dict('records')
+            top_items_map[normalize_name(company_name)] = top_rows
+            top_items_map[company_name] = top_rows
+        dff_sorted = dff.sort_values(by="value", ascending=False)
+        for ind_name, group in dff_sorted.dropna(subset=['industry']).groupby("industry"):
+            top_industry_items_map[ind_name] = group[['title', 'value', 'z_by_company']].head(3).to_dict('records')
+
+    # subject areas parsed once: CSR indicator matrix aligned with paper_id, plus a display string
+    area_vocab, area_matrix = encode_areas(dff['areas'])
+    area_labels = vocab_labels(area_vocab)
+    paper_industry, industry_names = pd.factorize(dff['industry'], sort=True)
+    dff['areas_text'] = [", ".join(parse_areas(x)) for x in dff['areas']]
+    write_papers_parquet(dff, papers_path)
+
+    df_raw['hover_content'] = [build_hover_content(row, top_items_map) for _, row in df_raw.iterrows()]
+    df_raw['wrapped_name'] = df_raw['company_name'].map(lambda x: wrap_labels(x, width=22))
+
+    return {
+        "version": ARTIFACT_VERSION,
+        "sources": {p: os.path.getmtime(p) for p in (companies_csv, papers_csv, registry_path) if os.path.exists(p)},
+        "companies": df_raw,
+        "papers_path": papers_path,
+        "n_papers": len(dff),
+        "paper_company_ids": dff['company_id'].to_numpy(),
+        "paper_industry": paper_industry,
+        "industry_names": list(industry_names),
+        "area_labels": area_labels,
+        "area_matrix": area_matrix,
+        "area_groups": study_group_array(area_vocab),
+        "registry": registry,
+        "search_options": search_options,
+        "top_items_map": top_items_map,
+        "top_industry_items_map": top_industry_items_map,
+    }
+
+
+def save_artifact(artifact, path=ARTIFACT_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def is_stale(artifact):
+    if artifact.get("version") != ARTIFACT_VERSION or not os.path.exists(artifact["papers_path"]):
+        return True
+    return any(not os.path.exists(p) or os.path.getmtime(p) != m for p, m in artifact["sources"].items())
+
+
+def load_artifact(path=ARTIFACT_PATH):
+    """Load the prebuilt artifact; rebuild it if it is missing, from an older version or older than its CSVs."""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            artifact = pickle.load(f)
+        if not is_stale(artifact):
+            return artifact
+    artifact = build_artifact()
+    try:
+        save_artifact(artifact, path)
+    except OSError:
+        pass
+    return artifact
+
+
+if __name__ == "__main__":
+    out = sys.argv[1] if len(sys.argv) > 1 else ARTIFACT_PATH
+    artifact = build_artifact()
+    save_artifact(artifact, out)
+    print(f"Wrote {out}: {len(artifact['companies'])} companies, {artifact['n_papers']} papers in {artifact['papers_path']}")
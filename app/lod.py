@@ -0,0 +1,82 @@
+import pandas as pd
+
+from app.dashboard_data import format_row, wrap_labels
+
+OTHERS_PREFIX = "Others"
+
+
+def is_others(name):
+    return isinstance(name, str) and name.startswith(OTHERS_PREFIX + " (")
+
+
+def compact_hover(row):
+    """One-line hover for leaves that are not drilled into; the full HTML is sent only on expansion."""
+    return f"<b>{row['company_name']}</b><br>฿{row['market_cap']/1e9:.0f}B | Align. {row['total_alignment_score']:.2f}"
+
+
+def others_hover(row, members):
+    header_text = str(row['industry']).upper()[:25]
+    html = format_row(header_text, "", "", "#1A237E", is_bold=True)
+    html += "<span style='font-size:4px'>&nbsp;</span><br>"
+    html += format_row("Grouped", "Total Cap", "Avg Align", "#000000")
+    html += format_row(f"{len(members)} companies", f"฿{row['market_cap']/1e9:.0f}B",
+                       f"{row['total_alignment_score']:.2f}", "#555555", is_bold=True)
+    for name in members[:3]:
+        html += format_row(name, "", "", "black")
+    if len(members) > 3:
+        html += format_row(f"+{len(members) - 3} more", "", "", "#999999")
+    return html + format_row("Expand the industry to see each company", "", "", "#999999")
+
+
+def level_of_detail(df, threshold, expanded=(), group_col="industry", size_col="market_cap"):
+    """
+    Collapse every company whose size is below ``threshold`` (a fraction of the view's total
+    size) into one "Others (n)" row per industry. Industries in ``expanded`` keep all their
+    companies with the full hover HTML; leaves elsewhere get compact_hover. Returns the
+    reduced frame and the list of industries that have an Others node.
+    """
+    if df.empty:
+        return df, []
+    df = df.copy()
+    expanded = set(expanded)
+    is_open = df[group_col].isin(expanded).to_numpy()
+    small = (df[size_col] < threshold * df[size_col].sum()).to_numpy() & ~is_open
+
+    if (~is_open).any():
+        df.loc[~is_open, "hover_content"] = df.loc[~is_open].apply(compact_hover, axis=1)
+    keep = df[~small]
+
+    rows, grouped = [], []
+    for ind, group in df[small].groupby(group_col, sort=True):
+        # a single small company is cheaper to send than an Others node
+        if len(group) == 1:
+            rows.append(group)
+            continue
+        members = group.sort_values(size_col, ascending=False)["company_name"].tolist()
+        name = f"{OTHERS_PREFIX} ({len(group)})"
+        row = {
+            "company_id": -1,
+            "company_name": name,
+            "wrapped_name": wrap_labels(name, width=22),
+            "sector": group["sector"].iloc[0],
+            group_col: ind,
+            size_col: group[size_col].sum(),
+            "total_alignment_score": group["total_alignment_score"].mean(),
+        }
+        row["hover_content"] = others_hover(row, members)
+        rows.append(pd.DataFrame([row]))
+        grouped.append(ind)
+
+    out = pd.concat([keep] + rows, ignore_index=True) if rows else keep.reset_index(drop=True)
+    return out, grouped
+
+
+def payload_bytes(fig_json):
+    return len(fig_json.encode("utf-8"))
+
+
+def fmt_bytes(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1024 or unit == "MB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
@@ -0,0 +1,103 @@
+import itertools
+import os
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+PAPERS_PARQUET = os.path.join(APP_DIR, "papers.parquet")
+
+# longer IN lists are joined as a registered frame instead of one bound parameter per value
+IN_LIST_MAX = 256
+_relation_ids = itertools.count()
+
+
+def write_papers_parquet(papers, path=PAPERS_PARQUET, row_group_size=2048):
+    """
+    Write the paper table for PaperQuery. Rows are expected sorted by company_id (key_papers),
+    so every row group covers a narrow company_id range and equality filters on it skip
+    most of the file using the row-group min/max statistics.
+    """
+    papers = papers.drop(columns=[c for c in papers.columns if c.startswith("Unnamed")])
+    papers = papers.copy()
+    papers.insert(0, "paper_id", np.arange(len(papers), dtype=np.int64))
+    tmp = path + ".tmp"
+    papers.to_parquet(tmp, index=False, row_group_size=row_group_size)
+    os.replace(tmp, path)
+
+
+class PaperQuery:
+    """
+    Read-only SQL access to papers.parquet through an embedded DuckDB connection. Filters,
+    ordering and limits run inside DuckDB against the file, so only the requested rows are
+    materialized in pandas.
+
+    ``where`` is a dict of column -> value (equality) or list/tuple (IN); values are bound
+    as parameters (long lists as a registered one-column frame) and column names are
+    checked against the file's schema.
+    """
+
+    def __init__(self, path=PAPERS_PARQUET):
+        self.path = path
+        self.con = duckdb.connect()
+        escaped = path.replace("'", "''")
+        self.con.execute(f"CREATE VIEW papers AS SELECT * FROM read_parquet('{escaped}')")
+        self.columns = [r[0] for r in self.con.execute("DESCRIBE papers").fetchall()]
+
+    def _column(self, name):
+        if name not in self.columns:
+            raise KeyError(f"unknown column {name!r}")
+        return f'"{name}"'
+
+    def _where(self, where):
+        clauses, params, relations = [], [], {}
+        for col, value in (where or {}).items():
+            if isinstance(value, (list, tuple, set, np.ndarray)):
+                if len(value) == 0:
+                    clauses.append("FALSE")
+                    continue
+                if len(value) > IN_LIST_MAX:
+                    name = f"in_values_{next(_relation_ids)}"
+                    relations[name] = pd.DataFrame({"v": np.asarray(list(value) if isinstance(value, set) else value)})
+                    clauses.append(f"{self._column(col)} IN (SELECT v FROM {name})")
+                    continue
+                value = list(value)
+                clauses.append(f"{self._column(col)} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif value is None:
+                clauses.append(f"{self._column(col)} IS NULL")
+            else:
+                clauses.append(f"{self._column(col)} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), [_py(p) for p in params], relations
+
+    def _execute(self, query, params, relations):
+        # a cursor per call: the connection is shared by every Streamlit session thread
+        cursor = self.con.cursor()
+        for name, frame in relations.items():
+            cursor.register(name, frame)
+        return cursor.execute(query, params)
+
+    def _select(self, columns):
+        return ", ".join(self._column(c) for c in columns) if columns else "*"
+
+    def count(self, where=None):
+        sql, params, relations = self._where(where)
+        return self._execute(f"SELECT count(*) FROM papers{sql}", params, relations).fetchone()[0]
+
+    def page(self, where=None, columns=None, order_by="value", descending=True, page=0, page_size=50):
+        """Rows page*page_size .. (page+1)*page_size of the filtered, ordered table."""
+        sql, params, relations = self._where(where)
+        direction = "DESC" if descending else "ASC"
+        query = (f"SELECT {self._select(columns)} FROM papers{sql} "
+                 f"ORDER BY {self._column(order_by)} {direction}, paper_id LIMIT ? OFFSET ?")
+        return self._execute(query, params + [int(page_size), int(page) * int(page_size)], relations).df()
+
+    def top_k(self, where=None, k=10, columns=None, order_by="value"):
+        return self.page(where, columns, order_by, descending=True, page=0, page_size=k)
+
+
+def _py(value):
+    # numpy scalars (e.g. company ids) are not accepted as DuckDB parameters
+    return value.item() if isinstance(value, np.generic) else value
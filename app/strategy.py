@@ -1,7 +1,26 @@
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.io as pio
 import streamlit as st
-import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from app.dashboard_data import load_artifact, build_industry_hover_content
+from app.view_cache import ViewCache
+from app.paper_query import PaperQuery
+from data.subject_areas import parse_areas, rows_with_any, area_counts, breakdown, group_indicator, GROUP_NAMES
+from app.lod import level_of_detail, is_others, payload_bytes, fmt_bytes
+from app.alignment_cube import load_cube, rollup, AREA_GROUPS, UNKNOWN_YEAR
+from model.ann_index import load_index, baseline_sample, provisional_alignment
+from model.encoder import load_model, DEFAULT_MODEL_ID
+from profiling.instrument import span, memory_snapshot, recorder
 
 
 st.set_page_config(
@@ -9,6 +28,9 @@ st.set_page_config(
     layout="wide",
 )
 
+# timed end to end; per-stage spans below land in the same recorder (see the rerun timings panel)
+rerun_span = span("rerun")
+
 st.markdown("""
 <style>
 .market-map-font {
@@ -29,69 +51,71 @@ hide_x_button_css = """
 st.markdown(hide_x_button_css, unsafe_allow_html=True)
 
 
-@st.cache_data
-def load_data():
-    df_main = pd.read_csv("withZ.csv")
+# lookups, industry assignments and hover HTML are prebuilt by dashboard_data.py;
+# loaded once per server and shared across sessions (treat as read-only)
+@st.cache_resource
+def load_dashboard():
+    return load_artifact()
+
+artifact = load_dashboard()
+df_raw = artifact["companies"]
+registry = artifact["registry"]
+search_options = artifact["search_options"]
+top_industry_items_map = artifact["top_industry_items_map"]
+
+
+# paper rows stay on disk; tables pull only the rows they show
+@st.cache_resource
+def load_paper_query(path):
+    return PaperQuery(path)
+
+paper_query = load_paper_query(artifact["papers_path"])
+PAPER_COLS = ['title', 'areas_text', 'value']
+
+# level of detail is switched on by default above this many companies
+LOD_AUTO_COMPANIES = 200
+
+
+# paper embeddings + ANN index for the what-if tab, shared across sessions
+@st.cache_resource
+def load_paper_index():
     try:
-        df_details = pd.read_csv("grouped_nonnormalized_complete.csv")
-    except:
-        df_details = pd.DataFrame(columns=["company", "title", "value", "z_by_company"])
-    return df_main, df_details
-
-df_raw, dff = load_data()
-
-
-# get unique list of companies (actually have papers)
-if not dff.empty:
-    search_options = sorted(dff['company'].dropna().unique().tolist())
-else:
-    search_options = []
-
-
-def normalize_name(name):
-    if not isinstance(name, str): return ""
-    name = name.lower()
-    for bad_str in ["public company limited", "pcl", "limited", "company", "(thailand)", "inc.", "corp."]:
-        name = name.replace(bad_str, "")
-    return name.strip()
-
-# for looking up company
-top_items_map = {}
-if not dff.empty:
-    dff_sorted = dff.sort_values(by="value", ascending=False)
-    for company_name, group in dff_sorted.groupby("company"):
-        top_rows = group[['title', 'value', 'z_by_company']].head(3).to_dict('records')
-        clean_key = normalize_name(company_name)
-        top_items_map[clean_key] = top_rows
-        top_items_map[company_name] = top_rows
-
-# for looking up industry
-top_industry_items_map = {}
-dff_with_ind = pd.DataFrame() 
-
-if not dff.empty and not df_raw.empty:
-
-    # map normalized Company Name ---> industry
-    comp_to_ind_map = {}
-    for _, row in df_raw.iterrows():
-        clean_name = normalize_name(row['company_name'])
-        comp_to_ind_map[clean_name] = row['industry']
-        comp_to_ind_map[row['company_name']] = row['industry'] 
-    
-    # assign industry to paper
-    dff_ind = dff.copy()
-    dff_ind['temp_clean_name'] = dff_ind['company'].apply(normalize_name)
-    dff_ind['industry'] = dff_ind['temp_clean_name'].map(comp_to_ind_map)
-    
-    # save this for the click-action table in Tab 2
-    dff_with_ind = dff_ind.copy()
+        store, index = load_index(os.path.join(ROOT, "paper_store"))
+    except FileNotFoundError:
+        return None, None, None
+    return store, index, baseline_sample(store.vectors)
+
+@st.cache_resource
+def load_encoder(model_id):
+    return load_model(model_id)
+
+
+# year x company x study group rollup for the trend / heatmap views, shared across sessions
+@st.cache_resource
+def load_alignment_cube():
+    return load_cube()
+
+
+# filtered frames and figure JSON keyed by the sidebar filters, shared across sessions
+@st.cache_resource
+def get_view_cache():
+    return ViewCache(max_entries=64)
+
+view_cache = get_view_cache()
+
+
+def papers_for(name, k=10):
+    """(paper count, top-k papers by similarity) for a company; the parquet is sorted by company id, so this reads a few row groups."""
+    where = {"company_id": registry.resolve(name)}
+    with span("rerun.paper_query"):
+        return paper_query.count(where), paper_query.top_k(where, k=k, columns=PAPER_COLS)
+
+
+def format_areas(disp):
+    # areas_text is joined once when the artifact is built
+    disp.columns = ["Title", "Subject Area", "Similarity Score"]
+    return disp
 
-    # group by industry ---> top 3 papers
-    dff_ind_sorted = dff_ind.dropna(subset=['industry']).sort_values(by="value", ascending=False)
-    
-    for ind_name, group in dff_ind_sorted.groupby("industry"):
-        top_rows = group[['title', 'value', 'z_by_company']].head(3).to_dict('records')
-        top_industry_items_map[ind_name] = top_rows
 
 with st.sidebar:
     st.header("Dashboard Controls")
@@ -110,19 +134,64 @@ with st.sidebar:
     selected_industry = st.selectbox("Filter by Industry", industries)
     search = st.text_input("Search Company", placeholder="Type company name")
 
+    st.divider()
+    lod_on = st.checkbox("Level of detail", value=len(df_raw) > LOD_AUTO_COMPANIES,
+                         help="Group each industry's small companies into an Others node; expand an industry to load its companies.")
+    lod_threshold = st.slider("Group companies below (% of shown market cap)", 0.0, 5.0, 0.5, 0.1,
+                              disabled=not lod_on) / 100
+    # clicking an Others point in the scatter queues its industry for expansion
+    if "lod_pending" in st.session_state:
+        st.session_state["lod_expanded"] = sorted(set(st.session_state.get("lod_expanded", [])) | {st.session_state.pop("lod_pending")})
+    lod_expanded = st.multiselect("Expand industries", sorted(df_raw["industry"].unique()), key="lod_expanded",
+                                  disabled=not lod_on)
+
+
+def filter_companies(sector, industry, search):
+    df_viz = df_raw
+
+    if sector != "All Sectors":
+        df_viz = df_viz[df_viz["sector"] == sector]
+
+    if industry != "All Industries":
+        df_viz = df_viz[df_viz["industry"] == industry]
+
+    note = None
+    if search != "":
+        df_match = df_viz[df_viz["company_name"].str.contains(search, case=False, regex=False)]
+        if df_match.empty:
+            # nothing contains the text as typed: fall back to the closest names
+            fuzzy_ids = [cid for cid, _, _ in registry.fuzzy(search)]
+            df_match = df_viz[df_viz["company_id"].isin(fuzzy_ids)]
+            if not df_match.empty:
+                note = "No exact match; showing closest names: " + ", ".join(df_match["company_name"])
+        df_viz = df_match
+    return df_viz, note
+
+
+filter_key = (selected_sector, selected_industry, search.strip())
+with span("rerun.filter"):
+    df_viz, search_note = view_cache.get_or_build(("companies",) + filter_key, lambda: filter_companies(*filter_key))
+if search_note:
+    st.sidebar.caption(search_note)
+
+lod_key = (lod_threshold, tuple(sorted(lod_expanded))) if lod_on else None
+with span("rerun.lod"):
+    if lod_on:
+        df_map, lod_grouped = view_cache.get_or_build(
+            ("lod", lod_key) + filter_key, lambda: level_of_detail(df_viz, lod_threshold, lod_expanded))
+    else:
+        df_map, lod_grouped = df_viz, []
 
-    
-
-df_viz = df_raw.copy()
-
-if selected_sector != "All Sectors":
-    df_viz = df_viz[df_viz["sector"] == selected_sector]
-
-if selected_industry != "All Industries":
-    df_viz = df_viz[df_viz["industry"] == selected_industry]
 
-if search.strip() != "":
-    df_viz = df_viz[df_viz["company_name"].str.contains(search, case=False)]
+def show_figure(key, build, **chart_kwargs):
+    """Build the figure JSON (or reuse it from the view cache), render it and report its payload and timings."""
+    with span("rerun.figure_build", figure=key[0]) as build_span:
+        fig_json = view_cache.get_or_build(key, build)
+    with span("rerun.figure_render", figure=key[0]) as render_span:
+        event = st.plotly_chart(pio.from_json(fig_json), use_container_width=True, **chart_kwargs)
+    st.caption(f"Payload {fmt_bytes(payload_bytes(fig_json))}"
+               f" · build {build_span.duration_ms:.0f} ms · render {render_span.duration_ms:.0f} ms")
+    return event
 
 
 st.title("University-Industry Alignment Dashboard")
@@ -138,122 +207,42 @@ with col4: st.metric("High Alignment Companies", len(df_viz[df_viz["total_alignm
 
 
 
-tab1, tab2, tab3 = st.tabs(["Market Map", "Strategic Gap", "Data Table"])
-
-
-def format_row(c1, c2, c3, color, is_bold=False):
-    w1, w2, w3 = 16, 8, 8 
-    c1 = str(c1)[:w1]
-    c2 = str(c2)[:w2]
-    c3 = str(c3)[:w3]
-    row_str = f"{c1:<{w1}} {c2:^{w2}} {c3:>{w3}}".replace(" ", "&nbsp;")
-    weight = "bold" if is_bold else "normal"
-    return f"<span style='color:{color}; font-weight:{weight};'>{row_str}</span><br>"
-
-# Company hover --> the UI popup when u hover ur mouse 
-def build_hover_content(row):
-
-    header_text = row['sector'].upper()[:25] 
-    html = format_row(header_text, "", "", "#1A237E", is_bold=True)
-    html += "<span style='font-size:4px'>&nbsp;</span><br>" 
-
-    price = f"฿{row['market_cap']/1e9:.0f}B"
-    pct = f"{row['total_alignment_score']:.2f}"
-    main_color = "#2E7D32" if row['total_alignment_score'] > 0 else "#D32F2F"
-    
-    html += format_row("Company Name", "Market Cap", "Align. Val", "#000000")
-    html += format_row(row['company_name'], price, f"{pct}", main_color, is_bold=True)
-    html += "<span style='font-size:4px'>&nbsp;</span><br>"
-
-    items = top_items_map.get(row['company_name'])
-    if not items:
-        clean_name = normalize_name(row['company_name'])
-        items = top_items_map.get(clean_name, [])
-    
-    html += format_row("Paper Title", "Val", "Z-Scr", "#999999")
-    if items:
-        for item in items:
-            title = str(item.get('title', '-'))
-            val = f"{item.get('value', 0):.2f}"
-            z_val = f"{item.get('z_by_company', 0):.2f}"
-            html += format_row(title, val, z_val, "black")
-        for _ in range(3 - len(items)): html += format_row("", "", "", "white")
-    else:
-        html += format_row("No Data Found", "-", "-", "#999")
-        html += format_row("", "", "", "white")
-        html += format_row("", "", "", "white")
-    return html
-
-# hover func for the industry part
-def build_industry_hover_content(row):
-
-    header_text = str(row['sector']).upper()[:25]
-    html = format_row(header_text, "", "", "#1A237E", is_bold=True)
-    html += "<span style='font-size:4px'>&nbsp;</span><br>" 
-    
-
-    price = f"฿{row['market_cap']/1e9:.0f}B"
-    pct = f"{row['total_alignment_score']:.2f}"
-    main_color = "#2E7D32" if row['total_alignment_score'] > 0 else "#D32F2F"
-    
-    html += format_row("Industry", "Total Cap", "Avg Align", "#000000")
-    html += format_row(row['industry'], price, f"{pct}", main_color, is_bold=True)
-    html += "<span style='font-size:4px'>&nbsp;</span><br>"
-    
-
-    items = top_industry_items_map.get(row['industry'], [])
-    
-    html += format_row("Paper Title", "Val", "Z-Scr", "#999999")
-    if items:
-        for item in items:
-            title = str(item.get('title', '-'))
-            val = f"{item.get('value', 0):.2f}"
-            z_val = f"{item.get('z_by_company', 0):.2f}"
-            html += format_row(title, val, z_val, "black")
-        for _ in range(3 - len(items)): html += format_row("", "", "", "white")
-    else:
-        html += format_row("No Data Found", "-", "-", "#999")
-        html += format_row("", "", "", "white")
-        html += format_row("", "", "", "white")
-    return html
-
-
-df_viz['hover_content'] = df_viz.apply(build_hover_content, axis=1)
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["Market Map", "Strategic Gap", "Data Table", "What-If Company", "Trends"])
 
 
 with tab1:
     st.subheader(f"Market Alignment Map: {selected_sector}")
     st.caption("Box Size → Market Cap | Color → Research Fit")
     
-    def wrap_labels(text, width=15):
-        return "<br>".join(textwrap.wrap(str(text), width=width))
-
-    df_viz['wrapped_name'] = df_viz['company_name'].apply(lambda x: wrap_labels(x, width=22))
-    red_green_px_scale = [(0, 'red'), (0.5, 'white'), (1, 'green')]
-
-    fig_treemap = px.treemap(
-        df_viz,
-        path=[px.Constant("All Sectors"), "sector", "industry", "wrapped_name"],
-        values="market_cap",
-        color="total_alignment_score",
-        color_continuous_scale=red_green_px_scale,
-        color_continuous_midpoint=df_viz["total_alignment_score"].mean(),
-        custom_data=['hover_content', 'company_name']
-    )
-    fig_treemap.update_traces(
-        hovertemplate="%{customdata[0]}<extra></extra>",
-        textposition="middle center",
-        texttemplate="<b>%{label}</b>",
-        textfont=dict(family="Verdana", size=20, color="black")
-    )
-    fig_treemap.update_layout(
-        margin=dict(t=20, l=10, r=10, b=80),
-        height=600,
-        hoverlabel=dict(bgcolor="white", bordercolor="#1A237E", font_family="Consolas, monospace", font_size=13, align="left"),
-        coloraxis_colorbar=dict(title="Alignment Score", orientation="h", yanchor="top", y=-0.05, thickness=15)
-    )
-    
-    st.plotly_chart(fig_treemap, use_container_width=True)
+    def build_treemap():
+        red_green_px_scale = [(0, 'red'), (0.5, 'white'), (1, 'green')]
+
+        fig_treemap = px.treemap(
+            df_map,
+            path=[px.Constant("All Sectors"), "sector", "industry", "wrapped_name"],
+            values="market_cap",
+            color="total_alignment_score",
+            color_continuous_scale=red_green_px_scale,
+            color_continuous_midpoint=df_viz["total_alignment_score"].mean(),
+            custom_data=['hover_content', 'company_name']
+        )
+        fig_treemap.update_traces(
+            hovertemplate="%{customdata[0]}<extra></extra>",
+            textposition="middle center",
+            texttemplate="<b>%{label}</b>",
+            textfont=dict(family="Verdana", size=20, color="black")
+        )
+        fig_treemap.update_layout(
+            margin=dict(t=20, l=10, r=10, b=80),
+            height=600,
+            hoverlabel=dict(bgcolor="white", bordercolor="#1A237E", font_family="Consolas, monospace", font_size=13, align="left"),
+            coloraxis_colorbar=dict(title="Alignment Score", orientation="h", yanchor="top", y=-0.05, thickness=15)
+        )
+        return fig_treemap.to_json()
+
+    show_figure(("treemap", lod_key) + filter_key, build_treemap)
+    if lod_grouped:
+        st.caption(f"{len(lod_grouped)} industries have an Others node; expand them in the sidebar to see each company.")
 
 
     st.divider()
@@ -269,19 +258,11 @@ with tab1:
     
     if t1_selection:
 
-        t1_subset = dff[dff['company'] == t1_selection]
-        
-
-        if t1_subset.empty:
-             clean_sel = normalize_name(t1_selection)
-             t1_subset = dff[dff['company'].apply(normalize_name) == clean_sel]
+        t1_count, t1_subset = papers_for(t1_selection)
 
         if not t1_subset.empty:
-            st.markdown(f"**Found {len(t1_subset)} papers for '{t1_selection}'**")
-            disp_t1 = t1_subset[['title', 'areas', 'value']].sort_values('value', ascending=False).head(10)
-
-            disp_t1['areas'] = disp_t1['areas'].apply(lambda x: ", ".join(x) if isinstance(x, list) else str(x).replace("[","").replace("]","").replace("'",""))
-            disp_t1.columns = ["Title", "Subject Area", "Similarity Score"]
+            st.markdown(f"**Found {t1_count} papers for '{t1_selection}'**")
+            disp_t1 = format_areas(t1_subset)
             st.dataframe(disp_t1, use_container_width=True, hide_index=True)
         else:
             st.warning(f"No papers found for '{t1_selection}'")
@@ -295,51 +276,55 @@ with tab2:
     with col_t2:
         view_mode = st.radio("View Type", ["Company View", "Industry View"], horizontal=True)
 
-    if view_mode == "Industry View":
-
-        df_plot = df_viz.groupby("industry").agg({
-            'market_cap': 'sum',
-            'total_alignment_score': 'mean',
-            'sector': 'first' 
-        }).reset_index()
-        
-        df_plot['hover_content'] = df_plot.apply(build_industry_hover_content, axis=1)
-        
-        x_col, y_col, size_col, color_col = "total_alignment_score", "market_cap", "market_cap", "industry"
-        custom_data_cols = ['hover_content', 'industry']
-        
-    else:
+    def build_scatter():
+        if view_mode == "Industry View":
+
+            df_plot = df_viz.groupby("industry").agg({
+                'market_cap': 'sum',
+                'total_alignment_score': 'mean',
+                'sector': 'first' 
+            }).reset_index()
+            
+            df_plot['hover_content'] = df_plot.apply(build_industry_hover_content, axis=1, args=(top_industry_items_map,))
+            
+            x_col, y_col, size_col, color_col = "total_alignment_score", "market_cap", "market_cap", "industry"
+            custom_data_cols = ['hover_content', 'industry']
+            
+        else:
 
-        df_plot = df_viz
-        x_col, y_col, size_col, color_col = "total_alignment_score", "market_cap", "market_cap", "industry"
-        custom_data_cols = ['hover_content', 'company_name']
-
-    fig_scatter = px.scatter(
-        df_plot,
-        x=x_col, y=y_col, size=size_col, color=color_col,
-        custom_data=custom_data_cols,
-        log_y=True,
-        labels={
-            "total_alignment_score": "Research Alignment (Z-Score)",
-            "market_cap": "Market Cap (Log Scale)"
-        },
-        template="plotly_white"
-    )
+            df_plot = df_map
+            x_col, y_col, size_col, color_col = "total_alignment_score", "market_cap", "market_cap", "industry"
+            custom_data_cols = ['hover_content', 'company_name', 'industry']
+
+        fig_scatter = px.scatter(
+            df_plot,
+            x=x_col, y=y_col, size=size_col, color=color_col,
+            custom_data=custom_data_cols,
+            log_y=True,
+            labels={
+                "total_alignment_score": "Research Alignment (Z-Score)",
+                "market_cap": "Market Cap (Log Scale)"
+            },
+            template="plotly_white"
+        )
 
-    fig_scatter.update_traces(hovertemplate="%{customdata[0]}<extra></extra>")
-    fig_scatter.update_layout(
-        legend=dict(orientation="v", y=0.5, x=1.15, xanchor="left", yanchor="middle"),
-        font=dict(family="Inter, sans-serif", size=15),
-        hoverlabel=dict(bgcolor="white", bordercolor="#1A237E", font_family="Consolas, monospace", font_size=13, align="left"),
-        height=600
-    )
+        fig_scatter.update_traces(hovertemplate="%{customdata[0]}<extra></extra>")
+        fig_scatter.update_layout(
+            legend=dict(orientation="v", y=0.5, x=1.15, xanchor="left", yanchor="middle"),
+            font=dict(family="Inter, sans-serif", size=15),
+            hoverlabel=dict(bgcolor="white", bordercolor="#1A237E", font_family="Consolas, monospace", font_size=13, align="left"),
+            height=600
+        )
 
-    median_score = df_plot[x_col].median()
-    median_cap = df_plot[y_col].median()
-    fig_scatter.add_vline(x=median_score, line_dash="dash", line_color="gray", annotation_text="Median Score")
-    fig_scatter.add_hline(y=median_cap, line_dash="dash", line_color="gray", annotation_text="Median Cap")
+        median_score = df_plot[x_col].median()
+        median_cap = df_plot[y_col].median()
+        fig_scatter.add_vline(x=median_score, line_dash="dash", line_color="gray", annotation_text="Median Score")
+        fig_scatter.add_hline(y=median_cap, line_dash="dash", line_color="gray", annotation_text="Median Cap")
+        return fig_scatter.to_json()
 
-    event_2 = st.plotly_chart(fig_scatter, use_container_width=True, on_select="rerun", selection_mode="points")
+    scatter_lod_key = lod_key if view_mode == "Company View" else None
+    event_2 = show_figure(("scatter", view_mode, scatter_lod_key) + filter_key, build_scatter,
+                          on_select="rerun", selection_mode="points")
 
     if isinstance(event_2, dict) and event_2.get("selection") and len(event_2["selection"]["points"]) > 0:
         try:
@@ -347,30 +332,25 @@ with tab2:
             if 'customdata' in point and len(point['customdata']) > 1:
                 selected_id = point['customdata'][1]
                 
-                if view_mode == "Industry View":
+                if is_others(selected_id):
+                      # drill into the grouped industry: its companies and their hovers load on the rerun
+                      st.session_state["lod_pending"] = point['customdata'][2]
+                      st.rerun()
+                elif view_mode == "Industry View":
                       st.markdown(f"Top Papers for Industry: {selected_id}")
-                      if not dff_with_ind.empty:
-                          papers_subset = dff_with_ind[dff_with_ind['industry'] == selected_id]
+                      if artifact["n_papers"]:
+                          with span("rerun.paper_query"):
+                              papers_subset = paper_query.top_k({"industry": selected_id}, k=10, columns=PAPER_COLS)
                           if not papers_subset.empty:
-                              disp_df = papers_subset[['title', 'areas', 'value']].sort_values('value', ascending=False).head(10)
-
-                              disp_df['areas'] = disp_df['areas'].apply(lambda x: ", ".join(x) if isinstance(x, list) else str(x).replace("[","").replace("]","").replace("'",""))
-                              disp_df.columns = ["Title", "Subject Area", "Similarity Score"]
+                              disp_df = format_areas(papers_subset)
                               st.dataframe(disp_df, use_container_width=True, hide_index=True)
                           else:
                               st.info(f"No papers found for industry: {selected_id}")
                 else:
                       st.markdown(f"Top Papers: {selected_id}")
-                      clean_sel = normalize_name(selected_id)
-                      papers_subset = dff[
-                        (dff['company'] == selected_id) | 
-                        (dff['company'].apply(normalize_name) == clean_sel)
-                      ]
+                      _, papers_subset = papers_for(selected_id)
                       if not papers_subset.empty:
-                          disp_df = papers_subset[['title', 'areas', 'value']].sort_values('value', ascending=False).head(10)
-
-                          disp_df['areas'] = disp_df['areas'].apply(lambda x: ", ".join(x) if isinstance(x, list) else str(x).replace("[","").replace("]","").replace("'",""))
-                          disp_df.columns = ["Title", "Subject Area", "Similarity Score"]
+                          disp_df = format_areas(papers_subset)
                           st.dataframe(disp_df, use_container_width=True, hide_index=True)
                       else:
                           st.info(f"No papers found for {selected_id}")
@@ -391,19 +371,11 @@ with tab2:
     
     if t2_selection:
 
-        t2_subset = dff[dff['company'] == t2_selection]
-        
-
-        if t2_subset.empty:
-             clean_sel = normalize_name(t2_selection)
-             t2_subset = dff[dff['company'].apply(normalize_name) == clean_sel]
+        t2_count, t2_subset = papers_for(t2_selection)
 
         if not t2_subset.empty:
-            st.markdown(f"**Found {len(t2_subset)} papers for '{t2_selection}'**")
-            disp_t2 = t2_subset[['title', 'areas', 'value']].sort_values('value', ascending=False).head(10)
-
-            disp_t2['areas'] = disp_t2['areas'].apply(lambda x: ", ".join(x) if isinstance(x, list) else str(x).replace("[","").replace("]","").replace("'",""))
-            disp_t2.columns = ["Title", "Subject Area", "Similarity Score"]
+            st.markdown(f"**Found {t2_count} papers for '{t2_selection}'**")
+            disp_t2 = format_areas(t2_subset)
             st.dataframe(disp_t2, use_container_width=True, hide_index=True)
         else:
             st.warning(f"No papers found for '{t2_selection}'")
@@ -418,4 +390,187 @@ with tab3:
         ]].sort_values("total_alignment_score", ascending=False),
         use_container_width=True
     )
-    
+
+    st.markdown("Papers of Filtered Companies")
+    area_labels = artifact["area_labels"]
+    area_matrix = artifact["area_matrix"]
+    selected_areas = st.multiselect("Filter by Subject Area", area_labels.tolist(), key="paper_areas")
+
+    # papers of the filtered companies as a mask over paper_id; area filters are sparse column lookups
+    all_companies = len(df_viz) == len(df_raw)
+    paper_rows = (np.ones(artifact["n_papers"], dtype=bool) if all_companies
+                  else np.isin(artifact["paper_company_ids"], df_viz["company_id"].to_numpy()))
+    if selected_areas:
+        paper_rows &= rows_with_any(area_matrix, np.flatnonzero(np.isin(area_labels, selected_areas)))
+        # PaperQuery joins a long id list as a registered frame rather than one parameter per paper
+        paper_where = {"paper_id": np.flatnonzero(paper_rows)}
+    else:
+        # no sidebar filter -> no predicate, otherwise push the company ids down to the scan
+        paper_where = {} if all_companies else {"company_id": df_viz["company_id"].tolist()}
+    with span("rerun.paper_query"):
+        n_filtered = paper_query.count(paper_where)
+
+    pc1, pc2 = st.columns([0.2, 0.8])
+    with pc1:
+        page_size = st.selectbox("Rows per page", [25, 50, 100], key="paper_page_size")
+    n_pages = max(1, -(-n_filtered // page_size))
+    with pc2:
+        page_no = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key="paper_page")
+
+    with span("rerun.paper_query"):
+        paper_page = paper_query.page(paper_where, columns=['company'] + PAPER_COLS + ['z_by_company'],
+                                      page=page_no - 1, page_size=page_size)
+    st.caption(f"Page {page_no} of {n_pages} ({n_filtered} papers, sorted by similarity)")
+    st.dataframe(paper_page, use_container_width=True, hide_index=True)
+
+    with st.expander("Subject-Area Breakdown"):
+        counts = area_counts(area_matrix, paper_rows)
+        top_areas = np.argsort(-counts, kind="stable")[:15]
+        top_areas = top_areas[counts[top_areas] > 0]
+        st.bar_chart(pd.DataFrame({"Subject Area": area_labels[top_areas], "Papers": counts[top_areas]}),
+                     x="Subject Area", y="Papers")
+
+        # industry x area counts, folded into the study groups with the precomputed group array
+        industry_names = artifact["industry_names"]
+        by_industry = breakdown(area_matrix, artifact["paper_industry"], len(industry_names), paper_rows)
+        by_group = by_industry @ group_indicator(artifact["area_groups"], len(GROUP_NAMES)).toarray()
+        df_groups = pd.DataFrame(by_group, index=pd.Index(industry_names, name="Industry"), columns=GROUP_NAMES)
+        df_groups = df_groups[df_groups.sum(axis=1) > 0]
+        st.dataframe(df_groups.loc[df_groups.sum(axis=1).sort_values(ascending=False).index], use_container_width=True)
+
+
+with tab4:
+    st.subheader("What-If: Score a New Company")
+    st.caption("Paste a business summary to find aligned papers without rerunning the offline pipeline.")
+
+    paper_store, paper_index, paper_sample = load_paper_index()
+
+    if paper_index is None:
+        st.info("Paper index not found. Build it with `python -m model.ann_index ./paper_store`.")
+    else:
+        whatif_summary = st.text_area("Business summary", height=150, key="whatif_summary")
+
+        if whatif_summary.strip():
+            encoder = load_encoder(paper_store.info.get("model_id") or DEFAULT_MODEL_ID)
+            with span("rerun.whatif") as whatif_span:
+                q_vec = encoder.encode(whatif_summary, convert_to_numpy=True)
+                res = provisional_alignment(q_vec, paper_index, paper_sample, df_raw["total_alignment_score"])
+            elapsed_ms = whatif_span.duration_ms
+
+            m1, m2, m3 = st.columns(3)
+            with m1: st.metric("Provisional Alignment Score", f"{res['alignment_score']:.2f}")
+            with m2: st.metric("Alignment Z (vs. analyzed companies)", f"{res['alignment_z']:.2f}")
+            with m3: st.metric("Aligned Papers (z > 3)", int(res["hits"].sum()))
+            st.caption(f"Encoded and scored in {elapsed_ms:.0f} ms. Z-scores are estimated from a sample of papers.")
+
+            top_rows = paper_store.rows(res["ids"][:10])
+            disp_w = pd.DataFrame({
+                "Title": top_rows["title"].values,
+                "Subject Area": [", ".join(parse_areas(a)) for a in top_rows["subject_areas"]],
+                "Similarity Score": res["scores"][:10],
+                "Z-Score": res["z"][:10],
+            })
+            st.dataframe(disp_w, use_container_width=True, hide_index=True)
+
+            hit_ids = res["ids"][res["hits"]]
+            if len(hit_ids) > 0:
+                hit_area_counts = Counter(a for x in paper_store.rows(hit_ids)["subject_areas"] for a in parse_areas(x))
+                df_areas = pd.DataFrame(hit_area_counts.most_common(15), columns=["Subject Area", "Papers"])
+                st.markdown("Subject Areas of Aligned Papers")
+                st.bar_chart(df_areas, x="Subject Area", y="Papers")
+            else:
+                st.info("No papers above the z > 3 alignment cut-off for this summary.")
+
+
+with tab5:
+    st.subheader("Alignment Trends")
+    st.caption("Papers, similarity and outliers of the filtered companies by year, study group and industry, "
+               "answered from the precomputed cube.")
+
+    cube = load_alignment_cube()
+    cube_cells = cube["cells"]
+    measure_labels = {
+        "papers": "Aligned Papers",
+        "mean_similarity": "Mean Similarity",
+        "outliers": f"Outliers (z > {cube['z_cut']:g})",
+        "mean_z": "Mean Z-Score",
+    }
+    trend_labels = {"area_group": "Study Group", "sector": "Sector", "industry": "Industry"}
+
+    cc1, cc2, cc3 = st.columns(3)
+    with cc1:
+        cube_measure = st.selectbox("Measure", list(measure_labels), format_func=measure_labels.get, key="cube_measure")
+    with cc2:
+        trend_by = st.selectbox("Lines by", list(trend_labels), format_func=trend_labels.get, key="cube_trend_by")
+    with cc3:
+        cube_groups = st.multiselect("Study groups", AREA_GROUPS, key="cube_groups")
+
+    # the sidebar filters as a company id list (None = every company)
+    cube_companies = None if len(df_viz) == len(df_raw) else df_viz["company_id"].to_numpy()
+    cube_filter = cube_groups or None
+    cube_key = (cube_measure, tuple(cube_groups)) + filter_key
+    cube_labels = {cube_measure: measure_labels[cube_measure], "year": "Year", **trend_labels}
+
+    by_year = rollup(cube_cells, ["year"], cube_companies, cube_filter)
+    n_undated = int(by_year.loc[by_year["year"] == UNKNOWN_YEAR, "papers"].sum())
+    n_dated = int(by_year["papers"].sum()) - n_undated
+
+    if n_dated:
+        def build_trend():
+            df_trend = rollup(cube_cells, ["year", trend_by], cube_companies, cube_filter)
+            df_trend = df_trend[df_trend["year"] != UNKNOWN_YEAR]
+            fig_trend = px.line(df_trend, x="year", y=cube_measure, color=trend_by, markers=True,
+                                labels=cube_labels, template="plotly_white")
+            fig_trend.update_layout(height=450, xaxis=dict(dtick=1), font=dict(family="Inter, sans-serif", size=15))
+            return fig_trend.to_json()
+
+        show_figure(("trend", trend_by) + cube_key, build_trend)
+    else:
+        st.info("No cover dates for these papers yet. Build the cube against the ingested papers: "
+                "`python -m app.alignment_cube --papers ./data.csv`.")
+    if n_undated and n_dated:
+        st.caption(f"{n_undated} of {n_undated + n_dated} papers have no cover date and are left out of the year views.")
+
+    heat_options = ["Study Group"] + (["Year"] if n_dated else [])
+    heat_cols = st.radio("Heatmap columns", heat_options, horizontal=True, key="cube_heat_cols")
+
+    def build_heatmap():
+        col = "year" if heat_cols == "Year" else "area_group"
+        df_heat = rollup(cube_cells, ["industry", col], cube_companies, cube_filter)
+        if col == "year":
+            df_heat = df_heat[df_heat["year"] != UNKNOWN_YEAR]
+        grid = df_heat.pivot(index="industry", columns=col, values=cube_measure)
+        grid.columns = grid.columns.astype(str)
+        grid.index = grid.index.astype(str)
+        fig_heat = px.imshow(grid, aspect="auto", color_continuous_scale="Greens",
+                             labels=dict(x=heat_cols, y="Industry", color=measure_labels[cube_measure]))
+        fig_heat.update_layout(height=max(400, 24 * len(grid) + 150), margin=dict(t=20, l=10, r=10, b=40))
+        return fig_heat.to_json()
+
+    if len(by_year):
+        show_figure(("heatmap", heat_cols) + cube_key, build_heatmap)
+    else:
+        st.info("No papers for the current filters.")
+
+
+# placed last so the counters include this rerun's lookups
+with st.sidebar.expander("Debug: view cache"):
+    st.json(view_cache.stats())
+
+# per-session history of the last reruns that ran to the end (an st.rerun() cuts one short)
+RERUN_HISTORY = 20
+rerun_span.end()
+rerun_stages = recorder.summary(since_us=rerun_span.ts_us, tid=rerun_span.tid)
+rerun_timings = st.session_state.setdefault("rerun_timings", deque(maxlen=RERUN_HISTORY))
+rerun_timings.append({
+    "time": time.strftime("%H:%M:%S"),
+    "total_ms": rerun_span.duration_ms,
+    **{name.removeprefix("rerun."): s["total_ms"] for name, s in rerun_stages.items() if name != "rerun"},
+    "rss_mb": memory_snapshot("rerun")["rss_mb"],
+})
+
+if st.sidebar.checkbox("Debug: rerun timings", key="show_rerun_timings"):
+    with st.sidebar:
+        st.dataframe(pd.DataFrame(list(rerun_timings)[::-1]).round(1), hide_index=True)
+        st.download_button("Download trace (Chrome format)", json.dumps(recorder.chrome_trace(), default=str),
+                           file_name="dashboard_trace.json", mime="application/json")
@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+
+
+class ViewCache:
+    """
+    Bounded LRU cache for derived dashboard views (filtered frames, figure JSON), keyed by
+    the filter tuple. One instance is shared by every session, so access is locked; cached
+    values are handed out as-is and must not be mutated by callers.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(self, key, build):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        # build outside the lock; two sessions missing on the same key just build it twice
+        value = build()
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,92 @@
+"""
+Benchmark the CPU inference backends of model/cpu_inference.py (fp32, int8, onnx, onnx-int8)
+on a sample of abstracts: papers/s per backend, agreement with the fp32 predictions, the
+largest probability difference and, when the sample has labels, the accuracy loss.
+
+    python -m benchmarks.bench_inference ./group_classifier ./labeled.csv --n 2000 --threads 4
+    python -m benchmarks.bench_inference ./group_classifier ./labeled.csv --sharded-workers 4 --threads 1
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from model.cpu_inference import BACKENDS, ClassifierRunner, label_papers, load_labels
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model_dir", help="directory written by model.cpu_inference.save_classifier")
+    parser.add_argument("data", help="csv with an abstract column (and optionally --label-col)")
+    parser.add_argument("--n", type=int, default=2_000)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--threads", type=int, default=1, help="intra-op threads")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-len", type=int, default=384)
+    parser.add_argument("--label-col", default="group_label")
+    parser.add_argument("--sharded-workers", type=int, default=0,
+                        help="also time label_papers end to end with this many worker processes")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data).dropna(subset=["abstract"])
+    df = df.sample(min(args.n, len(df)), random_state=0).reset_index(drop=True)
+    texts = df["abstract"].astype(str).tolist()
+    labels = load_labels(args.model_dir)
+    truth = None
+    if args.label_col in df.columns:
+        index = {label: i for i, label in enumerate(labels)}
+        truth = df[args.label_col].map(index).to_numpy()
+
+    backends = ["fp32"] + [b for b in args.backends if b != "fp32"]
+    results, reference = [], None
+    for backend in backends:
+        runner = ClassifierRunner(args.model_dir, backend, args.threads, args.max_len, args.batch_size)
+        runner.predict_proba(texts[:args.batch_size])  # warm-up: lazy init, first-call allocations
+
+        t0 = time.perf_counter()
+        probs = runner.predict_proba(texts)
+        seconds = time.perf_counter() - t0
+        preds = probs.argmax(axis=1)
+        if reference is None:
+            reference = probs
+
+        row = {
+            "backend": backend,
+            "papers": len(texts),
+            "seconds": seconds,
+            "papers_per_s": len(texts) / seconds,
+            "agreement_vs_fp32": float((preds == reference.argmax(axis=1)).mean()),
+            "max_prob_diff_vs_fp32": float(np.abs(probs - reference).max()),
+        }
+        if truth is not None:
+            known = ~pd.isna(truth)
+            row["accuracy"] = float((preds[known] == truth[known].astype(int)).mean())
+        results.append(row)
+
+    base = results[0]
+    for row in results:
+        row["speedup_vs_fp32"] = row["papers_per_s"] / base["papers_per_s"]
+        if "accuracy" in row:
+            row["accuracy_loss_vs_fp32"] = base["accuracy"] - row["accuracy"]
+
+    report = {"benchmark": "inference", "threads": args.threads, "batch_size": args.batch_size, "backends": results}
+    if args.sharded_workers:
+        best = max(results, key=lambda r: r["papers_per_s"])["backend"]
+        out_dir = tempfile.mkdtemp(prefix="bench_inference_")
+        try:
+            frame = pd.DataFrame({"eid": np.arange(len(texts)).astype(str), "abstract": texts})
+            report["sharded"] = label_papers(frame, args.model_dir, out_dir, best, args.sharded_workers,
+                                             args.threads, shard_size=max(1, len(texts) // (4 * args.sharded_workers)),
+                                             batch_size=args.batch_size, max_len=args.max_len)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
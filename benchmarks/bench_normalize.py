@@ -0,0 +1,55 @@
+"""
+Records/second of the generic normalize_entry (dotted get_path walks) against the extractors
+compiled per response shape in data/main.py, on a synthetic corpus.
+
+    python -m benchmarks.bench_normalize --records 200000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.synthetic import scopus_documents, synthetic_papers
+from data.main import normalize_entry, extract_shaped_records, EXTRACTORS
+
+
+def synthetic_documents(n_records, seed=0):
+    return [doc for _, doc in scopus_documents(synthetic_papers(n_records, seed))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    shaped = [extract_shaped_records(d) for d in synthetic_documents(args.records)]
+    n = sum(len(records) for _, records in shaped)
+
+    def run_generic():
+        return [normalize_entry(r) for _, records in shaped for r in records]
+
+    def run_compiled():
+        return [EXTRACTORS[shape](r) for shape, records in shaped for r in records]
+
+    assert run_generic() == run_compiled(), "compiled extractors disagree with normalize_entry"
+
+    results = {}
+    for name, fn in (("generic", run_generic), ("compiled", run_compiled)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        results[name] = n / best
+
+    print(json.dumps({
+        "benchmark": "normalize",
+        "records": n,
+        "generic_records_per_s": results["generic"],
+        "compiled_records_per_s": results["compiled"],
+        "speedup": results["compiled"] / results["generic"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+End-to-end pipeline benchmark on synthetic data (benchmarks/synthetic.py): ingestion
+(async loader and process pool), encoding (random-projection stand-in through the encoder
+cache), blocked similarity, streaming z-scoring, and the dashboard data prep (artifact build
+plus the per-rerun filter / level-of-detail / figure steps and the cube rollups).
+
+Each stage runs in its own process, so its peak RSS is its own. The result is one JSON
+document with the commit, the machine, the scale and, per stage, wall time, throughput and
+peak RSS. Compare two runs with --compare.
+
+    python -m benchmarks.suite --papers 20000 --companies 100 --out bench.json
+    python -m benchmarks.suite --papers 20000 --companies 100 --compare bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+STAGES = ("ingest_async", "ingest_parallel", "encode", "similarity", "scoring", "dashboard")
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process and of its (waited-for) children, in MB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2 ** 20, None
+    scale = 2 ** 20 if sys.platform == "darwin" else 2 ** 10  # ru_maxrss is bytes on macOS, KB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    try:
+        # Linux keeps ru_maxrss across exec, so a child started by a big parent reports the
+        # parent's peak; VmHWM belongs to the new address space
+        with open("/proc/self/status") as f:
+            own = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:")) / 2 ** 10
+    except (OSError, StopIteration):
+        pass
+    return own, children
+
+
+# ------------------------------
+# Stages: each returns (items, unit, extra fields) and is timed by run_stage
+# ------------------------------
+def stage_ingest_async(data_dir, work_dir, args):
+    from data.main import load_scopus_directory_async
+    df = asyncio.run(load_scopus_directory_async(os.path.join(data_dir, "scopus")))
+    return len(df), "records", {}
+
+
+def stage_ingest_parallel(data_dir, work_dir, args):
+    from data.main import load_scopus_directory_parallel
+    out_dir = os.path.join(work_dir, "data_parquet")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    n = load_scopus_directory_parallel(os.path.join(data_dir, "scopus"), out_dir, args.workers)
+    return n, "records", {"workers": args.workers}
+
+
+def stage_encode(data_dir, work_dir, args):
+    from benchmarks.synthetic import RandomProjectionEncoder
+    from model.encoder import encode_texts
+    texts = pd.read_csv(os.path.join(data_dir, "papers.csv"))["abstract"].tolist()
+    cache_path = os.path.join(work_dir, "embedding_cache.sqlite")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(cache_path + suffix):
+            os.remove(cache_path + suffix)
+    model = RandomProjectionEncoder(args.dim)
+    encode_texts(texts, "random-projection", cache_path, model=model, workers=1)
+    # second pass: everything comes from the cache
+    t0 = time.perf_counter()
+    encode_texts(texts, "random-projection", cache_path, model=model, workers=1)
+    return len(texts), "texts", {"cached_rerun_s": time.perf_counter() - t0}
+
+
+def _vectors(data_dir):
+    from model.similarity import to_matrix
+    return (to_matrix(np.load(os.path.join(data_dir, "company_vectors.npy"))),
+            to_matrix(np.load(os.path.join(data_dir, "paper_vectors.npy"))))
+
+
+def stage_similarity(data_dir, work_dir, args):
+    from model.similarity import threshold_hits, top_k_per_company
+    companies, papers = _vectors(data_dir)
+    top_k_per_company(companies, papers, k=10)
+    hits = threshold_hits(companies, papers, 0.5)
+    return len(companies) * len(papers), "pairs", {"threshold_hits": int(len(hits[0]))}
+
+
+def stage_scoring(data_dir, work_dir, args):
+    from model.scoring import iter_outliers
+    companies, papers = _vectors(data_dir)
+    names = pd.read_csv(os.path.join(data_dir, "companies.csv"))["company_name"].tolist()
+    titles = pd.read_csv(os.path.join(data_dir, "papers.csv"), usecols=["title"])["title"].tolist()
+    n_outliers = sum(len(frame) for frame in iter_outliers(companies, papers, names, titles))
+    return len(companies) * len(papers), "pairs", {"outliers": n_outliers}
+
+
+def stage_dashboard(data_dir, work_dir, args):
+    import plotly.express as px
+    from app.alignment_cube import build_cube, rollup
+    from app.dashboard_data import build_artifact
+    from app.lod import level_of_detail
+    from app.paper_query import PaperQuery
+
+    registry_path = os.path.join(work_dir, "company_registry.csv")
+    if os.path.exists(registry_path):
+        os.remove(registry_path)
+    t0 = time.perf_counter()
+    artifact = build_artifact(os.path.join(data_dir, "companies.csv"), os.path.join(data_dir, "company_papers.csv"),
+                              registry_path, os.path.join(work_dir, "papers.parquet"))
+    build_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    cells = build_cube(os.path.join(data_dir, "companies.csv"), os.path.join(data_dir, "company_papers.csv"),
+                       registry_path, os.path.join(data_dir, "papers.csv"))["cells"]
+    cube_s = time.perf_counter() - t0
+
+    # one rerun per sector filter, as strategy.py does it: filter, level of detail, treemap JSON, top papers
+    companies = artifact["companies"]
+    query = PaperQuery(artifact["papers_path"])
+    rerun_s, cube_s_per_view = [], []
+    for sector in [None] + sorted(companies["sector"].unique()):
+        t0 = time.perf_counter()
+        df_viz = companies if sector is None else companies[companies["sector"] == sector]
+        df_map, _ = level_of_detail(df_viz, 0.005)
+        px.treemap(df_map, path=[px.Constant("All Sectors"), "sector", "industry", "wrapped_name"],
+                   values="market_cap", color="total_alignment_score",
+                   custom_data=["hover_content", "company_name"]).to_json()
+        query.top_k({"company_id": int(df_viz["company_id"].iloc[0])}, k=10, columns=["title", "areas_text", "value"])
+        rerun_s.append(time.perf_counter() - t0)
+        # the Trends tab: yearly lines by study group and the industry x year heatmap, from the cube
+        t0 = time.perf_counter()
+        rollup(cells, ["year", "area_group"], df_viz["company_id"].to_numpy())
+        rollup(cells, ["industry", "year"], df_viz["company_id"].to_numpy())
+        cube_s_per_view.append(time.perf_counter() - t0)
+    return len(companies), "companies", {
+        "artifact_build_s": build_s,
+        "cube_build_s": cube_s,
+        "cube_cells": len(cells),
+        "cube_rollup_ms_max": float(np.max(cube_s_per_view) * 1000),
+        "reruns": len(rerun_s),
+        "rerun_ms_median": float(np.median(rerun_s) * 1000),
+        "rerun_ms_max": float(np.max(rerun_s) * 1000),
+    }
+
+
+def run_stage(name, data_dir, work_dir, args):
+    fn = globals()[f"stage_{name}"]
+    t0 = time.perf_counter()
+    items, unit, extra = fn(data_dir, work_dir, args)
+    wall = time.perf_counter() - t0
+    rss, children_rss = peak_rss_mb()
+    return {"wall_s": wall, "items": items, "unit": unit, "throughput_per_s": items / wall if wall else 0.0,
+            "peak_rss_mb": rss, "peak_rss_children_mb": children_rss, **extra}
+
+
+# ------------------------------
+# Runner / comparison
+# ------------------------------
+def git_commit():
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit or None, dirty
+    except OSError:
+        return None, None
+
+
+def stage_subprocess(name, data_dir, work_dir, args):
+    cmd = [sys.executable, "-m", "benchmarks.suite", "--stage", name, "--data", data_dir, "--work", work_dir,
+           "--workers", str(args.workers), "--dim", str(args.dim)]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"}
+    # stages may print progress; the result is the last stdout line
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(current, baseline, tolerance):
+    """Per-stage wall time / peak RSS ratios (current / baseline); returns the stages that regressed."""
+    regressed = []
+    print(f"{'stage':<18}{'wall_s':>10}{'base':>10}{'ratio':>8}{'rss_mb':>10}{'base':>10}{'ratio':>8}")
+    for name, cur in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or "error" in cur or "error" in base:
+            print(f"{name:<18}{'-':>10}")
+            continue
+        wall_ratio = cur["wall_s"] / base["wall_s"] if base["wall_s"] else float("nan")
+        rss_ratio = cur["peak_rss_mb"] / base["peak_rss_mb"] if base["peak_rss_mb"] else float("nan")
+        flag = " <-" if wall_ratio > 1 + tolerance or rss_ratio > 1 + tolerance else ""
+        print(f"{name:<18}{cur['wall_s']:>10.2f}{base['wall_s']:>10.2f}{wall_ratio:>8.2f}"
+              f"{cur['peak_rss_mb']:>10.0f}{base['peak_rss_mb']:>10.0f}{rss_ratio:>8.2f}{flag}")
+        if flag:
+            regressed.append(name)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=20_000)
+    parser.add_argument("--companies", type=int, default=100)
+    parser.add_argument("--per-company", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--data", default=None, help="reuse (or keep) the synthetic dataset in this directory")
+    parser.add_argument("--work", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--stage", choices=STAGES, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--out", default=None, help="write the JSON result here")
+    parser.add_argument("--compare", default=None, help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown / growth before flagging")
+    args = parser.parse_args()
+
+    if args.stage:
+        # child process: one stage, result as the last stdout line
+        print(json.dumps(run_stage(args.stage, args.data, args.work, args)))
+        return
+
+    from benchmarks.synthetic import write_dataset
+
+    tmp = tempfile.mkdtemp(prefix="bench_suite_")
+    data_dir = args.data or os.path.join(tmp, "data")
+    try:
+        t0 = time.perf_counter()
+        if not os.path.exists(os.path.join(data_dir, "paper_vectors.npy")):
+            write_dataset(data_dir, args.papers, args.companies, args.per_company, args.dim, args.seed)
+        generate_s = time.perf_counter() - t0
+
+        commit, dirty = git_commit()
+        result = {
+            "suite": "pipeline",
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "scale": {"papers": args.papers, "companies": args.companies, "per_company": args.per_company,
+                      "dim": args.dim, "workers": args.workers, "seed": args.seed},
+            "generate_s": generate_s,
+            "stages": {},
+        }
+        for name in args.stages:
+            result["stages"][name] = stage_subprocess(name, data_dir, tmp, args)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressed = compare(result, json.load(f), args.tolerance)
+        if regressed:
+            sys.exit(f"regressed: {', '.join(regressed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Synthetic stand-ins for the data that cannot be shared: Scopus JSON exports in every response
+shape data/main.py reads, the company table (app/withZ.csv layout) and the company x paper
+table (app/grouped_nonnormalized_complete.csv layout), plus an offline random-projection
+encoder in place of the sentence-transformers model.
+
+Abstracts and company summaries are drawn from per-study-group topic words (taken from the
+subject-area names), so papers and companies of the same group end up closer in the
+random-projection space than unrelated ones.
+
+    python -m benchmarks.synthetic ./bench_data --papers 20000 --companies 100
+"""
+import argparse
+import io
+import json
+import os
+import random
+import re
+import tarfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from data.subject_areas import ALL_GROUPS, DETAIL_GROUPS, GROUP_NAMES
+
+FILLER = ("the of and in to a for with on by this study results analysis method based using data model "
+          "approach proposed paper performance system effect between high new two different were was "
+          "also which than significant found shown evaluated compared increase process development").split()
+
+SECTORS = {
+    "Energy": ["Oil & Gas Integrated", "Oil & Gas Refining & Marketing", "Utilities - Renewable"],
+    "Technology": ["Electronic Components", "Software - Application", "Communication Equipment"],
+    "Healthcare": ["Medical Care Facilities", "Drug Manufacturers - General", "Medical Devices"],
+    "Consumer Defensive": ["Packaged Foods", "Farm Products", "Beverages - Non-Alcoholic"],
+    "Industrials": ["Electrical Equipment & Parts", "Engineering & Construction", "Airports & Air Services"],
+    "Financial Services": ["Banks - Regional", "Insurance - Life", "Credit Services"],
+}
+NAME_PARTS = ("siam thai krung bangkok chao phraya global united royal golden star eastern north "
+              "pacific asia delta prime metro smart green power").split()
+NAME_KINDS = ("Energy", "Holdings", "Foods", "Hospital", "Engineering", "Technology", "Industries", "Group")
+
+
+def topic_words():
+    """Lower-case words of each study group's subject-area names (stop words dropped)."""
+    words = {}
+    for g in GROUP_NAMES:
+        tokens = re.findall(r"[a-z]+", " ".join(ALL_GROUPS[g] + DETAIL_GROUPS[g]).lower())
+        words[g] = sorted({t for t in tokens if len(t) > 3 and t not in ("miscellaneous", "general")})
+    return words
+
+
+def random_text(rng, topics, n_words, topic_share=0.3):
+    n_topic = round(n_words * topic_share)
+    words = rng.choices(topics, k=n_topic) + rng.choices(FILLER, k=n_words - n_topic)
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def synthetic_papers(n_papers, seed=0, duplicate_share=0.02):
+    """
+    Paper rows as data/main.py produces them (eid, title, abstract, subject_areas, cover_date, ...)
+    plus their study group. ``duplicate_share`` of the rows are lightly edited copies of
+    earlier papers under a new eid, as in real overlapping exports.
+    """
+    rng = random.Random(seed)
+    words = topic_words()
+    rows = []
+    for i in range(n_papers):
+        if rows and rng.random() < duplicate_share:
+            src = rows[rng.randrange(len(rows))]
+            row = dict(src, eid=f"2-s2.0-{900000000 + i}", abstract=src["abstract"] + " " + rng.choice(FILLER))
+            rows.append(row)
+            continue
+        g = rng.choice(GROUP_NAMES)
+        areas = [rng.choice(ALL_GROUPS[g])] + rng.sample(DETAIL_GROUPS[g], rng.randint(0, 3))
+        rows.append({
+            "eid": f"2-s2.0-{850000000 + i}",
+            "title": random_text(rng, words[g], rng.randint(6, 14), 0.5).capitalize(),
+            "abstract": random_text(rng, words[g], rng.randint(80, 250)),
+            "doi": f"10.1000/syn.{i}",
+            "publication_name": f"Journal of {rng.choice(words[g]).capitalize()}",
+            "cover_date": f"{rng.randint(2018, 2023)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "citedby_count": rng.randint(0, 200),
+            "author_ids": [str(rng.randint(10 ** 9, 10 ** 10)) for _ in range(rng.randint(1, 8))],
+            "subject_areas": areas,
+            "affiliations": [{"afid": "60028190", "name": "Chulalongkorn University", "country": "Thailand"}],
+            "group": g,
+        })
+    return pd.DataFrame(rows)
+
+
+# ------------------------------
+# Scopus JSON in the three response shapes
+# ------------------------------
+def retrieval_doc(p):
+    return {"abstracts-retrieval-response": {
+        "coredata": {
+            "eid": p["eid"], "dc:title": p["title"], "dc:description": p["abstract"],
+            "prism:doi": p["doi"], "prism:publicationName": p["publication_name"],
+            "prism:coverDate": p["cover_date"], "citedby-count": str(p["citedby_count"]),
+        },
+        "authors": {"author": [{"@auid": a} for a in p["author_ids"]]},
+        "subject-areas": {"subject-area": [{"$": a, "@abbrev": a[:4].upper()} for a in p["subject_areas"]]},
+        "affiliation": [{"@afid": a["afid"], "affilname": a["name"], "affiliation-country": a["country"]}
+                        for a in p["affiliations"]],
+    }}
+
+
+def search_doc(page):
+    return {"search-results": {"entry": [{
+        "eid": p["eid"], "dc:title": p["title"], "dc:description": p["abstract"],
+        "prism:publicationName": p["publication_name"], "prism:coverDate": p["cover_date"],
+        "citedby-count": str(p["citedby_count"]),
+        "subject-areas": {"subject-area": [{"$": a} for a in p["subject_areas"]]},
+        "affiliation": [{"afid": a["afid"], "affilname": a["name"], "affiliation-country": a["country"]}
+                        for a in p["affiliations"]],
+    } for p in page]}}
+
+
+def generic_doc(page):
+    return [{"eid": p["eid"], "title": p["title"], "abstract": p["abstract"], "cover_date": p["cover_date"],
+             "subject_areas": [{"name": a} for a in p["subject_areas"]],
+             "author": [{"authid": a} for a in p["author_ids"]]} for p in page]
+
+
+def scopus_documents(papers, page_size=25):
+    """(file name, document) pairs: ~40% retrieval responses, ~40% search pages, ~20% generic lists."""
+    records = papers.to_dict("records")
+    i, k = 0, 0
+    while i < len(records):
+        kind = k % 5
+        if kind in (0, 1):
+            # one retrieval response per file, like the per-eid API calls; every other one extensionless
+            for p in records[i:i + page_size]:
+                yield (p["eid"] + (".json" if kind == 0 else "")), retrieval_doc(p)
+        elif kind in (2, 3):
+            yield f"search-{k:06d}.json", search_doc(records[i:i + page_size])
+        else:
+            yield f"generic-{k:06d}.json", generic_doc(records[i:i + page_size])
+        i += page_size
+        k += 1
+
+
+def write_scopus_dir(out_dir, papers, archive_share=0.2, seed=0):
+    """
+    Write the papers as a directory of Scopus exports: plain .json and extensionless files,
+    ``archive_share`` of the documents inside a .zip and a .tar.gz, and one non-JSON file that
+    ingestion has to skip. Returns the number of files per kind.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    counts = {"json": 0, "extensionless": 0, "zip_members": 0, "tar_members": 0}
+    with zipfile.ZipFile(os.path.join(out_dir, "export-a.zip"), "w", zipfile.ZIP_DEFLATED) as zf, \
+            tarfile.open(os.path.join(out_dir, "export-b.tar.gz"), "w:gz") as tf:
+        for name, doc in scopus_documents(papers):
+            content = json.dumps(doc).encode("utf-8")
+            r = rng.random()
+            if r < archive_share / 2:
+                zf.writestr(name, content)
+                counts["zip_members"] += 1
+            elif r < archive_share:
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tf.addfile(info, io.BytesIO(content))
+                counts["tar_members"] += 1
+            else:
+                with open(os.path.join(out_dir, name), "wb") as f:
+                    f.write(content)
+                counts["json" if name.endswith(".json") else "extensionless"] += 1
+    with open(os.path.join(out_dir, "README.txt"), "w") as f:
+        f.write("synthetic Scopus export\n")
+    return counts
+
+
+# ------------------------------
+# Company tables
+# ------------------------------
+def synthetic_companies(n_companies, seed=0):
+    """Company rows in the app/withZ.csv layout (company_name, sector, industry, market_cap, ...)."""
+    rng = random.Random(seed)
+    words = topic_words()
+    sectors = list(SECTORS)
+    rows, names = [], set()
+    while len(rows) < n_companies:
+        name = f"{rng.choice(NAME_PARTS).title()} {rng.choice(NAME_PARTS).title()} {rng.choice(NAME_KINDS)} Public Company Limited"
+        if name in names:
+            continue
+        names.add(name)
+        sector = sectors[len(rows) % len(sectors)]
+        g = GROUP_NAMES[len(rows) % len(GROUP_NAMES)]
+        rows.append({
+            "company_name": name,
+            "sector": sector,
+            "industry": rng.choice(SECTORS[sector]),
+            "market_cap": int(np.exp(rng.gauss(24, 1.5))),
+            "business_summary": random_text(rng, words[g], rng.randint(120, 300)),
+            "risks": random_text(rng, words[g], 60),
+            "strategy": random_text(rng, words[g], 60),
+            "total_alignment_score": rng.gauss(0, 1),
+            "areas": str(rng.sample(ALL_GROUPS[g], min(3, len(ALL_GROUPS[g])))),
+        })
+    return pd.DataFrame(rows)
+
+
+def synthetic_company_papers(companies, papers, per_company=200, seed=0):
+    """Company x paper rows in the grouped_nonnormalized_complete.csv layout (company, title, areas, value, ...)."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for name in companies["company_name"]:
+        # a few companies without any paper, as in the real table
+        n = 0 if rng.random() < 0.05 else min(per_company, len(papers))
+        idx = rng.choice(len(papers), n, replace=False)
+        value = rng.normal(0.3, 0.08, n)
+        frames.append(pd.DataFrame({
+            "company": name,
+            "title": papers["title"].to_numpy()[idx],
+            "areas": papers["subject_areas"].map(str).to_numpy()[idx],
+            "value": value,
+            "value_trans": (value - 0.3) / 0.08 * 0.9,
+            "z_by_company": (value - value.mean()) / (value.std() or 1.0) if n else value,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+# ------------------------------
+# Offline encoder
+# ------------------------------
+class RandomProjectionEncoder:
+    """
+    Stand-in for SentenceTransformer.encode: hashed term counts times a fixed Gaussian matrix,
+    l2-normalized. Texts sharing topic words get similar vectors (the filler words are dropped
+    like stop words); no download, no torch.
+    """
+
+    def __init__(self, dim=384, n_features=2 ** 14, seed=0):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm="l2",
+                                            stop_words=list(FILLER))
+        rng = np.random.default_rng(seed)
+        self.projection = (rng.standard_normal((n_features, dim)) / np.sqrt(dim)).astype(np.float32)
+
+    def encode(self, texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        out = np.empty((len(texts), self.projection.shape[1]), dtype=np.float32)
+        for i in range(0, len(texts), batch_size):
+            out[i:i + batch_size] = (self.vectorizer.transform(texts[i:i + batch_size]) @ self.projection)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+
+def write_dataset(out_dir, n_papers=20_000, n_companies=100, per_company=200, dim=384, seed=0):
+    """
+    Everything the benchmark stages read, under out_dir: scopus/ (JSON exports), papers.csv,
+    companies.csv, company_papers.csv and the encoded paper / company vectors (.npy).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    papers = synthetic_papers(n_papers, seed)
+    companies = synthetic_companies(n_companies, seed)
+    files = write_scopus_dir(os.path.join(out_dir, "scopus"), papers, seed=seed)
+    papers.drop(columns="group").to_csv(os.path.join(out_dir, "papers.csv"), index=False)
+    companies.to_csv(os.path.join(out_dir, "companies.csv"))
+    synthetic_company_papers(companies, papers, per_company, seed).to_csv(os.path.join(out_dir, "company_papers.csv"))
+
+    encoder = RandomProjectionEncoder(dim, seed=seed)
+    np.save(os.path.join(out_dir, "paper_vectors.npy"), encoder.encode(papers["abstract"].tolist(), 1024))
+    np.save(os.path.join(out_dir, "company_vectors.npy"), encoder.encode(companies["business_summary"].tolist(), 1024))
+    return {"papers": n_papers, "companies": n_companies, "dim": dim, "files": files}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("out_dir")
+    parser.add_argument("--papers", type=int, default=20_000)
+    parser.add_argument("--companies", type=int, default=100)
+    parser.add_argument("--per-company", type=int, default=200, help="rows per company in company_papers.csv")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(write_dataset(args.out_dir, args.papers, args.companies, args.per_company, args.dim, args.seed), indent=2))
@@ -0,0 +1,181 @@
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Levenshtein import distance as edit_distance
+except ImportError:  # same metric as python-Levenshtein, just slower
+    def edit_distance(a, b):
+        if len(a) < len(b):
+            a, b = b, a
+        prev = list(range(len(b) + 1))
+        for i, ca in enumerate(a, 1):
+            cur = [i]
+            for j, cb in enumerate(b, 1):
+                cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+            prev = cur
+        return prev[-1]
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_PATH = os.path.join(DATA_DIR, "company_registry.csv")
+
+SUFFIXES = ["public company limited", "pcl", "limited", "company", "(thailand)", "inc.", "corp."]
+
+# id of a missing (NaN / None / blank) name; such names are never registered
+MISSING_ID = -1
+
+
+def normalize_name(name):
+    if not isinstance(name, str): return ""
+    name = name.lower()
+    for bad_str in SUFFIXES:
+        name = name.replace(bad_str, "")
+    return name.strip()
+
+
+def is_missing(name):
+    if isinstance(name, str):
+        return not name.strip()
+    return name is None or bool(pd.isna(name))
+
+
+def trigrams(text):
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class CompanyRegistry:
+    """
+    Stable integer ids for company names. Ids are handed out in order of first registration
+    and never reused, so they can key tables that are written at different times.
+    Names resolve through an exact-name and a normalized-name hash index, with a
+    trigram + edit-distance fallback for misspellings.
+    """
+
+    def __init__(self, names=()):
+        self.names = []
+        self.clean = []
+        self.by_name = {}
+        self.by_clean = {}
+        self.grams = {}
+        # a saved registry is taken as is, so ids stay put even for odd names saved earlier
+        for name in names:
+            self._register(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        """Id of ``name``, registering it first if it is new; MISSING_ID for a missing name."""
+        if name in self.by_name:
+            return self.by_name[name]
+        if is_missing(name):
+            return MISSING_ID
+        return self._register(name)
+
+    def _register(self, name):
+        cid = len(self.names)
+        self.names.append(name)
+        self.by_name[name] = cid
+        clean = normalize_name(name)
+        self.clean.append(clean)
+        self.by_clean.setdefault(clean, cid)
+        for g in trigrams(clean):
+            self.grams.setdefault(g, []).append(cid)
+        return cid
+
+    def add_many(self, names):
+        return np.array([self.add(n) for n in names], dtype=np.int64)
+
+    def lookup(self, name):
+        """Exact or normalized-name match, else None."""
+        if is_missing(name):
+            return None
+        cid = self.by_name.get(name)
+        if cid is None:
+            cid = self.by_clean.get(normalize_name(name))
+        return cid
+
+    def fuzzy(self, name, limit=5, max_ratio=0.4, n_candidates=20):
+        """
+        Closest registered names as (id, name, distance), best first. Candidates are the names
+        sharing the most trigrams with the query; they are ranked by edit distance to the
+        normalized name (or its prefix) and dropped when it exceeds max_ratio of the query length.
+        """
+        clean = normalize_name(name)
+        if not clean:
+            return []
+        shared = Counter(cid for g in trigrams(clean) for cid in self.grams.get(g, ()))
+        out = []
+        for cid, _ in shared.most_common(n_candidates):
+            other = self.clean[cid]
+            if clean in other:
+                d = 0
+            else:
+                # users type the start of a name, so also compare against the name's prefix
+                d = min(edit_distance(clean, other), edit_distance(clean, other[:len(clean)]))
+            if d <= max_ratio * len(clean):
+                out.append((cid, self.names[cid], d))
+        out.sort(key=lambda t: (t[2], t[0]))
+        return out[:limit]
+
+    def resolve(self, name):
+        """Id for ``name``: exact, then normalized, then the closest fuzzy match; None if nothing is close."""
+        cid = self.lookup(name)
+        if cid is None:
+            hits = self.fuzzy(name, limit=1)
+            cid = hits[0][0] if hits else None
+        return cid
+
+    def frame(self):
+        return pd.DataFrame({"company_id": np.arange(len(self.names), dtype=np.int64), "company_name": self.names})
+
+    def save(self, path=REGISTRY_PATH):
+        tmp = path + ".tmp"
+        self.frame().to_csv(tmp, index=False)
+        os.replace(tmp, path)
+
+
+def load_registry(path=REGISTRY_PATH):
+    if not os.path.exists(path):
+        return CompanyRegistry()
+    df = pd.read_csv(path, dtype={"company_name": str}, keep_default_na=False).sort_values("company_id")
+    if not np.array_equal(df["company_id"].to_numpy(), np.arange(len(df))):
+        raise ValueError(f"{path}: company ids must be 0..n-1 without gaps")
+    return CompanyRegistry(df["company_name"].tolist())
+
+
+def key_papers(papers, registry, column="company"):
+    """
+    Add company_id to a paper table and sort it by (company_id, value desc), so each
+    company's papers are one contiguous run, best first. Returns the sorted frame and the
+    run offsets: papers of company i are rows offsets[i]:offsets[i + 1]. Rows without a
+    company name get MISSING_ID, sort first and belong to no run.
+    """
+    papers = papers.copy()
+    papers["company_id"] = registry.add_many(papers[column].tolist()) if len(papers) else np.empty(0, np.int64)
+    papers = papers.sort_values(["company_id", "value"], ascending=[True, False], kind="stable").reset_index(drop=True)
+    offsets = np.searchsorted(papers["company_id"].to_numpy(), np.arange(len(registry) + 1))
+    return papers, offsets
+
+
+def company_papers(papers, offsets, company_id):
+    """Rows of one company from a table keyed by key_papers (a slice, no scan)."""
+    if company_id is None or company_id < 0 or company_id + 1 >= len(offsets):
+        return papers.iloc[0:0]
+    return papers.iloc[offsets[company_id]:offsets[company_id + 1]]
+
+
+if __name__ == "__main__":
+    # register every company in the given tables (default: the SET100 list and the dashboard table)
+    paths = sys.argv[1:] or [os.path.join(DATA_DIR, "SET100_company_withTicker.csv"),
+                             os.path.join(DATA_DIR, "..", "app", "withZ.csv")]
+    registry = load_registry()
+    before = len(registry)
+    for p in paths:
+        registry.add_many(pd.read_csv(p)["company_name"].dropna().tolist())
+    registry.save()
+    print(f"{len(registry)} companies in {REGISTRY_PATH} ({len(registry) - before} new)")
@@ -0,0 +1,161 @@
+import re
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text, k=3):
+    """crc32 of every k-word shingle of the lower-cased text (a single shingle for short texts)."""
+    words = TOKEN_RE.findall(text.lower()) if isinstance(text, str) else []
+    if len(words) < k:
+        return np.array([zlib.crc32(" ".join(words).encode())], dtype=np.uint64)
+    grams = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def permutations(num_perm=128, seed=0):
+    """Random odd multipliers and offsets for multiply-shift hashing, one pair per permutation."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def _signatures(args, batch=256):
+    texts, k, num_perm, seed = args
+    a, b = permutations(num_perm, seed)
+    out = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for i in range(0, len(texts), batch):
+        hashed = [shingles(t, k) for t in texts[i:i + batch]]
+        h = np.concatenate(hashed)
+        starts = np.cumsum([0] + [len(x) for x in hashed[:-1]])
+        # multiply-shift hashing ((a*x + b) mod 2^64) >> 32 of every shingle of the batch at once
+        # (no division, the uint64 wrap-around is the mod), then the minimum per text
+        values = (np.outer(a, h) + b[:, None]) >> np.uint64(32)
+        out[i:i + len(hashed)] = np.minimum.reduceat(values, starts, axis=1).T
+    return out
+
+
+def minhash_signatures(texts, k=3, num_perm=128, seed=0, workers=0, chunk_size=2000):
+    """MinHash signature (num_perm uint32 values) per text; chunks run on a process pool when workers > 0."""
+    texts = list(texts)
+    chunks = [(texts[i:i + chunk_size], k, num_perm, seed) for i in range(0, len(texts), chunk_size)]
+    if not chunks:
+        return np.empty((0, num_perm), dtype=np.uint32)
+    if workers and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            return np.concatenate(list(ex.map(_signatures, chunks)))
+    return np.concatenate([_signatures(c) for c in chunks])
+
+
+def lsh_pairs(signatures, bands=16, max_bucket=64):
+    """
+    Candidate pairs (i, j), i < j, that agree on every row of at least one band. With b bands of
+    r rows, pairs with Jaccard similarity s collide with probability 1 - (1 - s^r)^b.
+
+    A bucket of m rows gives m * (m - 1) / 2 pairs; buckets larger than ``max_bucket`` (boilerplate
+    text, mass-duplicated records) only pair every member with the bucket's first row, so they
+    cost O(m). Returns the pairs and the sizes of those oversized buckets.
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    pairs = set()
+    oversized = []
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], n]
+        for s, e in zip(starts, ends):
+            if e - s > max_bucket:
+                members = np.sort(order[s:e]).tolist()
+                pairs.update((members[0], j) for j in members[1:])
+                oversized.append(e - s)
+            elif e - s > 1:
+                members = np.sort(order[s:e])
+                x, y = np.triu_indices(len(members), 1)
+                pairs.update(zip(members[x].tolist(), members[y].tolist()))
+    return pairs, oversized
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def clusters(n, pairs):
+    """Cluster id (the smallest member index) per row from undirected pairs (union-find)."""
+    parent = np.arange(n)
+    for i, j in pairs:
+        ri, rj = _find(parent, i), _find(parent, j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    return np.array([_find(parent, i) for i in range(n)], dtype=np.int64)
+
+
+def dedup_papers(df, threshold=0.8, k=3, num_perm=128, bands=16, seed=0, workers=0, n_companies=None,
+                 max_bucket=64):
+    """
+    Collapse near-duplicate papers (title + abstract) to one canonical row per cluster.
+
+    LSH candidates are kept when their estimated Jaccard similarity (share of equal MinHash
+    values) is at least ``threshold``. The canonical row of a cluster is the one with the
+    longest abstract (then the smallest eid). Returns the deduplicated frame, an
+    eid -> canonical_eid table covering every input row, and a report of the work saved
+    (including how many LSH buckets were over ``max_bucket`` and only star-linked).
+    """
+    df = df.reset_index(drop=True)
+    texts = (df["title"].fillna("").astype(str) + " " + df["abstract"].fillna("").astype(str)).tolist()
+    sigs = minhash_signatures(texts, k, num_perm, seed, workers)
+    # texts without a single word share one signature; never treat them as duplicates
+    empty = np.array([TOKEN_RE.search(t.lower()) is None for t in texts], dtype=bool)
+    candidates, oversized = lsh_pairs(sigs, bands, max_bucket)
+    pairs = {(i, j) for i, j in candidates
+             if not (empty[i] or empty[j]) and (sigs[i] == sigs[j]).mean() >= threshold}
+    cluster = clusters(len(df), pairs)
+
+    rank = pd.DataFrame({
+        "cluster": cluster,
+        "abstract_len": df["abstract"].fillna("").astype(str).str.len().to_numpy(),
+        "eid": df["eid"].astype(str).to_numpy(),
+    }).sort_values(["cluster", "abstract_len", "eid"], ascending=[True, False, True], kind="stable")
+    canonical_rows = rank.drop_duplicates("cluster").index.to_numpy()
+    canonical_of = pd.Series(df["eid"].to_numpy()[canonical_rows], index=rank["cluster"].drop_duplicates().to_numpy())
+
+    mapping = pd.DataFrame({"eid": df["eid"].to_numpy(), "canonical_eid": canonical_of.loc[cluster].to_numpy()})
+    kept = df.iloc[np.sort(canonical_rows)].reset_index(drop=True)
+
+    removed = len(df) - len(kept)
+    report = {
+        "papers": len(df),
+        "canonical_papers": len(kept),
+        "duplicates_removed": removed,
+        "duplicate_share": removed / len(df) if len(df) else 0.0,
+        "candidate_pairs": len(pairs),
+        "oversized_buckets": len(oversized),
+        "largest_bucket": int(max(oversized, default=0)),
+        "encode_texts_saved": removed,
+        "encode_chars_saved": int(rank["abstract_len"].sum() - rank["abstract_len"].loc[canonical_rows].sum()),
+    }
+    if n_companies is not None:
+        report["similarity_pairs_saved"] = removed * n_companies
+    return kept, mapping, report
+
+
+if __name__ == "__main__":
+    from data.main import load_ingested
+    src = sys.argv[1] if len(sys.argv) > 1 else "./data.csv"
+    out = sys.argv[2] if len(sys.argv) > 2 else "./duplicate_eids.csv"
+    papers = load_ingested(src).dropna(subset=["abstract", "title"])
+    _, mapping, report = dedup_papers(papers, workers=4)
+    mapping[mapping["eid"] != mapping["canonical_eid"]].to_csv(out, index=False)
+    print(report)
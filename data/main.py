@@ -1,10 +1,69 @@
 import os
 import json
+import time
+import hashlib
+import tarfile
+import zipfile
+import zlib
+import argparse
+import uuid
 import pandas as pd
 import asyncio
 import aiofiles
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
 from tqdm.asyncio import tqdm_asyncio
 
+from profiling.instrument import span, count, memory_snapshot, export as export_trace
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for the process-pool / parquet mode
+    pa = pq = None
+
+
+def author_ids_from(authors):
+    if isinstance(authors, dict) and "author" in authors:
+        authors = authors["author"]
+
+    author_ids = []
+    if isinstance(authors, list):
+        for a in authors:
+            if isinstance(a, dict):
+                aid = (a.get("@auid") or a.get("authid")
+                       or a.get("authorId") or a.get("id"))
+                if aid:
+                    author_ids.append(aid)
+    return author_ids
+
+
+def subject_areas_from(subj):
+    subject_areas = []
+    if isinstance(subj, list):
+        for s in subj:
+            if isinstance(s, dict):
+                name = s.get("$") or s.get("name") or s.get("@abbrev")
+                if name:
+                    subject_areas.append(name)
+    return subject_areas
+
+
+def affiliations_from(aff):
+    if isinstance(aff, dict) and "affiliation" in aff:
+        aff = aff["affiliation"]
+
+    affs_out = []
+    if isinstance(aff, list):
+        for a in aff:
+            if isinstance(a, dict):
+                affs_out.append({
+                    "afid": a.get("@afid") or a.get("afid") or a.get("id"),
+                    "name": a.get("affilname") or a.get("name"),
+                    "country": a.get("affiliation-country") or a.get("country"),
+                })
+    return affs_out
+
 
 def normalize_entry(entry):
     """Normalize a Scopus Abstract Retrieval JSON entry."""
@@ -33,114 +92,638 @@ def normalize_entry(entry):
     # ------------------------------
     # Authors
     # ------------------------------
-    author_ids = []
     authors = (
             get_path(entry, "authors.author")
             or get_path(entry, "authors")
             or get_path(entry, "author")
             or []
     )
-    if isinstance(authors, dict) and "author" in authors:
-        authors = authors["author"]
-
-    if isinstance(authors, list):
-        for a in authors:
-            if isinstance(a, dict):
-                aid = (a.get("@auid") or a.get("authid")
-                       or a.get("authorId") or a.get("id"))
-                if aid:
-                    author_ids.append(aid)
-
-    out["author_ids"] = author_ids
+    out["author_ids"] = author_ids_from(authors)
 
     # ------------------------------
     # Subject Areas
     # ------------------------------
-    subject_areas = []
     subj = get_path(entry, "subject-areas.subject-area") or get_path(entry, "subject_areas")
-
-    if isinstance(subj, list):
-        for s in subj:
-            if isinstance(s, dict):
-                name = s.get("$") or s.get("name") or s.get("@abbrev")
-                if name:
-                    subject_areas.append(name)
-
-    out["subject_areas"] = subject_areas
+    out["subject_areas"] = subject_areas_from(subj)
 
     # ------------------------------
     # Affiliations
     # ------------------------------
-    affs_out = []
     aff = get_path(entry, "affiliation") or get_path(entry, "affiliations")
+    out["affiliations"] = affiliations_from(aff)
 
-    if isinstance(aff, dict) and "affiliation" in aff:
-        aff = aff["affiliation"]
+    return out
 
-    if isinstance(aff, list):
-        for a in aff:
-            if isinstance(a, dict):
-                affs_out.append({
-                    "afid": a.get("@afid") or a.get("afid") or a.get("id"),
-                    "name": a.get("affilname") or a.get("name"),
-                    "country": a.get("affiliation-country") or a.get("country"),
-                })
+# ------------------------------
+# Compiled per-shape extractors
+# ------------------------------
+# Same fallback order as normalize_entry; each path is "key" or "parent.key".
+FIELD_PATHS = {
+    "eid": ("coredata.eid", "eid"),
+    "title": ("coredata.dc:title", "dc:title", "title"),
+    "abstract": ("coredata.dc:description", "dc:description", "abstract"),
+    "doi": ("coredata.prism:doi", "prism:doi", "doi"),
+    "publication_name": ("coredata.prism:publicationName", "prism:publicationName"),
+    "cover_date": ("coredata.prism:coverDate", "prism:coverDate"),
+    "citedby_count": ("coredata.citedby-count", "citedby-count"),
+}
+BLOCK_PATHS = {
+    "author_ids": ("author_ids_from", ("authors.author", "authors", "author")),
+    "subject_areas": ("subject_areas_from", ("subject-areas.subject-area", "subject_areas")),
+    "affiliations": ("affiliations_from", ("affiliation", "affiliations")),
+}
+_EMPTY = {}
 
-    out["affiliations"] = affs_out
 
-    return out
+def compile_extractor(absent=()):
+    """
+    Generate a straight-line extractor equivalent to normalize_entry: every dotted path is
+    resolved once, here, into plain dict.get calls instead of being split and walked per
+    record. Paths under a parent listed in ``absent`` are dropped; records that do have such
+    a key (or are not dicts) fall back to normalize_entry.
+    """
+    def keep(paths):
+        return [p for p in paths if p.split(".")[0] not in absent or "." not in p]
 
-async def load_single_json(file_path):
-    """Asynchronously read and parse one JSON file."""
-    try:
-        async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
-            content = await f.read()
-        raw = json.loads(content)
-
-        # Detect record list (same logic as before)
-        if isinstance(raw, dict):
-            if "abstracts-retrieval-response" in raw:
-                records = [raw["abstracts-retrieval-response"]]
-            elif "search-results" in raw and "entry" in raw["search-results"]:
-                records = raw["search-results"]["entry"]
+    all_paths = [p for paths in FIELD_PATHS.values() for p in keep(paths)]
+    all_paths += [p for _, paths in BLOCK_PATHS.values() for p in keep(paths)]
+    parents = sorted({p.split(".")[0] for p in all_paths if "." in p})
+    local = {parent: f"p{i}" for i, parent in enumerate(parents)}
+
+    def expr(paths):
+        parts = []
+        for p in keep(paths):
+            if "." in p:
+                parent, key = p.split(".")
+                parts.append(f"{local[parent]}.get({key!r})")
             else:
-                list_fields = [
-                    k for k, v in raw.items()
-                    if isinstance(v, list) and len(v) > 0 and isinstance(v[0], dict)
-                ]
-                records = raw[list_fields[0]] if list_fields else [raw]
-
-        elif isinstance(raw, list):
-            records = raw
+                parts.append(f"entry.get({p!r})")
+        return " or ".join(parts) or "None"
+
+    lines = ["def extract(entry):",
+             "    if not isinstance(entry, dict):",
+             "        return normalize_entry(entry)"]
+    for parent in absent:
+        lines += [f"    if {parent!r} in entry:", "        return normalize_entry(entry)"]
+    for parent, name in local.items():
+        lines += [f"    {name} = entry.get({parent!r})",
+                  f"    if not isinstance({name}, dict):",
+                  f"        {name} = _EMPTY"]
+    lines.append("    return {")
+    for field, paths in FIELD_PATHS.items():
+        value = expr(paths) + (" or 0" if field == "citedby_count" else "")
+        lines.append(f"        {field!r}: {value},")
+    for field, (helper, paths) in BLOCK_PATHS.items():
+        lines.append(f"        {field!r}: {helper}({expr(paths)}),")
+    lines.append("    }")
+
+    namespace = {"normalize_entry": normalize_entry, "_EMPTY": _EMPTY, "author_ids_from": author_ids_from,
+                 "subject_areas_from": subject_areas_from, "affiliations_from": affiliations_from}
+    exec("\n".join(lines), namespace)
+    return namespace["extract"]
+
+
+EXTRACTORS = {
+    "abstracts-retrieval-response": compile_extractor(),
+    "search-results.entry": compile_extractor(absent=("coredata",)),  # search hits are flat
+    "generic": compile_extractor(),
+}
+
+
+def extract_shaped_records(raw):
+    """Find the list of record dicts inside one parsed Scopus JSON document, and its response shape."""
+    if isinstance(raw, dict):
+        if "abstracts-retrieval-response" in raw:
+            return "abstracts-retrieval-response", [raw["abstracts-retrieval-response"]]
+        elif "search-results" in raw and "entry" in raw["search-results"]:
+            return "search-results.entry", raw["search-results"]["entry"]
+        else:
+            list_fields = [
+                k for k, v in raw.items()
+                if isinstance(v, list) and len(v) > 0 and isinstance(v[0], dict)
+            ]
+            return "generic", raw[list_fields[0]] if list_fields else [raw]
+
+    elif isinstance(raw, list):
+        return "generic", raw
+    else:
+        return "generic", [raw]
+
+
+def normalize_records(raw):
+    """Normalize every record in a parsed document with the extractor compiled for its shape."""
+    shape, records = extract_shaped_records(raw)
+    extract = EXTRACTORS[shape]
+    return [extract(r) for r in records]
+
+
+# ------------------------------
+# Sources: plain files of any extension (sniffed), and members of zip / tar archives
+# ------------------------------
+ARCHIVE_SEP = "::"
+
+
+class NotJSONError(ValueError):
+    pass
+
+
+def looks_like_json(content):
+    """Content sniffing instead of trusting the extension: a JSON document starts with { or [."""
+    head = content[:64].lstrip(b"\xef\xbb\xbf").lstrip()
+    return head[:1] in (b"{", b"[")
+
+
+def parse_bytes(content):
+    if not looks_like_json(content):
+        raise NotJSONError("not a JSON document")
+    return normalize_records(json.loads(content))
+
+
+def archive_kind(path):
+    name = path.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith((".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")):
+        return "tar"
+    return None
+
+
+# what a corrupt or truncated zip / tar raises while it is opened or read
+ARCHIVE_ERRORS = (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError, OSError)
+
+
+def iter_archive(path):
+    """Stream (member_name, content) pairs out of a zip or tar archive without extracting it."""
+    if archive_kind(path) == "zip":
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    yield info.filename, zf.read(info)
+    else:
+        with tarfile.open(path, "r|*") as tf:
+            for member in tf:
+                if member.isfile():
+                    yield member.name, tf.extractfile(member).read()
+
+
+def list_sources(dir_path):
+    """
+    Every ingestible unit in dir_path with the stats the manifest compares:
+    plain files, each zip member (key "archive.zip::member") and each tar archive as a whole,
+    since a compressed tar can only be read front to back. A zip that cannot be opened is
+    listed as one "broken" unit carrying the error.
+    """
+    units = {}
+    for entry in sorted(os.scandir(dir_path), key=lambda e: e.name):
+        if not entry.is_file():
+            continue
+        kind = archive_kind(entry.path)
+        if kind == "zip":
+            try:
+                with zipfile.ZipFile(entry.path) as zf:
+                    members = {entry.path + ARCHIVE_SEP + info.filename: {
+                        "kind": "zip", "size": info.file_size,
+                        "mtime": time.mktime(info.date_time + (0, 0, -1)),
+                        "sha1": f"crc32:{info.CRC:08x}",
+                    } for info in zf.infolist() if not info.is_dir()}
+                units.update(members)
+            except ARCHIVE_ERRORS as e:
+                stat = entry.stat()
+                units[entry.path] = {"kind": "broken", "size": stat.st_size, "mtime": stat.st_mtime,
+                                     "sha1": None, "error": repr(e)}
         else:
-            records = [raw]
+            stat = entry.stat()
+            units[entry.path] = {"kind": kind or "file", "size": stat.st_size,
+                                 "mtime": stat.st_mtime, "sha1": None}
+    return units
+
+
+async def load_single_json(file_path):
+    """Asynchronously read and parse one JSON file (any extension; non-JSON files are skipped)."""
+    # the span covers the wait for the read too, so overlapping spans show I/O concurrency
+    with span("ingest.file", path=os.path.basename(file_path)) as s:
+        try:
+            async with aiofiles.open(file_path, "rb") as f:
+                content = await f.read()
+            records = parse_bytes(content)
+        except NotJSONError:
+            count("ingest.skipped")
+            return []
+        except Exception as e:
+            count("ingest.errors")
+            s.args["error"] = repr(e)
+            print(f"[ERROR] Failed to load {file_path}: {e}")
+            return []
+        s.args.update(bytes=len(content), records=len(records))
+        count("ingest.files")
+        count("ingest.bytes", len(content))
+        count("ingest.records", len(records))
+        return records
 
-        return [normalize_entry(r) for r in records]
+
+def load_archive(path):
+    """Records of every JSON member; a corrupt archive is logged and keeps the members read before the error."""
+    records = []
+    with span("ingest.archive", path=os.path.basename(path)) as s:
+        try:
+            for name, content in iter_archive(path):
+                _load_member(path, name, content, records)
+        except ARCHIVE_ERRORS as e:
+            count("ingest.errors")
+            s.args["error"] = repr(e)
+            print(f"[ERROR] Failed to read archive {path}: {e}")
+        s.args["records"] = len(records)
+    count("ingest.records", len(records))
+    return records
+
+
+def _load_member(path, name, content, records):
+    try:
+        records.extend(parse_bytes(content))
+        count("ingest.files")
+        count("ingest.bytes", len(content))
+    except NotJSONError:
+        count("ingest.skipped")
     except Exception as e:
-        print(f"[ERROR] Failed to load {file_path}: {e}")
-        return []
+        count("ingest.errors")
+        print(f"[ERROR] Failed to load {path}{ARCHIVE_SEP}{name}: {e}")
 
 
 async def load_scopus_directory_async(dir_path):
-    files = [os.path.join(dir_path, f) for f in os.listdir(dir_path) if f.lower().endswith(".json")]
+    files = [os.path.join(dir_path, f) for f in os.listdir(dir_path)
+             if os.path.isfile(os.path.join(dir_path, f))]
 
     results = []
     sem = asyncio.Semaphore(100)  # limit concurrency to avoid I/O overload
 
     async def sem_task(f):
         async with sem:
+            if archive_kind(f):
+                return await asyncio.to_thread(load_archive, f)
             return await load_single_json(f)
 
-    for chunk in tqdm_asyncio.as_completed([sem_task(f) for f in files], desc="Loading JSON (async)"):
-        records = await chunk
-        results.extend(records)
+    with span("ingest.directory", files=len(files)) as s:
+        for chunk in tqdm_asyncio.as_completed([sem_task(f) for f in files], desc="Loading JSON (async)"):
+            records = await chunk
+            results.extend(records)
+        s.args["records"] = len(results)
+        with span("ingest.frame"):
+            df = pd.DataFrame(results)
+    memory_snapshot("after ingest")
+    return df
+
+
+# ------------------------------
+# Process-pool ingestion -> chunked parquet
+# ------------------------------
+def parquet_schema():
+    return pa.schema([
+        ("eid", pa.string()),
+        ("title", pa.string()),
+        ("abstract", pa.string()),
+        ("doi", pa.string()),
+        ("publication_name", pa.string()),
+        ("cover_date", pa.string()),
+        ("citedby_count", pa.int64()),
+        ("author_ids", pa.list_(pa.string())),
+        ("subject_areas", pa.list_(pa.string())),
+        ("affiliations", pa.list_(pa.struct([
+            ("afid", pa.string()), ("name", pa.string()), ("country", pa.string()),
+        ]))),
+    ])
+
+
+def to_schema_types(rec):
+    """Coerce a normalized record to the parquet column types (Scopus mixes str/int freely)."""
+    for k in ("eid", "title", "abstract", "doi", "publication_name", "cover_date"):
+        if rec[k] is not None and not isinstance(rec[k], str):
+            rec[k] = str(rec[k])
+    try:
+        rec["citedby_count"] = int(rec["citedby_count"] or 0)
+    except (TypeError, ValueError):
+        rec["citedby_count"] = 0
+    rec["author_ids"] = [str(a) for a in rec["author_ids"]]
+    rec["subject_areas"] = [str(a) for a in rec["subject_areas"]]
+    rec["affiliations"] = [
+        {k: (str(v) if v is not None else None) for k, v in a.items()} for a in rec["affiliations"]
+    ]
+    return rec
+
+
+def file_hash(file_path):
+    with open(file_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def write_part(out_dir, part_name, records):
+    out_path = os.path.join(out_dir, part_name)
+    schema = parquet_schema().append(pa.field("source_file", pa.string()))
+    pq.write_table(pa.Table.from_pylist(records, schema=schema), out_path + ".tmp")
+    os.replace(out_path + ".tmp", out_path)
+
+
+def ingest_content(key, content, entry, records):
+    """Normalize one source into records (tagged with source_file) and fill in its manifest entry."""
+    try:
+        recs = [to_schema_types(r) for r in parse_bytes(content)]
+        for r in recs:
+            r["source_file"] = key
+        records.extend(recs)
+        entry["records"] = len(recs)
+    except NotJSONError:
+        entry.update(status="skipped", part=None)
+    except Exception as e:
+        entry.update(status="failed", error=repr(e), part=None)
+    return entry
+
+
+def ingest_batch(part_name, units, out_dir):
+    """
+    Worker: normalize a batch of plain files / zip members and write them as one parquet
+    chunk. Returns one manifest entry per source (path, size, mtime, sha1, records, status,
+    error, part).
+    """
+    records, entries, zips = [], [], {}
+    try:
+        for key, unit in units:
+            entry = dict(unit, path=key, records=0, status="ok", error=None, part=part_name)
+            try:
+                if unit["kind"] == "zip":
+                    archive, member = key.split(ARCHIVE_SEP, 1)
+                    if archive not in zips:
+                        zips[archive] = zipfile.ZipFile(archive)
+                    content = zips[archive].read(member)
+                else:
+                    with open(key, "rb") as f:
+                        content = f.read()
+                    entry["sha1"] = hashlib.sha1(content).hexdigest()
+            except Exception as e:
+                entries.append(dict(entry, status="failed", error=repr(e), part=None))
+                continue
+            entries.append(ingest_content(key, content, entry, records))
+    finally:
+        for zf in zips.values():
+            zf.close()
+
+    if records:
+        write_part(out_dir, part_name, records)
+    return entries
+
+
+def ingest_tar(part_prefix, path, unit, out_dir, batch_size):
+    """Worker: stream one tar archive front to back, writing a parquet chunk every batch_size members."""
+    records, entries, batch = [], [], []
+    n_part = 0
+    archive_entry = dict(unit, path=path, records=0, status="ok", error=None, part=None)
+
+    def flush():
+        nonlocal records, batch, n_part
+        if records:
+            part_name = f"{part_prefix}-{n_part:04d}.parquet"
+            write_part(out_dir, part_name, records)
+            for e in batch:
+                if e["status"] == "ok":
+                    e["part"] = part_name
+            n_part += 1
+        entries.extend(batch)
+        records, batch = [], []
+
+    try:
+        for name, content in iter_archive(path):
+            entry = {"path": path + ARCHIVE_SEP + name, "kind": "tar-member", "size": len(content),
+                     "mtime": unit["mtime"], "sha1": hashlib.sha1(content).hexdigest(),
+                     "records": 0, "status": "ok", "error": None, "part": None}
+            batch.append(ingest_content(entry["path"], content, entry, records))
+            archive_entry["records"] += entry["records"]
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    except Exception as e:
+        flush()
+        archive_entry.update(status="failed", error=repr(e))
+    return entries + [archive_entry]
+
+
+# ------------------------------
+# Manifest: one JSON line per processed file, last line per path wins
+# ------------------------------
+MANIFEST_FILE = "_manifest.jsonl"
+RETRY_FILE = "_retry.txt"
+
+
+def read_manifest(out_dir):
+    manifest = {}
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    manifest[entry["path"]] = entry
+    return manifest
+
+
+def append_manifest(out_dir, entries):
+    """Checkpoint: entries are flushed to disk as soon as their batch is written."""
+    with open(os.path.join(out_dir, MANIFEST_FILE), "a", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def files_to_ingest(units, manifest, out_dir):
+    """
+    Sources that are new, changed or previously failed. A source whose size/mtime changed but
+    whose content hash (CRC for zip members) did not is only re-stamped in the manifest.
+    """
+    todo, restamped = [], []
+    for key, unit in units.items():
+        prev = manifest.get(key)
+        if prev is None or prev["status"] not in ("ok", "skipped"):
+            todo.append(key)
+            continue
+        if unit["size"] == prev["size"] and unit["mtime"] == prev["mtime"]:
+            continue
+        if unit["kind"] == "file" and unit["size"] == prev["size"] and file_hash(key) == prev["sha1"]:
+            restamped.append(dict(prev, mtime=unit["mtime"]))
+        elif unit["kind"] == "zip" and unit["sha1"] == prev["sha1"]:
+            restamped.append(dict(prev, mtime=unit["mtime"]))
+        else:
+            todo.append(key)
+    if restamped:
+        append_manifest(out_dir, restamped)
+    return todo
+
+
+def retire_entries(manifest, out_dir, stale):
+    """Mark the given manifest entries as retired: readers skip them, so their parts stop being served."""
+    retired = [dict(manifest[key], status="retired", part=None) for key in stale]
+    if retired:
+        append_manifest(out_dir, retired)
+        for entry in retired:
+            manifest[entry["path"]] = entry
+    return len(retired)
+
+
+def missing_sources(units, manifest):
+    """Manifest entries whose source is gone from the input: deleted files, removed zip members, deleted tars."""
+    stale = []
+    for key, entry in manifest.items():
+        if entry["status"] == "retired":
+            continue
+        unit_key = key.split(ARCHIVE_SEP, 1)[0] if entry["kind"] == "tar-member" else key
+        if unit_key not in units:
+            stale.append(key)
+    return stale
+
+
+def load_scopus_directory_parallel(dir_path, out_dir, workers=None, batch_size=256):
+    """
+    Fan batches of JSON sources out to a process pool. Sources are plain files of any extension
+    (detected by content), zip members read in place and tar archives streamed member by
+    member, so nothing is renamed or extracted first. Each worker parses and normalizes its
+    batch and writes it straight to out_dir as a parquet chunk, so the parent never holds
+    records. Sources already in the manifest with unchanged size/mtime (or hash) are skipped,
+    so a rerun only parses new, changed or failed sources and an interrupted run resumes
+    after its last finished batch. Sources no longer in dir_path (and members missing from a
+    re-read tar) are retired in the manifest, so their rows are no longer served. Failed
+    sources are listed in out_dir/_retry.txt.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for parquet ingestion: pip install pyarrow")
+    os.makedirs(out_dir, exist_ok=True)
+    units = list_sources(dir_path)
+    manifest = read_manifest(out_dir)
+    n_retired = retire_entries(manifest, out_dir, missing_sources(units, manifest))
+    todo = files_to_ingest(units, manifest, out_dir)
+    print(f"{len(units)} sources, {len(units) - len(todo)} up to date, {len(todo)} to ingest, {n_retired} retired")
+
+    # archives that could not even be listed fail here, without a worker
+    broken = [dict(units[k], path=k, records=0, status="failed", part=None) for k in todo if units[k]["kind"] == "broken"]
+    if broken:
+        append_manifest(out_dir, broken)
+        for entry in broken:
+            manifest[entry["path"]] = entry
+            count("ingest.errors")
+            print(f"[ERROR] Failed to load {entry['path']}: {entry['error']}")
+
+    # part names must never collide with parts of another run (same second, second process)
+    run_id = f"{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    tars = [k for k in todo if units[k]["kind"] == "tar"]
+    singles = [(k, units[k]) for k in todo if units[k]["kind"] not in ("tar", "broken")]
+    batches = [singles[i:i + batch_size] for i in range(0, len(singles), batch_size)]
+
+    n_records, seen = 0, set()
+    run_span = span("ingest.parallel", sources=len(todo), batches=len(batches) + len(tars), workers=workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(ingest_batch, f"part-{run_id}-{i:06d}.parquet", batch, out_dir)
+                   for i, batch in enumerate(batches)]
+        futures += [pool.submit(ingest_tar, f"part-{run_id}-tar{i:04d}", path, units[path], out_dir, batch_size)
+                    for i, path in enumerate(tars)]
+        for fut in tqdm(as_completed(futures), total=len(futures), desc="Loading JSON (pool)"):
+            entries = fut.result()
+            append_manifest(out_dir, entries)
+            for entry in entries:
+                manifest[entry["path"]] = entry
+                seen.add(entry["path"])
+                n_records += entry["records"] if entry["kind"] != "tar" else 0
+                count("ingest.files")
+                if entry["status"] == "failed":
+                    count("ingest.errors")
+                    print(f"[ERROR] Failed to load {entry['path']}: {entry['error']}")
+    # members dropped from a tar that was read through again
+    reread = tuple(path + ARCHIVE_SEP for path in tars if manifest[path]["status"] == "ok")
+    if reread:
+        retire_entries(manifest, out_dir, [key for key, e in manifest.items()
+                                           if e["kind"] == "tar-member" and e["status"] != "retired"
+                                           and key.startswith(reread) and key not in seen])
+    run_span.args["records"] = n_records
+    run_span.end()
+    count("ingest.records", n_records)
+    memory_snapshot("after ingest")
+
+    failed = sorted(p for p, e in manifest.items() if e["status"] == "failed")
+    with open(os.path.join(out_dir, RETRY_FILE), "w", encoding="utf-8") as f:
+        f.writelines(p + "\n" for p in failed)
+    if failed:
+        print(f"{len(failed)} sources failed; listed in {os.path.join(out_dir, RETRY_FILE)}, retried on the next run")
+    return n_records
+
+
+def load_ingested(path):
+    """Read ingestion output: the legacy data.csv or a parquet directory with its manifest."""
+    if not os.path.isdir(path):
+        return pd.read_csv(path)
+
+    # a file's rows are only valid in the part its latest manifest entry points to; older parts
+    # hold superseded versions of changed files, orphan parts come from interrupted batches
+    current = {}
+    for entry in read_manifest(path).values():
+        if entry["status"] == "ok" and entry["part"]:
+            current.setdefault(entry["part"], []).append(entry["path"])
+
+    frames = []
+    for part, sources in sorted(current.items()):
+        table = pq.read_table(os.path.join(path, part), filters=[("source_file", "in", sources)])
+        frames.append(table.to_pandas())
+    if not frames:
+        return pd.DataFrame(columns=parquet_schema().names)
+    df = pd.concat(frames, ignore_index=True).drop(columns="source_file")
+
+    # parquet gives numpy arrays; plain lists keep the same repr as data.csv downstream
+    for col in ("author_ids", "subject_areas", "affiliations"):
+        df[col] = df[col].apply(lambda x: list(x) if x is not None else [])
+    return df
+
+
+def iter_ingested(path, columns=None, chunk_size=10_000):
+    """
+    Stream ingestion output as DataFrames of at most ``chunk_size`` rows (same rows as
+    load_ingested): data.csv through read_csv chunks, a parquet directory part by part and
+    row batch by row batch, so only one chunk is ever in memory.
+    """
+    list_cols = [c for c in ("author_ids", "subject_areas", "affiliations") if columns is None or c in columns]
+    if not os.path.isdir(path):
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+        return
+
+    current = {}
+    for entry in read_manifest(path).values():
+        if entry["status"] == "ok" and entry["part"]:
+            current.setdefault(entry["part"], set()).add(entry["path"])
 
-    return pd.DataFrame(results)
+    read_cols = None if columns is None else list(columns) + ["source_file"]
+    for part, sources in sorted(current.items()):
+        for batch in pq.ParquetFile(os.path.join(path, part)).iter_batches(chunk_size, columns=read_cols):
+            df = batch.to_pandas()
+            df = df[df["source_file"].isin(sources)].drop(columns="source_file").reset_index(drop=True)
+            if df.empty:
+                continue
+            for col in list_cols:
+                df[col] = df[col].apply(lambda x: list(x) if x is not None else [])
+            yield df
 
 
 if __name__ == "__main__":
-    df = asyncio.run(load_scopus_directory_async(
-        r"C:\Users\ASUS\Downloads\ScopusData2018-2023\ScopusData2018-2023\all"
-    ))
-    df.to_csv("data.csv", index=False)
+    parser = argparse.ArgumentParser(description="Transform Scopus JSON files (plain, extensionless or in zip/tar archives) into a table.")
+    parser.add_argument("dir", nargs="?",
+                        default=r"C:\Users\ASUS\Downloads\ScopusData2018-2023\ScopusData2018-2023\all")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="process-pool workers; 0 keeps the single-process async loader")
+    parser.add_argument("--batch-size", type=int, default=256, help="files per parquet chunk")
+    parser.add_argument("--out", default=None, help="data.csv (async) or a parquet directory (workers > 0)")
+    parser.add_argument("--trace", default=None, help="write stage timings to this .json (Chrome trace) or .jsonl file")
+    args = parser.parse_args()
 
+    if args.workers > 0:
+        out_dir = args.out or "data_parquet"
+        n = load_scopus_directory_parallel(args.dir, out_dir, args.workers, args.batch_size)
+        print(f"Wrote {n} records to {out_dir}")
+    else:
+        df = asyncio.run(load_scopus_directory_async(args.dir))
+        with span("ingest.write_csv", rows=len(df)):
+            df.to_csv(args.out or "data.csv", index=False)
+    if args.trace:
+        export_trace(args.trace)
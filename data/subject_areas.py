@@ -0,0 +1,496 @@
+import ast
+import sys
+
+import numpy as np
+from scipy import sparse
+
+# Scopus "(all)" super-areas -> study group (map_group / map_multi_group in main.ipynb)
+ALL_GROUPS = {
+    "Science & Engineering": [
+        "Materials Science (all)", "Chemistry (all)", "Chemical Engineering (all)",
+        "Physics and Astronomy (all)", "Engineering (all)", "Energy (all)",
+        "Environmental Science (all)", "Mathematics (all)",
+        "Computer Science (all)", "Earth and Planetary Sciences (all)",
+    ],
+    "Biomed & Life Sciences": [
+        "Medicine (all)", "Veterinary (all)", "Dentistry (all)", "Nursing (all)",
+        "Biochemistry, Genetics and Molecular Biology (all)", "Neuroscience (all)",
+        "Pharmacology, Toxicology and Pharmaceutics (all)",
+        "Immunology and Microbiology (all)",
+        "Agricultural and Biological Sciences (all)",
+        "Health Professions (all)",
+    ],
+    "Social & Humanities": [
+        "Social Sciences (all)", "Psychology (all)", "Business, Management and Accounting (all)",
+        "Arts and Humanities (all)", "Economics, Econometrics and Finance (all)",
+        "Decision Sciences (all)",
+    ],
+}
+
+# detailed areas -> study group (map_none_group in main.ipynb); a label listed under
+# several groups belongs to the first one
+DETAIL_GROUPS = {
+    "Science & Engineering": [
+        "Computer Networks and Communications",
+        "Electrical and Electronic Engineering",
+        "Computer Science Applications",
+        "Renewable Energy",
+        "Sustainability and the Environment",
+        "Organic Chemistry",
+        "Energy Engineering and Power Technology",
+        "Artificial Intelligence",
+        "Analytical Chemistry",
+        "Nuclear and High Energy Physics",
+        "Physical and Theoretical Chemistry",
+        "Materials Chemistry",
+        "Condensed Matter Physics",
+        "Computer Vision and Pattern Recognition",
+        "Instrumentation",
+        "Pollution",
+        "Waste Management and Disposal",
+        "Environmental Engineering",
+        "Hardware and Architecture",
+        "Electronic, Optical and Magnetic Materials",
+        "Information Systems and Management",
+        "Control and Optimization",
+        "Environmental Chemistry",
+        "Human-Computer Interaction",
+        "Catalysis",
+        "Building and Construction",
+        "Mechanical Engineering",
+        "Safety, Risk, Reliability and Quality",
+        "Inorganic Chemistry",
+        "Process Chemistry and Technology",
+        "Physics and Astronomy (miscellaneous)",
+        "Signal Processing",
+        "Geotechnical Engineering and Engineering Geology",
+        "Environmental Science (miscellaneous)",
+        "Industrial and Manufacturing Engineering",
+        "Surfaces, Coatings and Films",
+        "Atomic and Molecular Physics",
+        "Optics",
+        "Metals and Alloys",
+        "Mechanics of Materials",
+        "Control and Systems Engineering",
+        "Chemistry (miscellaneous)",
+        "Chemical Engineering (miscellaneous)",
+        "Water Science and Technology",
+        "Computer Science (miscellaneous)",
+        "Applied Mathematics",
+        "Astronomy and Astrophysics",
+        "Ceramics and Composites",
+        "Space and Planetary Science",
+        "Modeling and Simulation",
+        "Electrochemistry",
+        "Architecture",
+        "Surfaces and Interfaces",
+        "Nuclear Energy and Engineering",
+        "Energy (miscellaneous)",
+        "Transportation",
+        "Colloid and Surface Chemistry",
+        "Statistics and Probability",
+        "Materials Science (miscellaneous)",
+        "Automotive Engineering",
+        "Filtration and Separation",
+        "Computational Mathematics",
+        "Atmospheric Science",
+        "Computational Theory and Mathematics",
+        "Computers in Earth Sciences",
+        "Aerospace Engineering",
+        "Numerical Analysis",
+        "Mathematics (miscellaneous)",
+        "Computational Mechanics",
+        "Geophysics",
+        "Algebra and Number Theory",
+        "Theoretical Computer Science",
+        "Acoustics and Ultrasonics",
+        "Geometry and Topology",
+        "Stratigraphy",
+        "Human Factors and Ergonomics",
+        "Statistical and Nonlinear Physics",
+        "Paleontology",
+        "Fluid Flow and Transfer Processes",
+        "Ocean Engineering",
+        "Earth-Surface Processes",
+        "Radiation",
+        "Geochemistry and Petrology",
+        "Economic Geology",
+        "Surface and Interfaces",
+        "Structural Biology",
+    ],
+    "Biomed & Life Sciences": [
+        "Infectious Diseases",
+        "Public Health",
+        "Environmental and Occupational Health",
+        "Biochemistry",
+        "Molecular Biology",
+        "Pharmaceutical Science",
+        "Pharmacology",
+        "Immunology",
+        "Drug Discovery",
+        "Ecology, Evolution, Behavior and Systematics",
+        "Food Science",
+        "Surgery",
+        "Molecular Medicine",
+        "Biotechnology",
+        "Plant Science",
+        "Neurology (clinical)",
+        "Microbiology",
+        "Oncology",
+        "Pharmacology (medical)",
+        "Animal Science and Zoology",
+        "Immunology and Allergy",
+        "Aquatic Science",
+        "Genetics",
+        "Gastroenterology",
+        "Microbiology (medical)",
+        "Radiology, Nuclear Medicine and Imaging",
+        "Cancer Research",
+        "Pediatrics, Perinatology and Child Health",
+        "Bioengineering",
+        "Neurology",
+        "Orthopedics and Sports Medicine",
+        "Biomedical Engineering",
+        "Psychiatry and Mental Health",
+        "Health, Toxicology and Mutagenesis",
+        "Nephrology",
+        "Hematology",
+        "Cell Biology",
+        "Cardiology and Cardiovascular Medicine",
+        "Complementary and Alternative Medicine",
+        "Virology",
+        "Biomaterials",
+        "Medicine (miscellaneous)",
+        "Dermatology",
+        "Nutrition and Dietetics",
+        "Endocrinology, Diabetes and Metabolism",
+        "Applied Microbiology and Biotechnology",
+        "Ophthalmology",
+        "Otorhinolaryngology",
+        "Physiology",
+        "Hepatology",
+        "Clinical Biochemistry",
+        "Ecology",
+        "Parasitology",
+        "Cellular and Molecular Neuroscience",
+        "Epidemiology",
+        "Obstetrics and Gynecology",
+        "Biophysics",
+        "Physical Therapy, Sports Therapy and Rehabilitation",
+        "Pathology and Forensic Medicine",
+        "Oral Surgery",
+        "Critical Care and Intensive Care Medicine",
+        "Pulmonary and Respiratory Medicine",
+        "Physiology (medical)",
+        "Health Informatics",
+        "Agricultural and Biological Sciences (miscellaneous)",
+        "Endocrinology",
+        "Geriatrics and Gerontology",
+        "Genetics (clinical)",
+        "Urology",
+        "Biological Psychiatry",
+        "Toxicology",
+        "Developmental Biology",
+        "Transplantation",
+        "Histology",
+        "Internal Medicine",
+        "Horticulture",
+        "Rehabilitation",
+        "Immunology and Microbiology (miscellaneous)",
+        "Food Animals",
+        "Behavioral Neuroscience",
+        "Clinical Psychology",
+        "Radiological and Ultrasound Technology",
+        "Cognitive Neuroscience",
+        "Anatomy",
+        "Biochemistry (medical)",
+        "Pharmacology, Toxicology and Pharmaceutics (miscellaneous)",
+        "Veterinary (miscellaneous)",
+        "Forestry",
+        "Anesthesiology and Pain Medicine",
+        "Periodontics",
+        "Pharmacy",
+        "Rheumatology",
+        "Dentistry (miscellaneous)",
+        "Orthodontics",
+        "Small Animals",
+        "Medical and Surgical Nursing",
+        "Oncology (nursing)",
+        "Occupational Therapy",
+        "Neuroscience (miscellaneous)",
+        "Psychiatric Mental Health",
+        "Speech and Hearing",
+        "Dental Hygiene",
+        "Podiatry",
+        "Critical Care Nursing",
+        "Care Planning",
+        "Dental Assisting",
+        "Chiropractics",
+        "Emergency Nursing",
+        "Family Practice",
+        "Assessment and Diagnosis",
+        "Optometry",
+        "Emergency Medicine",
+        "Equine",
+        "Developmental Neuroscience",
+        "Aging",
+        "Advanced and Specialized Nursing",
+        "Maternity and Midwifery",
+        "Complementary and Manual Therapy",
+        "Nursing (miscellaneous)",
+        "Fundamentals and Skills",
+        "Reproductive Medicine",
+        "Medical Laboratory Technology",
+        "Community and Home Care",
+    ],
+    "Social & Humanities": [
+        "Information Systems",
+        "Management",
+        "Monitoring, Policy and Law",
+        "Geography, Planning and Development",
+        "Health Policy",
+        "Education",
+        "Strategy and Management",
+        "Information Systems and Management",
+        "Management Science and Operations Research",
+        "Management of Technology and Innovation",
+        "Nature and Landscape Conservation",
+        "Development",
+        "History",
+        "Finance",
+        "Urban Studies",
+        "Business and International Management",
+        "Sociology and Political Science",
+        "Social Sciences (miscellaneous)",
+        "History and Philosophy of Science",
+        "Political Science and International Relations",
+        "Social Psychology",
+        "Cultural Studies",
+        "Marketing",
+        "Language and Linguistics",
+        "Linguistics and Language",
+        "Organizational Behavior and Human Resource Management",
+        "Business, Management and Accounting (miscellaneous)",
+        "Management Information Systems",
+        "Library and Information Sciences",
+        "Visual Arts and Performing Arts",
+        "Economics and Econometrics",
+        "Economics, Econometrics and Finance (miscellaneous)",
+        "Anthropology",
+        "Statistics, Probability and Uncertainty",
+        "Arts and Humanities (miscellaneous)",
+        "Communication",
+        "Accounting",
+        "Decision Sciences (miscellaneous)",
+        "Museology",
+        "Law",
+        "Tourism, Leisure and Hospitality Management",
+        "Analysis",
+        "Music",
+        "Applied Psychology",
+        "Literature and Literary Theory",
+        "Public Administration",
+        "Health (social science)",
+        "Health Information Management",
+        "Leadership and Management",
+        "Logic",
+        "Religious Studies",
+        "Developmental and Educational Psychology",
+        "Demography",
+        "Archeology",
+        "Archeology (arts and humanities)",
+        "Research and Theory",
+        "Issues, Ethics and Legal Aspects",
+        "Industrial Relations",
+        "Life-span and Life-course Studies",
+        "Fundamentals and Skills",
+        "Gender Studies",
+        "Media Technology",
+        "Assessment and Diagnosis",
+        "Organization Behavior and Human Resource Management",
+    ],
+}
+
+GROUP_NAMES = list(ALL_GROUPS)
+
+
+def parse_areas(x):
+    """Subject areas as a list, whether stored as a list, an array or a stringified list (CSV)."""
+    if isinstance(x, list): return x
+    if isinstance(x, (tuple, np.ndarray)): return list(x)
+    if not isinstance(x, str): return []
+    try:
+        value = ast.literal_eval(x)
+    except (ValueError, SyntaxError):
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else []
+
+
+def build_vocab(area_lists):
+    """Area -> integer id, most frequent areas first (ties by name)."""
+    counts = {}
+    for areas in area_lists:
+        for a in areas:
+            counts[a] = counts.get(a, 0) + 1
+    return {a: i for i, a in enumerate(sorted(counts, key=lambda a: (-counts[a], a)))}
+
+
+def encode_areas(values, vocab=None):
+    """
+    Parse an areas column once into a CSR indicator matrix (rows = papers, columns = vocab ids).
+    Areas missing from a given vocab are dropped. Returns (vocab, matrix).
+    """
+    area_lists = [parse_areas(x) for x in values]
+    if vocab is None:
+        vocab = build_vocab(area_lists)
+    indptr = np.zeros(len(area_lists) + 1, dtype=np.int64)
+    indices = []
+    for i, areas in enumerate(area_lists):
+        ids = sorted({vocab[a] for a in areas if a in vocab})
+        indices.extend(ids)
+        indptr[i + 1] = len(indices)
+    indices = np.asarray(indices, dtype=np.int32)
+    matrix = sparse.csr_matrix((np.ones(len(indices), dtype=np.int8), indices, indptr),
+                               shape=(len(area_lists), len(vocab)))
+    return vocab, matrix
+
+
+def vocab_labels(vocab):
+    labels = np.empty(len(vocab), dtype=object)
+    for a, i in vocab.items():
+        labels[i] = a
+    return labels
+
+
+def group_array(vocab, groups, group_names=None):
+    """
+    Group id of every vocab column (-1 when unmapped). ``groups`` is group -> [labels] like
+    ALL_GROUPS, or label -> group like label_mapping in main.ipynb.
+    """
+    if groups and isinstance(next(iter(groups.values())), str):
+        label_to_group = groups
+        group_names = group_names or sorted(set(groups.values()))
+    else:
+        group_names = group_names or list(groups)
+        label_to_group = {}
+        for g, labels in groups.items():
+            for a in labels:
+                label_to_group.setdefault(a, g)
+    gid = {g: i for i, g in enumerate(group_names)}
+    out = np.full(len(vocab), -1, dtype=np.int32)
+    for a, i in vocab.items():
+        if a in label_to_group:
+            out[i] = gid[label_to_group[a]]
+    return out, group_names
+
+
+def study_group_array(vocab):
+    """Group id per vocab column for the three study groups: "(all)" areas, then detailed areas."""
+    groups = {g: ALL_GROUPS[g] + DETAIL_GROUPS[g] for g in GROUP_NAMES}
+    return group_array(vocab, groups, GROUP_NAMES)[0]
+
+
+def all_area_mask(vocab):
+    """Columns that are Scopus "(all)" super-areas."""
+    mask = np.zeros(len(vocab), dtype=bool)
+    for a, i in vocab.items():
+        mask[i] = "(all)" in a
+    return mask
+
+
+def group_indicator(groups, n_groups):
+    """Sparse (n_areas x n_groups) one-hot of a group array; unmapped areas get no column."""
+    mapped = np.flatnonzero(groups >= 0)
+    return sparse.csr_matrix((np.ones(len(mapped), dtype=np.int32), (mapped, groups[mapped])),
+                             shape=(len(groups), n_groups))
+
+
+def group_counts(matrix, groups, n_groups, columns=None):
+    """Per-row label counts by group (dense rows x n_groups) and per-row unmapped counts."""
+    if columns is not None:
+        matrix = matrix[:, columns]
+        groups = groups[columns]
+    matrix = matrix.astype(np.int32)
+    counts = (matrix @ group_indicator(groups, n_groups)).toarray()
+    unmapped = np.asarray(matrix[:, groups < 0].sum(axis=1)).ravel()
+    return counts, unmapped
+
+
+def unanimous_group(matrix, groups, n_groups, columns=None):
+    """
+    Group of each row when every label (restricted to ``columns``) maps to the same group,
+    else -1: the vectorized map_multi_group / map_none_group.
+    """
+    counts, unmapped = group_counts(matrix, groups, n_groups, columns)
+    single = ((counts > 0).sum(axis=1) == 1) & (unmapped == 0)
+    return np.where(single, counts.argmax(axis=1), -1)
+
+
+def majority_group(matrix, groups, n_groups):
+    """Most frequent mapped group of each row (lowest id on ties), -1 when nothing maps: convert_labels."""
+    counts, _ = group_counts(matrix, groups, n_groups)
+    return np.where(counts.sum(axis=1) > 0, counts.argmax(axis=1), -1)
+
+
+def paper_group(matrix, vocab):
+    """
+    Study group of each paper, -1 when undecided (main.ipynb's group_label): a single "(all)" area
+    gives its group (unmapped ones count as Social & Humanities), several "(all)" areas or only
+    detailed areas give their group when they all agree.
+    """
+    groups = study_group_array(vocab)
+    is_all = all_area_mask(vocab)
+    n_groups = len(GROUP_NAMES)
+    n_all = np.asarray(matrix[:, is_all].sum(axis=1)).ravel()
+    social = GROUP_NAMES.index("Social & Humanities")
+    single = unanimous_group(matrix, np.where(groups >= 0, groups, social), n_groups, columns=is_all)
+    multi = unanimous_group(matrix, groups, n_groups, columns=is_all)
+    none = unanimous_group(matrix, groups, n_groups)
+    return np.select([n_all == 1, n_all > 1], [single, multi], none)
+
+
+def rows_with_any(matrix, area_ids):
+    """Boolean mask of rows carrying at least one of the given areas."""
+    return np.asarray(matrix[:, np.asarray(area_ids, dtype=np.int64)].sum(axis=1)).ravel() > 0
+
+
+def area_counts(matrix, rows=None):
+    """Papers per area, optionally over a row mask / index array."""
+    if rows is not None:
+        matrix = matrix[rows]
+    return np.asarray(matrix.sum(axis=0, dtype=np.int64)).ravel()
+
+
+def breakdown(matrix, keys, n_keys, rows=None):
+    """Papers per (key, area) as a dense n_keys x n_areas array, e.g. keys = industry code per paper."""
+    keys = np.asarray(keys)
+    if rows is not None:
+        matrix, keys = matrix[rows], keys[rows]
+    valid = keys >= 0
+    onehot = sparse.csr_matrix((np.ones(int(valid.sum()), dtype=np.int64), (keys[valid], np.flatnonzero(valid))),
+                               shape=(n_keys, len(keys)))
+    return (onehot @ matrix.astype(np.int64)).toarray()
+
+
+def save_areas(path, vocab, matrix):
+    np.savez(path, labels=vocab_labels(vocab).astype(str), indptr=matrix.indptr,
+             indices=matrix.indices, shape=np.asarray(matrix.shape))
+
+
+def load_areas(path):
+    data = np.load(path)
+    labels = data["labels"].tolist()
+    indices = data["indices"]
+    matrix = sparse.csr_matrix((np.ones(len(indices), dtype=np.int8), indices, data["indptr"]),
+                               shape=tuple(data["shape"]))
+    return {a: i for i, a in enumerate(labels)}, matrix
+
+
+if __name__ == "__main__":
+    # encode the subject_areas column of an ingested table (data.csv or a parquet directory)
+    from data.main import load_ingested
+    src = sys.argv[1] if len(sys.argv) > 1 else "./data.csv"
+    out = sys.argv[2] if len(sys.argv) > 2 else "./subject_areas.npz"
+    vocab, matrix = encode_areas(load_ingested(src)["subject_areas"])
+    save_areas(out, vocab, matrix)
+    print(f"Wrote {out}: {matrix.shape[0]} papers x {len(vocab)} areas, {matrix.nnz} labels")
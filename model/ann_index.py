@@ -0,0 +1,186 @@
+import os
+import sys
+
+import numpy as np
+
+from model.embedding_store import open_store
+
+INDEX_FILE = "ivf.npz"
+
+
+def _normalize(x):
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def _assign(vectors, centroids, block_size=65536):
+    """Nearest centroid (by dot product) for every row, computed in blocks."""
+    out = np.empty(len(vectors), dtype=np.int32)
+    for i in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[i:i + block_size], dtype=np.float32)
+        out[i:i + block_size] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def spherical_kmeans(sample, n_lists, n_iter=10, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = _assign(sample, centroids)
+        order = np.argsort(assign, kind="stable")
+        members, starts = np.unique(assign[order], return_index=True)
+        sums = np.add.reduceat(sample[order], starts, axis=0)
+
+        new = sample[rng.choice(len(sample), n_lists, replace=True)].copy()  # reseed empty lists
+        new[members] = sums
+        centroids = _normalize(new)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index over normalized embeddings: rows are bucketed by their nearest
+    k-means centroid, and a query only scores the rows in its n_probe closest buckets.
+    Rows appended to the store after the build are bucketed with extend().
+    """
+
+    def __init__(self, vectors, centroids, order, offsets):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, n_iter=10, sample_size=50_000, seed=0):
+        n = len(vectors)
+        if n_lists is None:
+            n_lists = max(1, int(4 * np.sqrt(n)))
+        n_lists = min(n_lists, n)
+
+        rng = np.random.default_rng(seed)
+        sample_ids = np.sort(rng.choice(n, min(n, max(sample_size, n_lists)), replace=False))
+        sample = _normalize(vectors[sample_ids])
+        centroids = spherical_kmeans(sample, n_lists, n_iter, seed)
+
+        assign = _assign(vectors, centroids)
+        order = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))]).astype(np.int64)
+        return cls(vectors, centroids, order, offsets)
+
+    def save(self, path):
+        np.savez(path, centroids=self.centroids, order=self.order, offsets=self.offsets,
+                 n_indexed=len(self.order))
+
+    @classmethod
+    def load(cls, path, vectors):
+        data = np.load(path)
+        n_indexed = int(data["n_indexed"]) if "n_indexed" in data else len(data["order"])
+        if n_indexed > len(vectors):
+            raise ValueError(f"index covers {n_indexed} rows but the store has {len(vectors)}; rebuild it")
+        return cls(vectors, data["centroids"], data["order"], data["offsets"])
+
+    def extend(self):
+        """Bucket the store rows added since the build by their nearest centroid; returns how many."""
+        n_indexed, n = len(self.order), len(self.vectors)
+        if n == n_indexed:
+            return 0
+        n_lists = len(self.centroids)
+        assign = np.concatenate([np.repeat(np.arange(n_lists), np.diff(self.offsets)),
+                                 _assign(self.vectors[n_indexed:], self.centroids)])
+        ids = np.concatenate([self.order, np.arange(n_indexed, n, dtype=np.int64)])
+        self.order = ids[np.argsort(assign, kind="stable")]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))]).astype(np.int64)
+        return n - n_indexed
+
+    def search(self, query, k=10, n_probe=8, min_score=None):
+        """
+        Top-k (row_ids, scores) for one query vector, sorted by descending cosine similarity.
+        With min_score, every probed row scoring at least min_score is returned as well, even
+        past k.
+        """
+        q = _normalize(query).reshape(-1)
+        n_probe = min(n_probe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ q), n_probe - 1)[:n_probe]
+
+        ids = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+        if len(ids) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids.sort()  # read the memory map front to back
+        scores = np.asarray(self.vectors[ids], dtype=np.float32) @ q
+
+        if min_score is not None:
+            k = max(k, int((scores >= min_score).sum()))
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return ids[top], scores[top]
+
+
+def load_index(store_path, build=False):
+    """
+    Open the IVF index stored next to an embedding store, building it if asked and missing.
+    Rows appended to the store since the index was saved are bucketed and the index re-saved.
+    """
+    store = open_store(store_path)
+    index_path = os.path.join(store_path, INDEX_FILE)
+    if os.path.exists(index_path):
+        index = IVFIndex.load(index_path, store.vectors)
+        if index.extend():
+            try:
+                index.save(index_path)
+            except OSError:
+                pass
+        return store, index
+    if not build:
+        raise FileNotFoundError(f"no index at {index_path}; run python -m model.ann_index {store_path}")
+    index = IVFIndex.build(store.vectors)
+    index.save(index_path)
+    return store, index
+
+
+def baseline_sample(vectors, size=20_000, seed=0):
+    """Random subset of rows used to estimate a new company's similarity distribution."""
+    rng = np.random.default_rng(seed)
+    ids = np.sort(rng.choice(len(vectors), min(size, len(vectors)), replace=False))
+    return np.asarray(vectors[ids], dtype=np.float32)
+
+
+def provisional_alignment(query, index, sample, reference_scores, k=500, n_probe=16, z_cut=3):
+    """
+    Score a company that is not in the offline run.
+
+    The company's mean/std similarity over all papers is estimated on ``sample``; every probed
+    paper above mean + z_cut * std is an outlier, as in the offline z > 3 filter (the result
+    holds all of them plus the top-k rows, so the score is not capped at k). The alignment
+    score is the sum of their similarities (same definition as total_alignment_score), and
+    its z-score is taken against ``reference_scores``.
+    """
+    q = _normalize(query).reshape(-1)
+    sample_sims = sample @ q
+    mean, std = float(sample_sims.mean()), float(sample_sims.std())
+
+    ids, scores = index.search(q, k=k, n_probe=n_probe, min_score=mean + z_cut * std if std > 0 else None)
+    z = (scores - mean) / std if std > 0 else np.zeros_like(scores)
+    hits = z > z_cut
+
+    score = float(scores[hits].sum())
+    ref = np.asarray(reference_scores, dtype=float)
+    ref_std = ref.std()
+    return {
+        "ids": ids,
+        "scores": scores,
+        "z": z,
+        "hits": hits,
+        "alignment_score": score,
+        "alignment_z": (score - ref.mean()) / ref_std if ref_std > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    store_path = sys.argv[1] if len(sys.argv) > 1 else "./paper_store"
+    store = open_store(store_path)
+    index = IVFIndex.build(store.vectors)
+    index.save(os.path.join(store_path, INDEX_FILE))
+    print(f"Indexed {len(store)} rows into {len(index.centroids)} lists")
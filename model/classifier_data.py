@@ -0,0 +1,128 @@
+import numpy as np
+
+
+class TokenizedDataset:
+    """
+    Texts tokenized once, without padding, into one flat int32 array of token ids plus row
+    offsets (a few bytes per token instead of Python lists padded to the longest text).
+    Items are (input_ids, label) with input_ids a view into the flat array; padding happens
+    per batch in DynamicPaddingCollator. Works as a map-style torch Dataset.
+    """
+
+    def __init__(self, texts, labels, tokenizer, max_len=384, chunk_size=1000):
+        texts = list(texts)
+        pieces, lengths = [], []
+        for i in range(0, len(texts), chunk_size):
+            enc = tokenizer(texts[i:i + chunk_size], truncation=True, max_length=max_len, padding=False)
+            for ids in enc["input_ids"]:
+                pieces.append(np.asarray(ids, dtype=np.int32))
+                lengths.append(len(ids))
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)]).astype(np.int64)
+        self.ids = np.concatenate(pieces) if pieces else np.empty(0, dtype=np.int32)
+        # class ids (int64) or multi-hot rows (float32, multi-label)
+        labels = np.asarray(labels)
+        self.labels = labels.astype(np.int64 if labels.ndim == 1 and labels.dtype.kind in "iub" else np.float32)
+        self.pad_token_id = tokenizer.pad_token_id or 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __getitem__(self, idx):
+        return self.ids[self.offsets[idx]:self.offsets[idx + 1]], self.labels[idx]
+
+
+class BucketBatchSampler:
+    """
+    Batches of similar-length samples. Indices are shuffled, cut into pools of
+    ``pool_batches`` batches, sorted by length inside each pool and split into batches;
+    the batch order is then shuffled again. With shuffle=False the whole dataset is one
+    pool (deterministic, minimal padding - for evaluation). Use as DataLoader(batch_sampler=...).
+    """
+
+    def __init__(self, lengths, batch_size=32, shuffle=True, pool_batches=50, drop_last=False, seed=0):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.pool_batches = pool_batches
+        self.drop_last = drop_last
+        self.rng = np.random.default_rng(seed)
+
+    def batches(self):
+        n = len(self.lengths)
+        if self.shuffle:
+            order = self.rng.permutation(n)
+            pool = self.batch_size * self.pool_batches
+        else:
+            order = np.arange(n)
+            pool = max(n, 1)
+
+        out = []
+        for i in range(0, n, pool):
+            idx = order[i:i + pool]
+            idx = idx[np.argsort(self.lengths[idx], kind="stable")]
+            out.extend(idx[j:j + self.batch_size] for j in range(0, len(idx), self.batch_size))
+        if self.drop_last and out and len(out[-1]) < self.batch_size:
+            out = [b for b in out if len(b) == self.batch_size]
+        if self.shuffle:
+            out = [out[i] for i in self.rng.permutation(len(out))]
+        return out
+
+    def __iter__(self):
+        for b in self.batches():
+            yield b.tolist()
+
+    def __len__(self):
+        n = len(self.lengths)
+        return n // self.batch_size if self.drop_last else -(-n // self.batch_size)
+
+
+class DynamicPaddingCollator:
+    """Pad a batch of (input_ids, label) items to the batch's longest sequence (rounded up to pad_to_multiple_of)."""
+
+    def __init__(self, pad_token_id=0, pad_to_multiple_of=8):
+        self.pad_token_id = pad_token_id
+        self.pad_to_multiple_of = pad_to_multiple_of
+
+    def __call__(self, items):
+        import torch
+
+        input_ids, attention_mask = pad_batch([ids for ids, _ in items], self.pad_token_id, self.pad_to_multiple_of)
+        return {
+            "input_ids": torch.from_numpy(input_ids),
+            "attention_mask": torch.from_numpy(attention_mask),
+            "labels": torch.from_numpy(np.stack([label for _, label in items])),
+        }
+
+
+def padded_width(length, multiple=8):
+    return -(-length // multiple) * multiple if multiple else length
+
+
+def pad_batch(sequences, pad_token_id=0, pad_to_multiple_of=8):
+    """int64 (input_ids, attention_mask) arrays for token-id sequences, padded to the longest one."""
+    width = padded_width(max(len(ids) for ids in sequences), pad_to_multiple_of)
+    input_ids = np.full((len(sequences), width), pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros((len(sequences), width), dtype=np.int64)
+    for row, ids in enumerate(sequences):
+        input_ids[row, :len(ids)] = ids
+        attention_mask[row, :len(ids)] = 1
+    return input_ids, attention_mask
+
+
+def padding_report(lengths, batches, pad_to_multiple_of=8):
+    """
+    Real vs padded token counts: "before" pads every sample to the longest one in the
+    dataset (tokenizer(..., padding=True)), "after" pads each batch to its own longest.
+    """
+    lengths = np.asarray(lengths)
+    real = int(lengths.sum())
+    before = len(lengths) * int(lengths.max()) if len(lengths) else 0
+    after = sum(len(b) * padded_width(int(lengths[b].max()), pad_to_multiple_of) for b in batches if len(b))
+    return {
+        "real_tokens": real,
+        "padded_tokens_before": before,
+        "padded_tokens_after": after,
+        "pad_share_before": 1 - real / before if before else 0.0,
+        "pad_share_after": 1 - real / after if after else 0.0,
+    }
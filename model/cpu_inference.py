@@ -0,0 +1,295 @@
+"""
+CPU batch inference for the fine-tuned subject-group classifier in main.ipynb.
+
+The model is saved once with save_classifier and then served by one of four backends:
+
+- ``fp32``      : the saved PyTorch model as is
+- ``int8``      : PyTorch dynamic quantization (int8 weights for every nn.Linear)
+- ``onnx``      : ONNX Runtime over the exported graph (export_onnx)
+- ``onnx-int8`` : ONNX Runtime over the dynamically quantized ONNX graph
+
+label_papers shards the papers across a process pool; every worker loads the model once,
+runs with a fixed number of intra-op threads and writes its predictions as one parquet
+part per shard, so a rerun skips the shards that are already on disk. out_dir/_run.json
+records which input the parts belong to; a rerun on a different frame refuses to resume.
+
+    python -m model.cpu_inference ./group_classifier ./data.csv ./group_labels --backend int8 --workers 4
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from model.classifier_data import BucketBatchSampler, pad_batch
+
+BACKENDS = ("fp32", "int8", "onnx", "onnx-int8")
+LABELS_FILE = "labels.json"
+ONNX_FILE = "model.onnx"
+RUN_FILE = "_run.json"
+ONNX_INT8_FILE = "model.int8.onnx"
+
+
+def save_classifier(model, tokenizer, out_dir, labels):
+    """Save the fine-tuned model, its tokenizer and the class names (index order) for inference."""
+    os.makedirs(out_dir, exist_ok=True)
+    model.save_pretrained(out_dir)
+    tokenizer.save_pretrained(out_dir)
+    with open(os.path.join(out_dir, LABELS_FILE), "w", encoding="utf-8") as f:
+        json.dump([str(label) for label in labels], f)
+
+
+def load_labels(model_dir):
+    with open(os.path.join(model_dir, LABELS_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization: Linear weights stored as int8, activations quantized per batch."""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_onnx(model_dir, quantize=False, opset=17):
+    """
+    Export the saved model to model_dir/model.onnx with dynamic batch and sequence axes and,
+    with quantize=True, also write the int8 graph (model.int8.onnx). Returns the path to use.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
+    path = os.path.join(model_dir, ONNX_FILE)
+    if not os.path.exists(path):
+        model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+        dummy = (torch.ones((2, 16), dtype=torch.long), torch.ones((2, 16), dtype=torch.long))
+        axes = {0: "batch", 1: "sequence"}
+        torch.onnx.export(
+            model, dummy, path, opset_version=opset,
+            input_names=["input_ids", "attention_mask"], output_names=["logits"],
+            dynamic_axes={"input_ids": axes, "attention_mask": axes, "logits": {0: "batch"}},
+        )
+    if not quantize:
+        return path
+
+    int8_path = os.path.join(model_dir, ONNX_INT8_FILE)
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+class ClassifierRunner:
+    """
+    One loaded backend. predict_proba tokenizes without padding, sorts the texts by length,
+    pads each batch to its own longest text and returns class probabilities in input order.
+    """
+
+    def __init__(self, model_dir, backend="int8", threads=1, max_len=384, batch_size=32):
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.backend = backend
+        self.max_len = max_len
+        self.batch_size = batch_size
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        config = AutoConfig.from_pretrained(model_dir)
+        self.num_labels = config.num_labels
+        self.multi_label = config.problem_type == "multi_label_classification"
+
+        if backend.startswith("onnx"):
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            path = export_onnx(model_dir, quantize=backend == "onnx-int8")
+            self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        else:
+            import torch
+            from transformers import AutoModelForSequenceClassification
+            torch.set_num_threads(threads)
+            model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+            self.model = quantize_int8(model) if backend == "int8" else model
+
+    def _logits(self, input_ids, attention_mask):
+        if self.backend.startswith("onnx"):
+            return self.session.run(["logits"], {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+        import torch
+        with torch.inference_mode():
+            return self.model(input_ids=torch.from_numpy(input_ids),
+                              attention_mask=torch.from_numpy(attention_mask)).logits.float().numpy()
+
+    def predict_proba(self, texts):
+        texts = ["" if not isinstance(t, str) else t for t in texts]
+        if not texts:
+            return np.empty((0, self.num_labels), dtype=np.float32)
+        ids = self.tokenizer(texts, truncation=True, max_length=self.max_len, padding=False)["input_ids"]
+        lengths = np.fromiter((len(x) for x in ids), dtype=np.int64, count=len(ids))
+        out = np.empty((len(texts), self.num_labels), dtype=np.float32)
+        for batch in BucketBatchSampler(lengths, self.batch_size, shuffle=False).batches():
+            input_ids, attention_mask = pad_batch([ids[i] for i in batch], self.tokenizer.pad_token_id or 0)
+            logits = self._logits(input_ids, attention_mask).astype(np.float32)
+            out[batch] = _sigmoid(logits) if self.multi_label else _softmax(logits)
+        return out
+
+
+def _softmax(logits):
+    z = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return z / z.sum(axis=1, keepdims=True)
+
+
+def _sigmoid(logits):
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+# one runner per worker process, loaded by the pool initializer
+_runner = None
+
+
+def _init_worker(model_dir, backend, threads, max_len, batch_size):
+    global _runner
+    # cap the BLAS / OpenMP pools too, so workers x threads never oversubscribes the node
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    _runner = ClassifierRunner(model_dir, backend, threads, max_len, batch_size)
+
+
+def _label_shard(path, ids, texts, labels):
+    t0 = time.perf_counter()
+    probs = _runner.predict_proba(texts)
+    write_predictions(path, ids, probs, labels)
+    return len(ids), time.perf_counter() - t0
+
+
+def write_predictions(path, ids, probs, labels):
+    """One parquet part: id, predicted label, its probability and one prob_<label> column per class."""
+    top = probs.argmax(axis=1) if len(probs) else np.empty(0, dtype=np.int64)
+    frame = pd.DataFrame({
+        "eid": ids,
+        "label": np.asarray(labels, dtype=object)[top],
+        "confidence": probs[np.arange(len(probs)), top],
+    })
+    for j, label in enumerate(labels):
+        frame[f"prob_{label}"] = probs[:, j]
+    tmp = path + ".tmp"
+    frame.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def shard_path(out_dir, shard):
+    return os.path.join(out_dir, f"part-{shard:06d}.parquet")
+
+
+def run_manifest(ids, shard_size, backend, labels):
+    """What the parts in out_dir were computed from: resuming is only valid for the same values."""
+    digest = hashlib.sha1()
+    for eid in ids:
+        digest.update(eid.encode() + b"\0")
+    return {"rows": len(ids), "shard_size": shard_size, "ids_sha1": digest.hexdigest(),
+            "backend": backend, "labels": labels}
+
+
+def check_resume(out_dir, manifest, overwrite=False):
+    """Make out_dir safe to resume into: clear it on overwrite, refuse parts from a different run."""
+    run_path = os.path.join(out_dir, RUN_FILE)
+    parts = glob.glob(os.path.join(out_dir, "part-*.parquet"))
+    previous = None
+    if os.path.exists(run_path):
+        with open(run_path, encoding="utf-8") as f:
+            previous = json.load(f)
+    if parts and previous != manifest:
+        if not overwrite:
+            raise ValueError(f"{out_dir} holds parts from a different input (rows, order, shard size, backend "
+                             f"or labels differ); pass overwrite=True / --overwrite or use another directory")
+        for part in parts:
+            os.remove(part)
+    with open(run_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def label_papers(papers, model_dir, out_dir, backend="int8", workers=None, threads_per_worker=1,
+                 shard_size=2048, batch_size=32, max_len=384, text_col="abstract", id_col="eid",
+                 overwrite=False):
+    """
+    Predict a label for every row of ``papers`` and stream the results to out_dir/part-*.parquet
+    (read them back with pd.read_parquet(out_dir)).
+
+    Shards are fixed slices of the input order, so rerunning on the same frame only processes
+    the shards whose part file is missing. A rerun on a changed or re-sorted frame raises
+    instead of mixing old and new parts, unless ``overwrite`` clears them. At most
+    2 x workers shards are in flight, which bounds the memory used for pending texts and
+    results.
+    """
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    labels = load_labels(model_dir)
+    if backend.startswith("onnx"):
+        # export once here instead of racing in every worker
+        export_onnx(model_dir, quantize=backend == "onnx-int8")
+    os.makedirs(out_dir, exist_ok=True)
+
+    ids = papers[id_col].astype(str).to_numpy()
+    texts = papers[text_col].to_numpy()
+    check_resume(out_dir, run_manifest(ids, shard_size, backend, labels), overwrite)
+    shards = [(s, i) for s, i in enumerate(range(0, len(papers), shard_size))
+              if not os.path.exists(shard_path(out_dir, s))]
+
+    t0 = time.perf_counter()
+    done, busy_s = 0, 0.0
+    init_args = (model_dir, backend, threads_per_worker, max_len, batch_size)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool, \
+            tqdm(total=sum(min(shard_size, len(papers) - i) for _, i in shards), desc=f"label ({backend})") as bar:
+        pending, queue = set(), iter(shards)
+        while True:
+            for s, i in queue:
+                pending.add(pool.submit(_label_shard, shard_path(out_dir, s), ids[i:i + shard_size],
+                                        list(texts[i:i + shard_size]), labels))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                n, seconds = future.result()
+                done += n
+                busy_s += seconds
+                bar.update(n)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "backend": backend,
+        "papers": done,
+        "shards": len(shards),
+        "shards_skipped": -(-len(papers) // shard_size) - len(shards),
+        "workers": workers,
+        "threads_per_worker": threads_per_worker,
+        "seconds": elapsed,
+        "papers_per_s": done / elapsed if elapsed else 0.0,
+        "worker_seconds": busy_s,
+    }
+
+
+if __name__ == "__main__":
+    from data.main import load_ingested
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model_dir")
+    parser.add_argument("src", help="data.csv or an ingested parquet directory")
+    parser.add_argument("out_dir")
+    parser.add_argument("--backend", choices=BACKENDS, default="int8")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=1, help="intra-op threads per worker")
+    parser.add_argument("--shard-size", type=int, default=2048)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--overwrite", action="store_true", help="discard parts from an earlier run on different input")
+    args = parser.parse_args()
+
+    papers = load_ingested(args.src).dropna(subset=["abstract"])
+    print(json.dumps(label_papers(papers, args.model_dir, args.out_dir, args.backend, args.workers,
+                                  args.threads, args.shard_size, args.batch_size, overwrite=args.overwrite), indent=2))
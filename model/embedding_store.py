@@ -0,0 +1,168 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from model.similarity import to_matrix
+
+VECTORS_FILE = "vectors.bin"
+META_FILE = "meta.csv"
+INFO_FILE = "store.json"
+STORE_VERSION = 1
+
+
+def _write_info(path, info):
+    tmp = os.path.join(path, INFO_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    os.replace(tmp, os.path.join(path, INFO_FILE))
+
+
+def _write_vectors(f, vectors, dtype, normalize, dim=None, chunk=65536):
+    count = 0
+    for i in range(0, len(vectors), chunk):
+        block = to_matrix(vectors[i:i + chunk], normalize=normalize)
+        if dim is not None and block.shape[1] != dim:
+            raise ValueError(f"dimension mismatch: expected {dim}, got {block.shape[1]}")
+        dim = block.shape[1]
+        f.write(block.astype(dtype).tobytes())
+        count += block.shape[0]
+    return count, dim
+
+
+def write_store(path, vectors, meta, dtype="float32", model_id=None, normalize=True):
+    """
+    Write embeddings as one contiguous row-major matrix (vectors.bin) plus a metadata table
+    (meta.csv) joined by row_id. Vectors are L2-normalized by default so that cosine
+    similarity is a plain matrix multiply on the stored rows.
+    """
+    if dtype not in ("float32", "float16"):
+        raise ValueError("dtype must be float32 or float16")
+    if len(vectors) != len(meta):
+        raise ValueError(f"{len(vectors)} vectors but {len(meta)} metadata rows")
+
+    os.makedirs(path, exist_ok=True)
+    tmp = os.path.join(path, VECTORS_FILE + ".tmp")
+    with open(tmp, "wb") as f:
+        count, dim = _write_vectors(f, vectors, dtype, normalize)
+    os.replace(tmp, os.path.join(path, VECTORS_FILE))
+
+    meta = meta.reset_index(drop=True).copy()
+    meta.insert(0, "row_id", np.arange(count, dtype=np.int64))
+    meta.to_csv(os.path.join(path, META_FILE), index=False)
+
+    _write_info(path, {
+        "version": STORE_VERSION,
+        "dtype": dtype,
+        "dim": dim or 0,
+        "count": count,
+        "normalized": normalize,
+        "model_id": model_id,
+        "meta_bytes": os.path.getsize(os.path.join(path, META_FILE)),
+    })
+    return open_store(path)
+
+
+def _vector_bytes(info):
+    return info["count"] * info["dim"] * np.dtype(info["dtype"]).itemsize
+
+
+def _rollback(path, info):
+    """Cut vectors.bin and meta.csv back to the rows committed in store.json (the tail of a failed append)."""
+    with open(os.path.join(path, VECTORS_FILE), "r+b") as f:
+        f.truncate(_vector_bytes(info))
+    meta_path = os.path.join(path, META_FILE)
+    if "meta_bytes" in info:
+        with open(meta_path, "r+b") as f:
+            f.truncate(info["meta_bytes"])
+    else:
+        # stores written before meta_bytes was recorded
+        meta = pd.read_csv(meta_path)
+        if len(meta) > info["count"]:
+            meta.iloc[:info["count"]].to_csv(meta_path, index=False)
+
+
+def append_store(path, vectors, meta):
+    """
+    Append rows to an existing store; new rows get the next row_ids. store.json is written
+    last, so it is the commit point: a failed or interrupted append is cut off again, and
+    rows past its count are never read.
+    """
+    info = read_info(path)
+    if len(vectors) != len(meta):
+        raise ValueError(f"{len(vectors)} vectors but {len(meta)} metadata rows")
+    if len(vectors) == 0:
+        return open_store(path)
+    dim = to_matrix(vectors[:1], normalize=False).shape[1]
+    if info["count"] and dim != info["dim"]:
+        raise ValueError(f"dimension mismatch: store has {info['dim']}, got {dim}")
+
+    _rollback(path, info)  # leftovers of an earlier interrupted append
+    try:
+        with open(os.path.join(path, VECTORS_FILE), "ab") as f:
+            count, dim = _write_vectors(f, vectors, info["dtype"], info["normalized"], dim)
+        meta = meta.reset_index(drop=True).copy()
+        meta.insert(0, "row_id", np.arange(info["count"], info["count"] + count, dtype=np.int64))
+        meta.to_csv(os.path.join(path, META_FILE), mode="a", header=False, index=False)
+    except BaseException:
+        _rollback(path, info)
+        raise
+
+    info["count"] += count
+    info["dim"] = dim
+    info["meta_bytes"] = os.path.getsize(os.path.join(path, META_FILE))
+    _write_info(path, info)
+    return open_store(path)
+
+
+def read_info(path):
+    with open(os.path.join(path, INFO_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class EmbeddingStore:
+    """Read-only view of a store: vectors are memory-mapped, metadata is loaded on first use."""
+
+    def __init__(self, path):
+        self.path = path
+        self.info = read_info(path)
+        count, dim = self.info["count"], self.info["dim"]
+        # a longer file is the uncommitted tail of an interrupted append and is ignored
+        size = os.path.getsize(os.path.join(path, VECTORS_FILE))
+        if size < _vector_bytes(self.info):
+            raise ValueError(f"{VECTORS_FILE} holds {size} bytes, store.json expects {_vector_bytes(self.info)}")
+        if count:
+            self.vectors = np.memmap(os.path.join(path, VECTORS_FILE), dtype=self.info["dtype"],
+                                     mode="r", shape=(count, dim))
+        else:
+            self.vectors = np.empty((0, dim), dtype=self.info["dtype"])
+        self._meta = None
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            self._meta = pd.read_csv(os.path.join(self.path, META_FILE), nrows=self.info["count"])
+        return self._meta
+
+    def __len__(self):
+        return self.info["count"]
+
+    def rows(self, row_ids):
+        """Metadata for the given row ids, in the given order."""
+        return self.meta.iloc[np.asarray(row_ids, dtype=np.int64)]
+
+
+def open_store(path):
+    return EmbeddingStore(path)
+
+
+def migrate_pickle(pkl_path, store_path, meta_columns, vector_column="vector", dtype="float32", model_id=None):
+    """Convert an old DataFrame-of-tensors pickle (data_vector.pkl / company_vector.pkl) into a store."""
+    df = pd.read_pickle(pkl_path)
+    return write_store(store_path, df[vector_column].tolist(), df[meta_columns], dtype=dtype, model_id=model_id)
+
+
+if __name__ == "__main__":
+    migrate_pickle("./data_vector.pkl", "./paper_store", ["eid", "title", "subject_areas"])
+    migrate_pickle("./company_vector.pkl", "./company_store", ["company_name", "sector", "industry"])
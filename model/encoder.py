@@ -0,0 +1,123 @@
+import hashlib
+import os
+import sqlite3
+
+import numpy as np
+from tqdm import tqdm
+
+from profiling.instrument import span, count, memory_snapshot
+
+DEFAULT_MODEL_ID = "all-mpnet-base-v2"
+DEFAULT_CACHE_PATH = "./embedding_cache.sqlite"
+
+
+def text_key(text, model_id):
+    """Cache key for one text under one model: a hash of both, so a model change never reuses vectors."""
+    return hashlib.sha1(f"{model_id}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent key -> float32 vector cache in a single SQLite file."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER, vec BLOB)"
+        )
+
+    def get_many(self, keys, chunk=900):
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), chunk):
+            part = keys[i:i + chunk]
+            rows = self.conn.execute(
+                f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, keys, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, dim, vec) VALUES (?, ?, ?)",
+            [(k, v.shape[0], v.tobytes()) for k, v in zip(keys, vectors)],
+        )
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def load_model(model_id=DEFAULT_MODEL_ID):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_id, device="cpu")
+
+
+def _encode_batches(model, texts, batch_size, pool):
+    if pool is not None:
+        return model.encode_multi_process(texts, pool, batch_size=batch_size)
+    return model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+
+
+def encode_texts(texts, model_id=DEFAULT_MODEL_ID, cache_path=DEFAULT_CACHE_PATH, model=None,
+                 batch_size=64, workers=None, chunk_size=4096):
+    """
+    Encode texts into a (len(texts), dim) float32 matrix, in input order.
+
+    Only texts whose (model_id, text) hash is not already in the on-disk cache are encoded.
+    Those are de-duplicated, sorted by length so each batch pads to similar lengths, and
+    encoded chunk by chunk across a pool of CPU workers; every finished chunk is written to
+    the cache, so an interrupted run picks up where it stopped.
+    """
+    texts = ["" if t is None or (isinstance(t, float) and np.isnan(t)) else str(t) for t in texts]
+    keys = [text_key(t, model_id) for t in texts]
+
+    cache = EmbeddingCache(cache_path)
+    run_span = span("encode", model_id=model_id, texts=len(texts))
+    try:
+        with span("encode.cache_lookup"):
+            cached = cache.get_many(set(keys))
+
+        missing = {}
+        for k, t in zip(keys, texts):
+            if k not in cached and k not in missing:
+                missing[k] = t
+        todo = sorted(missing.items(), key=lambda kv: len(kv[1]))
+        hits = sum(k in cached for k in keys)
+        print(f"[encode] {len(texts)} texts, {hits} cached, {len(todo)} unique to encode")
+        run_span.args.update(cached=hits, to_encode=len(todo))
+        count("encode.cache_hits", hits)
+
+        if todo:
+            if model is None:
+                with span("encode.load_model", model_id=model_id):
+                    model = load_model(model_id)
+            if workers is None:
+                workers = max(1, (os.cpu_count() or 1) // 2)
+            pool = model.start_multi_process_pool(["cpu"] * workers) if workers > 1 else None
+            try:
+                for i in tqdm(range(0, len(todo), chunk_size), desc="Encoding"):
+                    chunk = todo[i:i + chunk_size]
+                    with span("encode.chunk", texts=len(chunk)):
+                        vecs = _encode_batches(model, [t for _, t in chunk], batch_size, pool)
+                    with span("encode.cache_write", texts=len(chunk)):
+                        cache.put_many([k for k, _ in chunk], vecs)
+                    count("encode.texts_encoded", len(chunk))
+                    cached.update(zip((k for k, _ in chunk), np.asarray(vecs, dtype=np.float32)))
+            finally:
+                if pool is not None:
+                    model.stop_multi_process_pool(pool)
+    finally:
+        cache.close()
+        run_span.end()
+        memory_snapshot("after encode")
+
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.vstack([cached[k] for k in keys]).astype(np.float32, copy=False)
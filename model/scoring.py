@@ -0,0 +1,360 @@
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import PowerTransformer
+
+from model.similarity import iter_similarity_blocks, merge_top_k
+from model.embedding_store import open_store
+from profiling.instrument import span, count, memory_snapshot
+
+
+class CompanyMoments:
+    """Running count / mean / M2 per company, merged block by block (Chan et al. parallel update)."""
+
+    def __init__(self, n_companies=0, count=None, mean=None, m2=None):
+        self.count = np.zeros(n_companies, dtype=np.int64) if count is None else count
+        self.mean = np.zeros(n_companies, dtype=np.float64) if mean is None else mean
+        self.m2 = np.zeros(n_companies, dtype=np.float64) if m2 is None else m2
+
+    def grow(self, n_companies):
+        extra = n_companies - len(self.count)
+        if extra > 0:
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+            self.mean = np.concatenate([self.mean, np.zeros(extra)])
+            self.m2 = np.concatenate([self.m2, np.zeros(extra)])
+
+    def update(self, c0, scores):
+        """Fold a (companies, papers) score block whose first row is company c0 into the moments."""
+        c1 = c0 + scores.shape[0]
+        n_b = scores.shape[1]
+        if n_b == 0:
+            return
+        mean_b = scores.mean(axis=1, dtype=np.float64)
+        m2_b = np.square(scores - mean_b[:, None].astype(scores.dtype)).sum(axis=1, dtype=np.float64)
+
+        n_a = self.count[c0:c1]
+        n = n_a + n_b
+        delta = mean_b - self.mean[c0:c1]
+        self.mean[c0:c1] += delta * n_b / n
+        self.m2[c0:c1] += m2_b + delta ** 2 * n_a * n_b / n
+        self.count[c0:c1] = n
+
+    def std(self):
+        """Population std (ddof=0), matching scipy.stats.zscore."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(np.where(self.count > 0, self.m2 / self.count, 0.0))
+
+
+class Reservoir:
+    """
+    Uniform sample of every value ever added, kept as the ``size`` values with the smallest
+    random keys, so blocks and later incremental runs can be merged into it.
+    """
+
+    def __init__(self, size=100_000, seed=0, values=None, keys=None, seen=0):
+        self.size = size
+        self.values = np.empty(0, dtype=np.float32) if values is None else values
+        self.keys = np.empty(0, dtype=np.float64) if keys is None else keys
+        self.seen = seen
+        self.rng = np.random.default_rng([seed, seen])
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float32).reshape(-1)
+        keys = self.rng.random(len(values))
+        self.seen += len(values)
+        if len(self.keys) >= self.size:
+            keep = keys < self.keys.max()
+            values, keys = values[keep], keys[keep]
+        values = np.concatenate([self.values, values])
+        keys = np.concatenate([self.keys, keys])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size - 1)[:self.size]
+            values, keys = values[keep], keys[keep]
+        self.values, self.keys = values, keys
+
+    def fit_power_transformer(self):
+        pt = PowerTransformer(method="yeo-johnson")
+        pt.fit(self.values.astype(float).reshape(-1, 1))
+        return pt
+
+
+def _outlier_frame(ci, pi, values, z, pt, company_names, titles, areas, n_papers):
+    """Outlier rows in the df_highs layout, indexed like the old ndf (company_row * n_papers + paper_row)."""
+    values = np.asarray(values, dtype=float)
+    frame = {
+        "company": np.asarray(company_names, dtype=object)[ci],
+        "title": np.asarray(titles, dtype=object)[pi],
+    }
+    if areas is not None:
+        frame["areas"] = np.asarray(areas, dtype=object)[pi]
+    frame["value"] = values
+    frame["value_trans"] = pt.transform(values.reshape(-1, 1)).reshape(-1) if len(values) else values
+    frame["z_by_company"] = z
+    return pd.DataFrame(frame, index=ci * n_papers + pi)
+
+
+class ScoringState:
+    """
+    Everything needed to produce the z > 3 outlier table without keeping the company x paper
+    cross product: per-company moments, a yeo-johnson reservoir sample, and every pair whose
+    value is at or above its company's candidate ``floor`` (set at mean + margin * std).
+    """
+
+    def __init__(self, n_companies=0, n_papers=0, margin=2.5, reservoir_size=100_000):
+        self.n_papers = n_papers
+        self.margin = margin
+        self.moments = CompanyMoments(n_companies)
+        self.reservoir = Reservoir(reservoir_size)
+        self.floor = np.full(n_companies, np.inf)
+        self.cand_company = np.empty(0, dtype=np.int64)
+        self.cand_paper = np.empty(0, dtype=np.int64)
+        self.cand_value = np.empty(0, dtype=np.float32)
+
+    @property
+    def n_companies(self):
+        return len(self.moments.count)
+
+    def margin_floor(self, companies=None):
+        floor = self.moments.mean + self.margin * self.moments.std()
+        return floor if companies is None else floor[companies]
+
+    def add_candidates(self, c0, p0, scores):
+        ci, pi = np.nonzero(scores >= self.floor[c0:c0 + scores.shape[0], None])
+        self.cand_company = np.concatenate([self.cand_company, ci + c0])
+        self.cand_paper = np.concatenate([self.cand_paper, pi + p0])
+        self.cand_value = np.concatenate([self.cand_value, scores[ci, pi]])
+
+    def drop_candidates(self, companies):
+        keep = ~np.isin(self.cand_company, companies)
+        self.cand_company = self.cand_company[keep]
+        self.cand_paper = self.cand_paper[keep]
+        self.cand_value = self.cand_value[keep]
+
+    def prune(self):
+        """Raise floors that fell behind mean + margin * std and drop candidates below them."""
+        self.floor = np.maximum(self.floor, self.margin_floor())
+        keep = self.cand_value >= self.floor[self.cand_company]
+        self.cand_company = self.cand_company[keep]
+        self.cand_paper = self.cand_paper[keep]
+        self.cand_value = self.cand_value[keep]
+
+    def outliers(self, company_names, titles, areas=None, z_cut=3):
+        """The df_highs table (company, title, areas, value, value_trans, z_by_company)."""
+        mean = self.moments.mean[self.cand_company]
+        std = self.moments.std()[self.cand_company]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = (self.cand_value - mean) / std
+        hit = z > z_cut
+
+        order = np.lexsort((self.cand_paper[hit], self.cand_company[hit]))
+        return _outlier_frame(
+            self.cand_company[hit][order], self.cand_paper[hit][order], self.cand_value[hit][order],
+            z[hit][order], self.reservoir.fit_power_transformer(), company_names, titles, areas, self.n_papers
+        )
+
+    def save(self, path):
+        np.savez(
+            path,
+            n_papers=self.n_papers, margin=self.margin,
+            count=self.moments.count, mean=self.moments.mean, m2=self.moments.m2,
+            floor=self.floor,
+            cand_company=self.cand_company, cand_paper=self.cand_paper, cand_value=self.cand_value,
+            res_size=self.reservoir.size, res_values=self.reservoir.values,
+            res_keys=self.reservoir.keys, res_seen=self.reservoir.seen,
+        )
+
+    @classmethod
+    def load(cls, path):
+        d = np.load(path)
+        state = cls(0, int(d["n_papers"]), float(d["margin"]))
+        state.moments = CompanyMoments(count=d["count"], mean=d["mean"], m2=d["m2"])
+        state.floor = d["floor"]
+        state.cand_company, state.cand_paper, state.cand_value = d["cand_company"], d["cand_paper"], d["cand_value"]
+        state.reservoir = Reservoir(int(d["res_size"]), values=d["res_values"], keys=d["res_keys"],
+                                    seen=int(d["res_seen"]))
+        return state
+
+
+def _score_rows(state, company_vectors, paper_vectors, companies, block_size=None):
+    """
+    Full two-pass scoring of a contiguous company range against every paper: moments and
+    reservoir first, then candidates at or above the resulting floor.
+    """
+    c0, c1 = companies
+    rows = company_vectors[c0:c1]
+    with span("score.moments", companies=c1 - c0, papers=len(paper_vectors)):
+        for _, p0, scores in iter_similarity_blocks(rows, paper_vectors, block_size):
+            state.moments.update(c0, scores)
+            state.reservoir.add(scores)
+    state.floor[c0:c1] = state.margin_floor(np.arange(c0, c1))
+    with span("score.candidates", companies=c1 - c0, papers=len(paper_vectors)):
+        for _, p0, scores in iter_similarity_blocks(rows, paper_vectors, block_size):
+            state.add_candidates(c0, p0, scores)
+
+
+def _rescan(state, company_vectors, paper_vectors, companies, block_size=None):
+    """Re-collect candidates for companies whose z > 3 cut-off dropped below their stored floor."""
+    count("score.rescanned_companies", len(companies))
+    state.drop_candidates(companies)
+    state.floor[companies] = state.margin_floor(companies)
+    for c in companies:
+        for _, p0, scores in iter_similarity_blocks(company_vectors[c:c + 1], paper_vectors, block_size):
+            state.add_candidates(c, p0, scores)
+
+
+def build_state(company_vectors, paper_vectors, margin=2.5, reservoir_size=100_000, block_size=None):
+    """Score every company against every paper from scratch (vectors must be normalized)."""
+    state = ScoringState(len(company_vectors), len(paper_vectors), margin, reservoir_size)
+    _score_rows(state, company_vectors, paper_vectors, (0, len(company_vectors)), block_size)
+    return state
+
+
+def add_papers(state, company_vectors, paper_vectors, block_size=None, z_cut=3):
+    """
+    Score only papers[state.n_papers:] against every company and fold them into the state.
+    Old pairs are only revisited for companies whose new cut-off fell below their floor.
+    """
+    start = state.n_papers
+    new_papers = paper_vectors[start:]
+    with span("score.add_papers", companies=len(company_vectors), papers=len(new_papers)):
+        for c0, p0, scores in iter_similarity_blocks(company_vectors, new_papers, block_size):
+            state.moments.update(c0, scores)
+            state.reservoir.add(scores)
+            state.add_candidates(c0, p0 + start, scores)
+    state.n_papers = len(paper_vectors)
+
+    cut = state.moments.mean + z_cut * state.moments.std()
+    stale = np.nonzero(cut < state.floor)[0]
+    if len(stale):
+        with span("score.rescan", companies=len(stale)):
+            _rescan(state, company_vectors, paper_vectors, stale, block_size)
+    state.prune()
+    return state
+
+
+def add_companies(state, company_vectors, paper_vectors, block_size=None):
+    """Score only companies[state.n_companies:] against every paper and fold them into the state."""
+    start = state.n_companies
+    state.moments.grow(len(company_vectors))
+    state.floor = np.concatenate([state.floor, np.full(len(company_vectors) - start, np.inf)])
+    _score_rows(state, company_vectors, paper_vectors, (start, len(company_vectors)), block_size)
+    return state
+
+
+def _z(scores, mean, std, c0):
+    c1 = c0 + scores.shape[0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (scores - mean[c0:c1, None]) / std[c0:c1, None]
+
+
+def iter_outliers(company_vectors, paper_vectors, company_names, titles, areas=None, z_cut=3,
+                  block_size=None, reservoir_size=100_000, max_candidates=None):
+    """
+    Streaming replacement for building ndf, fitting PowerTransformer on it and filtering
+    groupby("company").transform(sts.zscore) > 3. Yields df_highs chunks; peak memory is one
+    similarity block plus the reservoir.
+
+    The first pass folds every block into per-company moments and a reservoir sample (the
+    yeo-johnson fit). With ``max_candidates=None`` a second pass re-scores the blocks and emits
+    the z > z_cut rows. Otherwise the first pass also keeps each company's best
+    ``max_candidates`` pairs and the outliers are taken from those; only companies whose
+    candidate list was too short to hold all of their outliers are re-scored.
+    """
+    n_comp, n_papers = len(company_vectors), len(paper_vectors)
+    moments = CompanyMoments(n_comp)
+    reservoir = Reservoir(reservoir_size)
+    if max_candidates is not None:
+        m = min(max_candidates, n_papers)
+        best_idx = np.full((n_comp, m), -1, dtype=np.int64)
+        best_val = np.full((n_comp, m), -np.inf, dtype=np.float32)
+
+    with span("score.moments", companies=n_comp, papers=n_papers):
+        for c0, p0, scores in iter_similarity_blocks(company_vectors, paper_vectors, block_size):
+            moments.update(c0, scores)
+            reservoir.add(scores)
+            if max_candidates is not None:
+                merge_top_k(best_idx, best_val, c0, p0, scores)
+
+    with span("score.power_transform"):
+        pt = reservoir.fit_power_transformer()
+    mean, std = moments.mean, moments.std()
+
+    if max_candidates is None:
+        rescan = np.arange(n_comp)
+    else:
+        z = _z(best_val, mean, std, 0)
+        full = (z.min(axis=1) > z_cut) & (m < n_papers)
+        for c in np.nonzero(~full)[0]:
+            keep = np.nonzero(z[c] > z_cut)[0]
+            keep = keep[np.argsort(best_idx[c, keep])]
+            if len(keep):
+                count("score.outliers", len(keep))
+                yield _outlier_frame(np.full(len(keep), c), best_idx[c, keep], best_val[c, keep], z[c, keep],
+                                     pt, company_names, titles, areas, n_papers)
+        rescan = np.nonzero(full)[0]
+
+    for c in _runs(rescan):
+        rows = company_vectors[c[0]:c[-1] + 1]
+        for _, p0, scores in iter_similarity_blocks(rows, paper_vectors, block_size):
+            z = _z(scores, mean, std, c[0])
+            ci, pi = np.nonzero(z > z_cut)
+            order = np.lexsort((pi, ci))
+            ci, pi = ci[order], pi[order]
+            if len(ci):
+                count("score.outliers", len(ci))
+                yield _outlier_frame(ci + c[0], pi + p0, scores[ci, pi], z[ci, pi],
+                                     pt, company_names, titles, areas, n_papers)
+
+
+def _runs(ids):
+    """Split sorted row ids into contiguous runs so each run is scored as one block of rows."""
+    if len(ids) == 0:
+        return []
+    return np.split(ids, np.nonzero(np.diff(ids) != 1)[0] + 1)
+
+
+def write_outliers_csv(frames, path):
+    """
+    Append streamed outlier chunks to one CSV, writing the header once; returns the row count.
+    With no outliers at all the file is left empty.
+    """
+    n, header = 0, True
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for frame in frames:
+            if frame.empty:
+                continue
+            frame.to_csv(f, header=header)
+            header = False
+            n += len(frame)
+    return n
+
+
+def update_from_stores(company_store, paper_store, state_path, block_size=None):
+    """
+    Bring the scoring state at state_path up to date with the stores: a missing state is built
+    from scratch, otherwise only appended papers and companies are scored.
+    """
+    run_span = span("score.update", papers=len(paper_store), companies=len(company_store))
+    if os.path.exists(state_path):
+        state = ScoringState.load(state_path)
+        if len(paper_store) > state.n_papers:
+            add_papers(state, company_store.vectors[:state.n_companies], paper_store.vectors, block_size)
+        if len(company_store) > state.n_companies:
+            add_companies(state, company_store.vectors, paper_store.vectors, block_size)
+    else:
+        state = build_state(company_store.vectors, paper_store.vectors, block_size=block_size)
+    state.save(state_path)
+    run_span.end()
+    memory_snapshot("after scoring")
+    return state
+
+
+if __name__ == "__main__":
+    company_store = open_store("./company_store")
+    paper_store = open_store("./paper_store")
+    state = update_from_stores(company_store, paper_store, "./scoring_state.npz")
+    df_highs = state.outliers(company_store.meta["company_name"], paper_store.meta["title"],
+                              paper_store.meta["subject_areas"])
+    df_highs.to_csv("./nonnormalized_complete.csv")
+    print(f"{len(df_highs)} outlier pairs for {state.n_companies} companies x {state.n_papers} papers")
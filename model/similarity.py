@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+
+def to_matrix(vectors, dtype=np.float32, normalize=True):
+    """Stack a list of vectors (torch tensors or arrays) into one L2-normalized 2D matrix."""
+    if isinstance(vectors, np.ndarray) and vectors.ndim == 2:
+        mat = np.asarray(vectors, dtype=dtype)
+    else:
+        rows = []
+        for v in vectors:
+            if hasattr(v, "detach"):
+                v = v.detach().cpu().numpy()
+            rows.append(np.asarray(v, dtype=dtype).reshape(-1))
+        mat = np.vstack(rows) if rows else np.empty((0, 0), dtype=dtype)
+
+    if normalize and mat.size:
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        mat = mat / norms
+    return np.ascontiguousarray(mat, dtype=dtype)
+
+
+def block_rows(n_companies, dim=768, max_block_bytes=256 * 1024 * 1024):
+    """Number of paper rows per block so one score block (plus its paper slice) fits in max_block_bytes."""
+    per_row = 4 * (n_companies + dim)
+    return max(1, int(max_block_bytes // per_row))
+
+
+def iter_similarity_blocks(company_mat, paper_mat, block_size=None, company_block_size=None):
+    """
+    Yield (company_start, paper_start, scores) for memory-bounded blocks of the company x paper
+    cosine similarity matrix. Both inputs must already be normalized (see to_matrix).
+    """
+    n_comp, n_paper = company_mat.shape[0], paper_mat.shape[0]
+    if company_block_size is None:
+        company_block_size = n_comp
+    if block_size is None:
+        block_size = block_rows(company_block_size, paper_mat.shape[1])
+
+    for c0 in range(0, n_comp, company_block_size):
+        c_block = np.asarray(company_mat[c0:c0 + company_block_size], dtype=np.float32)
+        for p0 in range(0, n_paper, block_size):
+            p_block = np.asarray(paper_mat[p0:p0 + block_size], dtype=np.float32)
+            yield c0, p0, c_block @ p_block.T
+
+
+def iter_pair_frames(company_mat, paper_mat, company_names, titles, areas=None, block_size=None):
+    """
+    Stream the company/paper cross product as DataFrames with the same columns as the old
+    notebook ``ndf`` (company, title, areas, value), one block at a time.
+    """
+    company_names = np.asarray(company_names, dtype=object)
+    titles = np.asarray(titles, dtype=object)
+    areas = np.asarray(areas, dtype=object) if areas is not None else None
+
+    for c0, p0, scores in iter_similarity_blocks(company_mat, paper_mat, block_size):
+        n_c, n_p = scores.shape
+        frame = {
+            "company": np.repeat(company_names[c0:c0 + n_c], n_p),
+            "title": np.tile(titles[p0:p0 + n_p], n_c),
+        }
+        if areas is not None:
+            frame["areas"] = np.tile(areas[p0:p0 + n_p], n_c)
+        frame["value"] = scores.reshape(-1)
+        yield pd.DataFrame(frame)
+
+
+def merge_top_k(best_idx, best_val, c0, p0, scores):
+    """Fold a score block into running per-company top-k arrays (updated in place)."""
+    c1 = c0 + scores.shape[0]
+    k = best_val.shape[1]
+    kk = min(k, scores.shape[1])
+    part = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+    cand_val = np.concatenate([best_val[c0:c1], np.take_along_axis(scores, part, axis=1)], axis=1)
+    cand_idx = np.concatenate([best_idx[c0:c1], part + p0], axis=1)
+
+    keep = np.argpartition(-cand_val, k - 1, axis=1)[:, :k]
+    best_val[c0:c1] = np.take_along_axis(cand_val, keep, axis=1)
+    best_idx[c0:c1] = np.take_along_axis(cand_idx, keep, axis=1)
+
+
+def top_k_per_company(company_mat, paper_mat, k=10, block_size=None):
+    """
+    Best k papers for every company without building the full score matrix.
+    Returns (indices, scores), both shaped (n_companies, k) and sorted by descending score.
+    """
+    n_comp = company_mat.shape[0]
+    k = min(k, paper_mat.shape[0])
+    best_idx = np.full((n_comp, k), -1, dtype=np.int64)
+    best_val = np.full((n_comp, k), -np.inf, dtype=np.float32)
+
+    for c0, p0, scores in iter_similarity_blocks(company_mat, paper_mat, block_size):
+        merge_top_k(best_idx, best_val, c0, p0, scores)
+
+    order = np.argsort(-best_val, axis=1, kind="stable")
+    return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_val, order, axis=1)
+
+
+def threshold_hits(company_mat, paper_mat, threshold, block_size=None):
+    """All (company_idx, paper_idx, value) pairs with similarity >= threshold, as flat arrays."""
+    comp_out, paper_out, val_out = [], [], []
+    for c0, p0, scores in iter_similarity_blocks(company_mat, paper_mat, block_size):
+        ci, pi = np.nonzero(scores >= threshold)
+        comp_out.append(ci + c0)
+        paper_out.append(pi + p0)
+        val_out.append(scores[ci, pi])
+
+    if not comp_out:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return np.concatenate(comp_out), np.concatenate(paper_out), np.concatenate(val_out)
+
+
+def top_k_frame(company_names, titles, indices, scores, areas=None):
+    """Turn top_k_per_company output into a long company/title/areas/value DataFrame."""
+    company_names = np.asarray(company_names, dtype=object)
+    titles = np.asarray(titles, dtype=object)
+    n_comp, k = indices.shape
+    frame = {
+        "company": np.repeat(company_names, k),
+        "title": titles[indices.reshape(-1)],
+    }
+    if areas is not None:
+        frame["areas"] = np.asarray(areas, dtype=object)[indices.reshape(-1)]
+    frame["value"] = scores.reshape(-1)
+    return pd.DataFrame(frame)
+
@@ -0,0 +1,265 @@
+"""
+Out-of-core version of the TF-IDF + LinearSVC baseline in main.ipynb.
+
+Abstracts are streamed chunk by chunk from the ingestion output (data.csv or a parquet
+directory). They are vectorized with a stateless HashingVectorizer, so there is no vocabulary
+to hold. The IDF weights come from document frequencies over the hashed columns, counted in one
+extra pass. A hinge-loss SGDClassifier (a linear SVM) is trained with partial_fit, one chunk at
+a time. The label is the paper's study group (data.subject_areas.paper_group); papers
+without one are skipped. A fixed share of eids (by hash) is held out for evaluation.
+
+Vectorizing and predicting run on a process pool with a bounded number of chunks in flight,
+at most 2 x workers chunks at a time, so memory stays flat whatever the corpus size.
+
+    python -m model.streaming_baseline ./data_parquet --out ./baseline_labels --workers 4
+"""
+import argparse
+import json
+import os
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import normalize
+
+from data.main import iter_ingested
+from data.subject_areas import GROUP_NAMES, encode_areas, paper_group
+
+N_FEATURES = 2 ** 20
+
+
+class HashedTfidf:
+    """
+    TF-IDF over hashed n-gram columns: raw term counts from a HashingVectorizer, smoothed IDF
+    (as TfidfVectorizer) from document frequencies accumulated with partial_fit, l2 rows.
+    The whole state is one n_features array.
+    """
+
+    def __init__(self, n_features=N_FEATURES, ngram_range=(1, 2)):
+        self.vectorizer = HashingVectorizer(n_features=n_features, ngram_range=ngram_range,
+                                            alternate_sign=False, norm=None)
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+        self.n_docs = 0
+        self.idf = None
+
+    def counts(self, texts):
+        return self.vectorizer.transform(texts)
+
+    def chunk_doc_freq(self, texts):
+        x = self.counts(texts)
+        return np.bincount(x.indices, minlength=x.shape[1]).astype(np.int32), x.shape[0]
+
+    def add_doc_freq(self, doc_freq, n_docs):
+        self.doc_freq += doc_freq
+        self.n_docs += n_docs
+        self.idf = np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1.0
+
+    def partial_fit(self, texts):
+        self.add_doc_freq(*self.chunk_doc_freq(texts))
+        return self
+
+    def transform(self, texts):
+        x = self.counts(texts).astype(np.float32)
+        x.data *= self.idf[x.indices].astype(np.float32)
+        return normalize(x, copy=False)
+
+
+def is_holdout(eids, share):
+    """Deterministic train / holdout split by eid hash, independent of chunking and order."""
+    buckets = np.fromiter((zlib.crc32(str(e).encode()) % 1000 for e in eids), dtype=np.int64, count=len(eids))
+    return buckets < int(share * 1000)
+
+
+def iter_chunks(src, chunk_size, text_col="abstract"):
+    """(eids, texts, study group ids) per chunk of papers with a text; -1 = no group."""
+    for chunk in iter_ingested(src, columns=["eid", text_col, "subject_areas"], chunk_size=chunk_size):
+        chunk = chunk[chunk[text_col].notna()]
+        if chunk.empty:
+            continue
+        vocab, matrix = encode_areas(chunk["subject_areas"])
+        yield chunk["eid"].astype(str).to_numpy(), chunk[text_col].astype(str).tolist(), paper_group(matrix, vocab)
+
+
+# per-process state, set by the pool initializer (or directly when workers=0)
+_state = {}
+
+
+def _init(tfidf, model=None):
+    _state["tfidf"], _state["model"] = tfidf, model
+
+
+def _doc_freq(texts):
+    return _state["tfidf"].chunk_doc_freq(texts)
+
+
+def _features(texts):
+    return _state["tfidf"].transform(texts)
+
+
+def _predict_part(path, eids, texts):
+    x = _state["tfidf"].transform(texts)
+    scores = _state["model"].decision_function(x)
+    top = scores.argmax(axis=1)
+    frame = pd.DataFrame({
+        "eid": eids,
+        "label": np.asarray(GROUP_NAMES, dtype=object)[top],
+        "margin": scores[np.arange(len(top)), top],
+    })
+    tmp = path + ".tmp"
+    frame.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return len(eids)
+
+
+def _ordered_map(pool, fn, args, ahead):
+    """pool.map that keeps at most ``ahead`` tasks in flight (Executor.map submits everything up front)."""
+    if pool is None:
+        yield from (fn(*a) for a in args)
+        return
+    pending = deque()
+    for a in args:
+        pending.append(pool.submit(fn, *a))
+        if len(pending) >= ahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _pool(workers, *init_args):
+    if not workers:
+        _init(*init_args)
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=init_args)
+
+
+def _confusion_report(confusion):
+    tp = np.diag(confusion).astype(float)
+    precision = np.divide(tp, confusion.sum(axis=0), out=np.zeros_like(tp), where=confusion.sum(axis=0) > 0)
+    recall = np.divide(tp, confusion.sum(axis=1), out=np.zeros_like(tp), where=confusion.sum(axis=1) > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros_like(tp), where=precision + recall > 0)
+    total = confusion.sum()
+    return {
+        "accuracy": float(tp.sum() / total) if total else 0.0,
+        "macro_f1": float(f1.mean()),
+        "per_class": {name: {"precision": float(p), "recall": float(r), "f1": float(f), "support": int(s)}
+                      for name, p, r, f, s in zip(GROUP_NAMES, precision, recall, f1, confusion.sum(axis=1))},
+        "confusion": confusion.tolist(),
+    }
+
+
+def train_streaming(src, chunk_size=20_000, n_features=N_FEATURES, ngram_range=(1, 2), holdout=0.1,
+                    epochs=1, alpha=1e-5, workers=0, seed=0):
+    """
+    Fit HashedTfidf (one pass) and the SGD linear SVM (``epochs`` passes) over the ingested
+    papers, then score the held-out eids. Returns (tfidf, model, report).
+    """
+    ahead = 2 * max(workers, 1)
+    t0 = time.perf_counter()
+    tfidf = HashedTfidf(n_features, ngram_range)
+    pool = _pool(workers, tfidf)
+    try:
+        for doc_freq, n_docs in _ordered_map(pool, _doc_freq, ((texts,) for _, texts, _ in iter_chunks(src, chunk_size)), ahead):
+            tfidf.add_doc_freq(doc_freq, n_docs)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    idf_s = time.perf_counter() - t0
+
+    classes = np.arange(len(GROUP_NAMES))
+    model = SGDClassifier(loss="hinge", alpha=alpha, random_state=seed)
+    n_train = 0
+    t0 = time.perf_counter()
+    pool = _pool(workers, tfidf)
+    try:
+        for epoch in range(epochs):
+            for y, x in _labeled_batches(pool, src, chunk_size, ahead, lambda eids: ~is_holdout(eids, holdout)):
+                model.partial_fit(x, y, classes=classes)
+                if epoch == 0:
+                    n_train += len(y)
+
+        t_eval = time.perf_counter()
+        confusion = np.zeros((len(classes), len(classes)), dtype=np.int64)
+        for y, x in _labeled_batches(pool, src, chunk_size, ahead, lambda eids: is_holdout(eids, holdout)):
+            np.add.at(confusion, (y, model.predict(x)), 1)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    report = _confusion_report(confusion)
+    report.update({
+        "papers_seen": tfidf.n_docs,
+        "train_papers": n_train,
+        "holdout_papers": int(confusion.sum()),
+        "epochs": epochs,
+        "idf_pass_s": idf_s,
+        "train_s": t_eval - t0,
+        "eval_s": time.perf_counter() - t_eval,
+    })
+    return tfidf, model, report
+
+
+def _labeled_batches(pool, src, chunk_size, ahead, select):
+    """(labels, tf-idf rows) per chunk for the labeled papers whose eids pass ``select``."""
+    # the labels stay in the parent; only the selected texts go to the workers
+    labels = deque()
+
+    def args():
+        for eids, texts, y in iter_chunks(src, chunk_size):
+            keep = np.flatnonzero((y >= 0) & select(eids))
+            if len(keep):
+                labels.append(y[keep])
+                yield ([texts[i] for i in keep],)
+
+    for x in _ordered_map(pool, _features, args(), ahead):
+        yield labels.popleft(), x
+
+
+def predict_streaming(src, tfidf, model, out_dir, chunk_size=20_000, workers=0):
+    """Predict a study group for every ingested paper with a text, one parquet part per chunk in out_dir."""
+    os.makedirs(out_dir, exist_ok=True)
+    t0 = time.perf_counter()
+    pool = _pool(workers, tfidf, model)
+    n = 0
+    try:
+        parts = ((os.path.join(out_dir, f"part-{i:06d}.parquet"), eids, texts)
+                 for i, (eids, texts, _) in enumerate(iter_chunks(src, chunk_size)))
+        for count in _ordered_map(pool, _predict_part, parts, 2 * max(workers, 1)):
+            n += count
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    elapsed = time.perf_counter() - t0
+    return {"papers": n, "seconds": elapsed, "papers_per_s": n / elapsed if elapsed else 0.0, "workers": workers}
+
+
+def save_baseline(path, tfidf, model):
+    joblib.dump({"tfidf": tfidf, "model": model}, path)
+
+
+def load_baseline(path):
+    saved = joblib.load(path)
+    return saved["tfidf"], saved["model"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("src", help="data.csv or an ingested parquet directory")
+    parser.add_argument("--out", default="./baseline_labels", help="directory for the prediction parts")
+    parser.add_argument("--model", default="./streaming_baseline.joblib")
+    parser.add_argument("--chunk-size", type=int, default=20_000)
+    parser.add_argument("--n-features", type=int, default=N_FEATURES)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args()
+
+    tfidf, model, report = train_streaming(args.src, args.chunk_size, args.n_features,
+                                           epochs=args.epochs, workers=args.workers)
+    save_baseline(args.model, tfidf, model)
+    report["predict"] = predict_streaming(args.src, tfidf, model, args.out, args.chunk_size, args.workers)
+    print(json.dumps({k: v for k, v in report.items() if k != "confusion"}, indent=2))
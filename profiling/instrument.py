@@ -0,0 +1,184 @@
+"""
+Lightweight stage instrumentation: timed spans, counters and memory snapshots, kept in a
+bounded in-memory buffer and exported as JSON lines or Chrome trace format (open the
+latter in chrome://tracing or https://ui.perfetto.dev).
+
+    from profiling.instrument import span, count, memory_snapshot, export
+
+    with span("encode", texts=len(texts)) as s:
+        ...
+        s.args["encoded"] = n
+    count("encode.cache_hits", hits)
+    memory_snapshot("after encode")
+    export("trace.json")          # .jsonl -> JSON lines, anything else -> Chrome trace
+
+Spans can also be started and ended explicitly (s = span("rerun"); ...; s.end()), which is
+how a whole Streamlit rerun is timed. Everything is thread-safe; each process records its
+own events. Set ALIGN_TRACE_FILE=trace.json to export the main process's events at exit,
+or ALIGN_TRACE=0 to stop recording spans.
+"""
+import atexit
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+
+try:
+    import psutil
+except ImportError:  # memory snapshots fall back to the peak RSS from resource
+    psutil = None
+
+
+def rss_mb():
+    """Current resident memory of this process in MB (peak RSS where psutil is missing)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2 ** 20
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+    except ImportError:
+        return None
+
+
+class Span:
+    """One timed section. ``args`` can be extended until end(); the event is recorded once."""
+
+    def __init__(self, recorder, name, cat, args):
+        self.recorder = recorder
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.ts_us = time.time_ns() // 1000
+        self.tid = threading.get_ident()
+        self.start_ns = time.perf_counter_ns()
+        self.duration_ms = None
+
+    def end(self):
+        if self.duration_ms is None:
+            dur_ns = time.perf_counter_ns() - self.start_ns
+            self.duration_ms = dur_ns / 1e6
+            self.recorder.record({
+                "name": self.name, "cat": self.cat, "ph": "X", "ts": self.ts_us, "dur": dur_ns / 1000,
+                "pid": os.getpid(), "tid": self.tid, "args": self.args,
+            })
+        return self.duration_ms
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.end()
+        return False
+
+
+class Recorder:
+    """Bounded buffer of trace events (oldest dropped first) plus running counter totals."""
+
+    def __init__(self, max_events=100_000):
+        self.events = deque(maxlen=max_events)
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.enabled = os.environ.get("ALIGN_TRACE", "1") != "0"
+
+    def record(self, event):
+        if self.enabled:
+            with self.lock:
+                self.events.append(event)
+
+    def span(self, name, cat=None, **args):
+        return Span(self, name, cat or name.split(".")[0], args)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def memory_snapshot(self, label=None):
+        """Record the process RSS (and the Python heap when tracemalloc is tracing) as a counter event."""
+        import tracemalloc
+        values = {"rss_mb": rss_mb()}
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            values.update(heap_mb=current / 2 ** 20, heap_peak_mb=peak / 2 ** 20)
+        self.record({"name": "memory", "cat": "memory", "ph": "C", "ts": time.time_ns() // 1000,
+                     "pid": os.getpid(), "tid": threading.get_ident(), "args": values,
+                     **({"label": label} if label else {})})
+        return values
+
+    def snapshot(self):
+        """Events so far plus one counter event with the current totals."""
+        with self.lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+        if counters:
+            events.append({"name": "counters", "cat": "counters", "ph": "C", "ts": time.time_ns() // 1000,
+                           "pid": os.getpid(), "tid": threading.get_ident(), "args": counters})
+        return events
+
+    def export_jsonl(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for event in self.snapshot():
+                f.write(json.dumps(event, default=str) + "\n")
+
+    def chrome_trace(self):
+        return {"traceEvents": self.snapshot(), "displayTimeUnit": "ms"}
+
+    def export_chrome(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, default=str)
+
+    def export(self, path):
+        (self.export_jsonl if path.endswith(".jsonl") else self.export_chrome)(path)
+
+    def summary(self, since_us=None, tid=None):
+        """Total / count / max duration (ms) per span name, optionally only spans started at or
+        after ``since_us`` on thread ``tid`` (e.g. one Streamlit rerun)."""
+        out = {}
+        for event in self.snapshot():
+            if event["ph"] != "X":
+                continue
+            if (since_us is not None and event["ts"] < since_us) or (tid is not None and event["tid"] != tid):
+                continue
+            s = out.setdefault(event["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["count"] += 1
+            s["total_ms"] += event["dur"] / 1000
+            s["max_ms"] = max(s["max_ms"], event["dur"] / 1000)
+        return out
+
+    def clear(self):
+        with self.lock:
+            self.events.clear()
+            self.counters.clear()
+
+
+# process-wide default recorder
+recorder = Recorder()
+
+
+def span(name, cat=None, **args):
+    return recorder.span(name, cat, **args)
+
+
+def count(name, n=1):
+    recorder.count(name, n)
+
+
+def memory_snapshot(label=None):
+    return recorder.memory_snapshot(label)
+
+
+def export(path):
+    recorder.export(path)
+
+
+def _export_at_exit():
+    # pool workers started with spawn run atexit too; only the main process owns the file
+    if multiprocessing.parent_process() is None:
+        recorder.export(os.environ["ALIGN_TRACE_FILE"])
+
+
+if os.environ.get("ALIGN_TRACE_FILE"):
+    atexit.register(_export_at_exit)
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from app.alignment_cube import aggregate
+
+
+def test_missing_areas_are_unassigned():
+    papers = pd.DataFrame({
+        "company_id": [1, 1, 1],
+        "areas": ["['Medicine (all)']", "['Computer Science (all)']", np.nan],
+        "value": [0.5, 0.5, 0.5],
+        "z_by_company": [1.0, 4.0, 1.0],
+    })
+    cells = aggregate(papers, np.zeros(3, dtype=np.int16))
+    counts = dict(zip(cells["area_group"].astype(str), cells["papers"]))
+    assert counts == {"Biomed & Life Sciences": 1, "Science & Engineering": 1, "Unassigned": 1}
+    assert cells["outliers"].sum() == 1
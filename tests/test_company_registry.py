@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from data.company_registry import MISSING_ID, CompanyRegistry, key_papers, company_papers, load_registry
+
+
+def test_missing_names_are_not_registered():
+    registry = CompanyRegistry()
+    ids = registry.add_many(["Alpha PCL", np.nan, None, "  ", "Beta Limited", "Alpha PCL"])
+    assert ids.tolist() == [0, MISSING_ID, MISSING_ID, MISSING_ID, 1, 0]
+    assert registry.names == ["Alpha PCL", "Beta Limited"]
+    assert registry.resolve(np.nan) is None
+
+
+def test_key_papers_leaves_unnamed_rows_out_of_every_run():
+    registry = CompanyRegistry(["Alpha PCL"])
+    papers = pd.DataFrame({"company": ["Alpha PCL", np.nan, "Alpha PCL"], "value": [0.2, 0.9, 0.5]})
+    keyed, offsets = key_papers(papers, registry)
+    assert len(registry) == 1
+    assert company_papers(keyed, offsets, 0)["value"].tolist() == [0.5, 0.2]
+    assert company_papers(keyed, offsets, MISSING_ID).empty
+
+
+def test_saved_registry_keeps_its_ids(tmp_path):
+    # a registry saved before missing names were skipped may hold a "nan" entry
+    path = str(tmp_path / "registry.csv")
+    CompanyRegistry(["Alpha PCL", "nan", "Beta Limited"]).save(path)
+    registry = load_registry(path)
+    assert registry.names == ["Alpha PCL", "nan", "Beta Limited"]
+    assert registry.add("Beta Limited") == 2
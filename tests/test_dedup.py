@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from data.dedup import dedup_papers
+
+
+def test_oversized_bucket_is_collapsed_and_reported():
+    boilerplate = "this abstract is not available for this record please see the publisher site"
+    rows = [(f"b{i}", "untitled", boilerplate) for i in range(200)]
+    rows += [("x1", "graph neural networks", "message passing over molecular graphs for property prediction"),
+             ("x2", "solar cells", "perovskite absorber layers with improved moisture stability")]
+    kept, mapping, report = dedup_papers(pd.DataFrame(rows, columns=["eid", "title", "abstract"]), max_bucket=16)
+
+    assert sorted(kept["eid"]) == ["b0", "x1", "x2"]
+    assert set(mapping.loc[mapping["eid"].str.startswith("b"), "canonical_eid"]) == {"b0"}
+    assert report["oversized_buckets"] > 0 and report["largest_bucket"] == 200
+    assert report["candidate_pairs"] == 199
@@ -0,0 +1,45 @@
+import asyncio
+import json
+import os
+import sys
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from data.main import (load_ingested, load_scopus_directory_async, load_scopus_directory_parallel,
+                       read_manifest, RETRY_FILE)
+
+
+def write_sources(dir_path):
+    """One valid JSON document, a zip that is not a zip and a truncated tar.gz."""
+    doc = {"abstracts-retrieval-response": {"coredata": {"eid": "2-s2.0-1", "dc:title": "A title"}}}
+    with open(os.path.join(dir_path, "good.json"), "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+    with open(os.path.join(dir_path, "bad.zip"), "wb") as f:
+        f.write(b"this is not a zip archive")
+    with open(os.path.join(dir_path, "bad.tar.gz"), "wb") as f:
+        f.write(b"\x1f\x8b")
+    with zipfile.ZipFile(os.path.join(dir_path, "ok.zip"), "w") as zf:
+        zf.writestr("member.json", json.dumps({"abstracts-retrieval-response": {
+            "coredata": {"eid": "2-s2.0-2", "dc:title": "Zipped"}}}))
+
+
+def test_async_loader_skips_corrupt_archives(tmp_path):
+    write_sources(tmp_path)
+    df = asyncio.run(load_scopus_directory_async(str(tmp_path)))
+    assert sorted(df["eid"]) == ["2-s2.0-1", "2-s2.0-2"]
+
+
+def test_parallel_loader_marks_corrupt_archives_failed(tmp_path):
+    src, out = tmp_path / "src", tmp_path / "out"
+    src.mkdir()
+    write_sources(src)
+    load_scopus_directory_parallel(str(src), str(out), workers=1)
+
+    assert sorted(load_ingested(str(out))["eid"]) == ["2-s2.0-1", "2-s2.0-2"]
+    manifest = read_manifest(str(out))
+    failed = sorted(os.path.basename(p) for p, e in manifest.items() if e["status"] == "failed")
+    assert failed == ["bad.tar.gz", "bad.zip"]
+    with open(out / RETRY_FILE, encoding="utf-8") as f:
+        assert sorted(os.path.basename(line.strip()) for line in f) == ["bad.tar.gz", "bad.zip"]